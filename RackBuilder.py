@@ -1,17 +1,839 @@
 #!/usr/bin/env python3
+import time
+STARTUP_T0 = time.perf_counter()
 import tkinter as tk
 from tkinter import messagebox, simpledialog, ttk, filedialog, colorchooser
 import json
 import copy
+import csv
+import math
 import os
-from PIL import ImageGrab, Image
+import sys
+import threading
+from contextlib import contextmanager
+from rack_model import RackProject, DEFAULT_U, BTU_PER_WATT, DEPTHS, RAILS, SUBSLOTS, as_u, changed_span
+from rack_io import parse_project, build_project, project_data, write_project
+from rack_export import BASE_DPI, elevation_shapes, elevation_size, render_elevation, text_color_for, write_book
+from rack_history import History
+from rack_catalog import CatalogIndex, CatalogStore, parse_query
+from rack_journal import Journal, recover_project
+from rack_perf import Profiler, format_summary
+from rack_store import ProjectStore, is_store_path
+from rack_diff import describe, diff_projects, diff_racks, load_project
+from rack_cabling import CablePlan, describe_connection, endpoint, parse_ports, port_names
+# The BOM solver, the catalog importer and the RPC server are imported when
+# first used.
+STARTUP_IMPORTED = time.perf_counter()
 
 U_HEIGHT = 40
-DEFAULT_U = 12
 RACK_WIDTH_PX = 280
 RACK_LEFT_MARGIN = 30
 RACK_RIGHT_MARGIN = RACK_LEFT_MARGIN + RACK_WIDTH_PX
+RAIL_WIDTH_PX = 14
 PALETTE_WIDTH_PX = 230
+PALETTE_ROW_HEIGHT = 24
+SEARCH_DEBOUNCE_MS = 150
+ROOM_MIN_ZOOM = 0.05
+ROOM_MAX_ZOOM = 1.5
+ROOM_LABEL_ZOOM = 0.2
+ROOM_DETAIL_ZOOM = 0.6
+AUTOSAVE_INTERVAL_MS = 30000
+HEAT_STRIP_X = RACK_RIGHT_MARGIN + 10
+HEAT_STRIP_WIDTH = 12
+HEAT_STRIP_MAX_W_PER_U = 500
+HEAT_STRIP_COLORS = ((0.0, (0x2e, 0x7d, 0x32)), (0.5, (0xfb, 0xc0, 0x2d)), (1.0, (0xd3, 0x2f, 0x2f)))
+BACKGROUND_POLL_MS = 50
+FIRST_PAINT_TIMEOUT_MS = 1000
+PROJECT_FILETYPES = [("JSON files", "*.json"), ("RackPlanner database", "*.rackdb")]
+DIFF_COLORS = {"added": '#66BB6A', "removed": '#EF5350', "moved": '#42A5F5', "resized": '#FFA726', "updated": '#AB47BC'}
+PERF_REFRESH_MS = 1000
+PERF_PROBE_MS = 100
+PERF_APP_CALLS = ("update_palette", "_apply_palette_filter", "_draw_rack_and_components", "_record_current_state",
+                  "update_stats", "_place_component_from_palette", "_apply_drag_motion", "_autosave_capture", "_journal_capture")
+PERF_CANVAS_CALLS = ("create_rectangle", "create_text", "create_line", "create_oval", "coords", "itemconfig",
+                     "delete", "move", "tag_bind", "tag_raise", "tag_lower")
+
+
+class RackCanvasRenderer:
+    # Retained-mode drawing: the chassis for each rack height is drawn once and
+    # then only shown or hidden, and components are keyed by their model uid so
+    # an edit only creates, moves or deletes the items that actually changed.
+    # Full-depth items mounted on the other face are drawn as inert shadows,
+    # and 0U items as narrow strips over their side rail.
+    def __init__(self, canvas, on_component_click=None):
+        self.canvas = canvas
+        self.on_component_click = on_component_click
+        self.rack_height = None
+        self._chassis_heights = set()
+        self._items = {}
+        self._by_item = {}
+
+    def show_chassis(self, rack_height):
+        if rack_height == self.rack_height: return
+        if self.rack_height is not None:
+            self.canvas.itemconfig(f"chassis_{self.rack_height}", state='hidden')
+        if rack_height in self._chassis_heights:
+            self.canvas.itemconfig(f"chassis_{rack_height}", state='normal')
+        else:
+            self._draw_chassis(rack_height)
+            self._chassis_heights.add(rack_height)
+        self.canvas.tag_lower("chassis")
+        self.canvas.config(height=U_HEIGHT * rack_height)
+        self.rack_height = rack_height
+
+    def _draw_chassis(self, rack_height):
+        tags = ("chassis", f"chassis_{rack_height}")
+        total_h = U_HEIGHT * rack_height
+
+        self.canvas.create_rectangle(RACK_LEFT_MARGIN, 0, RACK_RIGHT_MARGIN, total_h, fill='#282828', outline='#555555', width=0, tags=tags)
+
+        for i in range(rack_height):
+            y = i * U_HEIGHT
+            self.canvas.create_line(RACK_LEFT_MARGIN, y, RACK_RIGHT_MARGIN, y, fill='#444444', width=1, tags=tags)
+            self.canvas.create_text(15, y + U_HEIGHT // 2, anchor='center', fill='#888888', text=f"{rack_height - i}", tags=tags)
+            
+            for j in [1, 2, 3]:
+                hole_y = y + (j * U_HEIGHT / 4)
+                self.canvas.create_oval(RACK_LEFT_MARGIN + 5, hole_y - 2, RACK_LEFT_MARGIN + 9, hole_y + 2, fill="#111111", outline="", tags=tags)
+                self.canvas.create_oval(RACK_RIGHT_MARGIN - 9, hole_y - 2, RACK_RIGHT_MARGIN - 5, hole_y + 2, fill="#111111", outline="", tags=tags)
+
+        self.canvas.create_line(RACK_LEFT_MARGIN, 0, RACK_LEFT_MARGIN, total_h, fill='#555555', width=2, tags=tags)
+        self.canvas.create_line(RACK_RIGHT_MARGIN, 0, RACK_RIGHT_MARGIN, total_h, fill='#555555', width=2, tags=tags)
+        self.canvas.create_line(RACK_LEFT_MARGIN, total_h, RACK_RIGHT_MARGIN, total_h, fill='#555555', width=1, tags=tags)
+
+    def component_bounds(self, comp_data):
+        start_index_0_based_top = self.rack_height - (comp_data['start_u_slot'] + comp_data['size_u'] - 1)
+        y1 = start_index_0_based_top * U_HEIGHT
+        y2 = y1 + comp_data['size_u'] * U_HEIGHT
+        rail = comp_data.get('rail')
+        if rail == 'Left':
+            return RACK_LEFT_MARGIN + 1, y1 + 1, RACK_LEFT_MARGIN + RAIL_WIDTH_PX, y2 - 1
+        if rail == 'Right':
+            return RACK_RIGHT_MARGIN - RAIL_WIDTH_PX, y1 + 1, RACK_RIGHT_MARGIN - 1, y2 - 1
+        return RACK_LEFT_MARGIN + 2, y1 + 1, RACK_RIGHT_MARGIN - 2, y2 - 1
+
+    def sync(self, rack_height, components, shadows=()):
+        # `shadows` are full-depth items of the other face that also take up
+        # space on this one.
+        self.show_chassis(rack_height)
+        seen = set()
+        for comp_data, shadow in [(c, False) for c in components] + [(c, True) for c in shadows]:
+            key = comp_data['uid']
+            seen.add(key)
+            look = (comp_data['name'], comp_data.get('color', 'skyblue'), shadow)
+            place = (rack_height, comp_data['start_u_slot'], comp_data['size_u'], comp_data.get('rail'))
+            entry = self._items.get(key)
+            if entry is not None and entry[2][2] != shadow:
+                self._delete(key)
+                entry = None
+            if entry is None:
+                entry = self._create_component(key, comp_data, shadow)
+            else:
+                rect, text, old_look, old_place = entry
+                if place != old_place:
+                    x1, y1, x2, y2 = self.component_bounds(comp_data)
+                    self.canvas.coords(rect, x1, y1, x2, y2)
+                    self.canvas.coords(text, (x1 + x2) // 2, (y1 + y2) // 2)
+                if look != old_look and not shadow:
+                    self.canvas.itemconfig(rect, fill=look[1])
+                    self.canvas.itemconfig(text, text=look[0], fill=text_color_for(look[1]))
+                elif look != old_look:
+                    self.canvas.itemconfig(text, text=look[0])
+                entry = (rect, text, look, place)
+            self._items[key] = entry
+
+        for key in [k for k in self._items if k not in seen]:
+            self._delete(key)
+        self.canvas.tag_raise("rail_item")
+
+    def _delete(self, key):
+        rect, text = self._items.pop(key)[:2]
+        del self._by_item[rect], self._by_item[text]
+        self.canvas.delete(rect)
+        self.canvas.delete(text)
+
+    def _create_component(self, key, comp_data, shadow=False):
+        x1, y1, x2, y2 = self.component_bounds(comp_data)
+        color_hex = comp_data.get('color', 'skyblue')
+        tags = ("depth_shadow",) if shadow else ("component_item", "rail_item") if comp_data.get('rail') else "component_item"
+
+        if shadow:
+            rect = self.canvas.create_rectangle(x1, y1, x2, y2, fill='#555555', stipple='gray25', outline='#777777', dash=(3, 3), tags=tags)
+            text = self.canvas.create_text((x1 + x2) // 2, (y1 + y2) // 2, fill='#aaaaaa', font=('Arial', 8, 'italic'),
+                                           text=comp_data['name'], tags=tags)
+        else:
+            rect = self.canvas.create_rectangle(x1, y1, x2, y2, 
+                                                fill=color_hex, outline='#333333', width=1, tags=tags)
+            text = self.canvas.create_text((x1 + x2) // 2, (y1 + y2) // 2, angle=90 if comp_data.get('rail') else 0,
+                                            fill=text_color_for(color_hex), font=('Arial', 9, 'bold'), text=comp_data['name'], tags=tags)
+
+        self._by_item[rect] = self._by_item[text] = key
+        if self.on_component_click and not shadow:
+            for item in (rect, text):
+                self.canvas.tag_bind(item, '<Button-3>', lambda e, uid=key: self.on_component_click(e, uid))
+
+        return rect, text, (comp_data['name'], color_hex, shadow), (self.rack_height, comp_data['start_u_slot'], comp_data['size_u'], comp_data.get('rail'))
+
+    def clear_components(self):
+        for rect, text, _, _ in self._items.values():
+            self.canvas.delete(rect)
+            self.canvas.delete(text)
+        self._items = {}
+        self._by_item = {}
+
+    def uid_at(self, item):
+        # Model uid of the component a canvas item belongs to, or None.
+        return self._by_item.get(item)
+
+    def show_component(self, comp_data, visible=True):
+        entry = self._items.get(comp_data.get('uid'))
+        if entry:
+            state = 'normal' if visible else 'hidden'
+            self.canvas.itemconfig(entry[0], state=state)
+            self.canvas.itemconfig(entry[1], state=state)
+
+    def component_coords(self, comp_data):
+        entry = self._items.get(comp_data.get('uid'))
+        return self.canvas.coords(entry[0]) if entry else self.component_bounds(comp_data)
+
+
+def mounting_label(comp_info):
+    if comp_info.get('rail'):
+        return f"0U, {comp_info['size']}U {comp_info['rail'].lower()} rail"
+    return f"{comp_info['size']}U" + (", full depth" if comp_info.get('depth') == 'full' else "")
+
+
+def heat_color(watts_per_u):
+    if watts_per_u <= 0: return '#303030'
+    t = min(1.0, watts_per_u / HEAT_STRIP_MAX_W_PER_U)
+    for (t1, c1), (t2, c2) in zip(HEAT_STRIP_COLORS, HEAT_STRIP_COLORS[1:]):
+        if t <= t2:
+            f = (t - t1) / (t2 - t1)
+            return '#%02x%02x%02x' % tuple(int(a + (b - a) * f) for a, b in zip(c1, c2))
+    return '#d32f2f'
+
+
+class HeatStrip:
+    # Power density per U beside the rack, coloured on a fixed W/U scale
+    # rather than relative to the hottest U, so a change only recolours the
+    # U range it touched. The strip listens to the model for that range.
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.model = None
+        self.view = None
+        self._cells = []
+        self._values = []
+        self._dirty = None
+
+    def _on_change(self, kind, view, comp, prev):
+        if view is not None and view != self.view: return
+        span = changed_span(kind, comp, prev) or (1, self.model.rack_height)
+        if self._dirty:
+            span = (min(span[0], self._dirty[0]), max(span[1], self._dirty[1]))
+        self._dirty = span
+
+    def _rebuild(self, rack_height):
+        for cell in self._cells: self.canvas.delete(cell)
+        self._cells = []
+        for u in range(1, rack_height + 1):
+            y = (rack_height - u) * U_HEIGHT
+            self._cells.append(self.canvas.create_rectangle(HEAT_STRIP_X, y + 1, HEAT_STRIP_X + HEAT_STRIP_WIDTH, y + U_HEIGHT - 1,
+                                                            fill=heat_color(0), outline='', tags="heat_strip"))
+        self._values = [0.0] * rack_height
+
+    def sync(self, model, view):
+        if model is not self.model:
+            if self.model: self.model.unsubscribe(self._on_change)
+            model.subscribe(self._on_change)
+            self.model = None
+        if model is not self.model or view != self.view or len(self._cells) != model.rack_height:
+            self.model, self.view = model, view
+            if len(self._cells) != model.rack_height:
+                self._rebuild(model.rack_height)
+            self._dirty = (1, model.rack_height)
+        if not self._dirty: return
+        lo, hi = max(1, self._dirty[0]), min(model.rack_height, self._dirty[1])
+        for u, watts in enumerate(model.power_profile(view, lo, hi), lo):
+            if watts != self._values[u - 1]:
+                self._values[u - 1] = watts
+                self.canvas.itemconfig(self._cells[u - 1], fill=heat_color(watts))
+        self._dirty = None
+
+    def peak(self):
+        # (watts, U) of the hottest U in the current view.
+        if not self._values: return 0, None
+        watts = max(self._values)
+        return watts, self._values.index(watts) + 1
+
+
+class VirtualPalette:
+    # Palette rows are canvas items from a small pool sized to the visible
+    # area; scrolling re-labels and repositions the pool instead of creating a
+    # widget per catalog entry.
+    def __init__(self, canvas, scrollbar, on_pick, width, is_custom, on_toggle=None):
+        self.canvas = canvas
+        self.scrollbar = scrollbar
+        self.on_pick = on_pick
+        self.on_toggle = on_toggle
+        self.width = width
+        self.is_custom = is_custom
+        self.rows = []
+        self._pool = []
+        self._bound = []
+        self._window = None
+
+        self.canvas.config(yscrollcommand=self._on_yview, yscrollincrement=PALETTE_ROW_HEIGHT)
+        self.scrollbar.config(command=self.canvas.yview)
+        self.canvas.bind("<Configure>", lambda e: self.refresh())
+        self.canvas.bind("<Button-1>", self._on_click)
+
+    def set_rows(self, rows, keep_scroll=False):
+        self.rows = rows
+        self._bound = [None] * len(self._pool)
+        self._window = None
+        self.canvas.configure(scrollregion=(0, 0, self.width, len(rows) * PALETTE_ROW_HEIGHT))
+        if not keep_scroll:
+            self.canvas.yview_moveto(0)
+        self.refresh()
+
+    def _on_yview(self, first, last):
+        self.scrollbar.set(first, last)
+        self.refresh()
+
+    def refresh(self):
+        first_row = max(0, int(self.canvas.canvasy(0) // PALETTE_ROW_HEIGHT))
+        visible = self.canvas.winfo_height() // PALETTE_ROW_HEIGHT + 2
+        if (first_row, visible) == self._window: return
+        self._window = (first_row, visible)
+
+        while len(self._pool) < visible:
+            rect = self.canvas.create_rectangle(0, 0, 0, 0, width=1, state='hidden')
+            text = self.canvas.create_text(0, 0, font=('Arial', 9), state='hidden')
+            self._pool.append((rect, text))
+            self._bound.append(None)
+
+        for slot, (rect, text) in enumerate(self._pool):
+            row_index = first_row + slot
+            if slot >= visible or row_index >= len(self.rows):
+                if self._bound[slot] is not None:
+                    self.canvas.itemconfig(rect, state='hidden')
+                    self.canvas.itemconfig(text, state='hidden')
+                    self._bound[slot] = None
+                continue
+            if self._bound[slot] == row_index: continue
+            self._bound[slot] = row_index
+            self._draw_row(rect, text, row_index)
+
+    def _draw_row(self, rect, text, row_index):
+        row = self.rows[row_index]
+        y1 = row_index * PALETTE_ROW_HEIGHT
+        y2 = y1 + PALETTE_ROW_HEIGHT
+        if row[0] == 'header':
+            _, category_name, count, collapsed = row
+            header_fg = '#4FC3F7' if self.is_custom(category_name) else 'white'
+            label = f"{'▸' if collapsed else '▾'} {category_name} ({'?' if count is None else count})"
+            self.canvas.coords(rect, 0, y1, self.width, y2)
+            self.canvas.itemconfig(rect, fill='#3c3c3c', outline='', state='normal')
+            self.canvas.coords(text, self.width // 2, (y1 + y2) // 2 + 3)
+            self.canvas.itemconfig(text, text=label, fill=header_fg, anchor='center', state='normal')
+        else:
+            comp_name, comp_info = row[2], row[3]
+            self.canvas.coords(rect, 5, y1 + 2, self.width - 5, y2 - 2)
+            self.canvas.itemconfig(rect, fill=comp_info['color'], outline='black', state='normal')
+            self.canvas.coords(text, 10, (y1 + y2) // 2)
+            self.canvas.itemconfig(text, text=f"{comp_name} ({mounting_label(comp_info)})", fill='black', anchor='w', state='normal')
+
+    def _on_click(self, event):
+        row_index = int(self.canvas.canvasy(event.y) // PALETTE_ROW_HEIGHT)
+        if not 0 <= row_index < len(self.rows): return
+        row = self.rows[row_index]
+        if row[0] == 'item':
+            self.on_pick(row[2], row[3])
+        elif self.on_toggle:
+            self.on_toggle(row[1])
+
+
+class ProgressDialog:
+    def __init__(self, root, title, on_cancel):
+        self.top = tk.Toplevel(root)
+        self.top.title(title)
+        self.top.configure(bg='#2e2e2e')
+        self.top.transient(root)
+        self.top.resizable(False, False)
+        self.label = tk.Label(self.top, text="Starting...", bg='#2e2e2e', fg='white', width=45, anchor='w')
+        self.label.pack(padx=10, pady=(10, 5))
+        self.bar = ttk.Progressbar(self.top, length=320, maximum=1000)
+        self.bar.pack(padx=10, pady=5)
+        tk.Button(self.top, text="Cancel", command=on_cancel, bg='#555555', fg='white').pack(pady=(5, 10))
+        self.top.protocol("WM_DELETE_WINDOW", on_cancel)
+
+    def update(self, fraction, text):
+        self.bar['value'] = int(fraction * 1000)
+        self.label.config(text=text)
+
+    def close(self):
+        self.top.destroy()
+
+
+class DiffWindow:
+    # Change list for a comparison; the app draws the matching overlay on the
+    # rack canvas until this window is closed.
+    def __init__(self, root, diff, label, on_close):
+        self.diff = diff
+        self.on_close = on_close
+        self.window = tk.Toplevel(root)
+        self.window.title(f"Changes since {label}")
+        self.window.configure(bg='#2e2e2e')
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        toolbar = tk.Frame(self.window, bg='#2e2e2e')
+        toolbar.pack(fill=tk.X)
+        tk.Button(toolbar, text="Save JSON...", command=self.save_json, bg='#009688', fg='white').pack(side=tk.LEFT, padx=2, pady=2)
+        tk.Button(toolbar, text="Close", command=self.close, bg='#607D8B', fg='white').pack(side=tk.LEFT, padx=2, pady=2)
+        summary = diff["summary"]
+        counts = ", ".join(f"{n} {kind}" for kind, n in sorted(summary["changes"].items())) or "no device changes"
+        tk.Label(toolbar, text=f"{summary['racks_changed']} racks changed ({counts}), power {summary['watts_delta']:+g} W, "
+                               f"weight {summary['weight_delta']:+g} kg", bg='#2e2e2e', fg='#cccccc').pack(side=tk.LEFT, padx=10)
+
+        self.text = tk.Text(self.window, bg='#1e1e1e', fg='#cccccc', font=('Courier', 9), width=90, height=30, relief=tk.FLAT)
+        self.text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        for kind, color in DIFF_COLORS.items():
+            self.text.tag_configure(kind, foreground=color)
+        for rack in diff["racks"]:
+            self.text.insert(tk.END, f"{rack['rack']} ({rack['status']}): {rack['watts'][0]:g} -> {rack['watts'][1]:g} W, "
+                                     f"{rack['weight'][0]:g} -> {rack['weight'][1]:g} kg\n")
+            for change in rack["changes"]:
+                self.text.insert(tk.END, f"    {describe(change)}\n", change["change"])
+        self.text.config(state='disabled')
+
+    def save_json(self):
+        path = filedialog.asksaveasfilename(parent=self.window, defaultextension=".json", filetypes=[("JSON files", "*.json")])
+        if not path: return
+        try:
+            with open(path, 'w') as f: json.dump(self.diff, f, indent=2)
+        except OSError as e:
+            messagebox.showerror("Save", f"{e}", parent=self.window)
+
+    def close(self):
+        self.window.destroy()
+        self.on_close()
+
+
+class ConnectDialog:
+    # Picks a port on two items, rack by rack, and hands the links to
+    # on_connect(links), links being [(a, b, route)]. Only items with ports
+    # and their free ports are offered; patch panels also list their rear
+    # side. The dialog stays open so many ports can be patched in a row.
+    def __init__(self, root, plan, on_connect):
+        self.plan = plan
+        self.on_connect = on_connect
+        self.top = tk.Toplevel(root)
+        self.top.title("Connect Ports")
+        self.top.configure(bg='#2e2e2e')
+        self.ends = [self._end_row(label, row) for row, label in enumerate(("From", "To"))]
+        tk.Label(self.top, text="Ports in a row", bg='#2e2e2e', fg='white').grid(row=2, column=0, padx=5, sticky='w')
+        self.count_var = tk.IntVar(value=1)
+        tk.Spinbox(self.top, from_=1, to=96, width=5, textvariable=self.count_var).grid(row=2, column=1, sticky='w', padx=2)
+        self.route_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(self.top, text="Route through patch panels between racks", variable=self.route_var, bg='#2e2e2e', fg='white',
+                       selectcolor='#2e2e2e', activebackground='#2e2e2e').grid(row=3, column=0, columnspan=4, sticky='w', padx=5)
+        buttons = tk.Frame(self.top, bg='#2e2e2e')
+        buttons.grid(row=4, column=0, columnspan=4, pady=5)
+        tk.Button(buttons, text="Connect", command=self.connect, bg='#4CAF50', fg='white').pack(side=tk.LEFT, padx=2)
+        tk.Button(buttons, text="Close", command=self.top.destroy, bg='#607D8B', fg='white').pack(side=tk.LEFT, padx=2)
+
+    def _end_row(self, label, row):
+        tk.Label(self.top, text=label, bg='#2e2e2e', fg='white').grid(row=row, column=0, padx=5, pady=5, sticky='w')
+        end = {"rack": ttk.Combobox(self.top, state='readonly', width=14, values=[r.name for r in self.plan.project.racks]),
+               "item": ttk.Combobox(self.top, state='readonly', width=36),
+               "port": ttk.Combobox(self.top, state='readonly', width=14),
+               "uids": []}
+        for column, key in enumerate(("rack", "item", "port"), 1):
+            end[key].grid(row=row, column=column, padx=2, pady=5)
+        end["rack"].bind("<<ComboboxSelected>>", lambda e: self._fill_items(end))
+        end["item"].bind("<<ComboboxSelected>>", lambda e: self._fill_ports(end))
+        return end
+
+    def _fill_items(self, end):
+        rack = self.plan.project.get(end["rack"].get())
+        comps = sorted(((c, v) for v, cs in rack.views.items() for c in cs if c.get('ports')), key=lambda cv: -cv[0]['start_u_slot'])
+        end["uids"] = [c['uid'] for c, _ in comps]
+        end["item"].config(values=[f"U{c['start_u_slot']} {v}: {c['name']}" for c, v in comps])
+        end["item"].set('')
+        end["port"].config(values=[])
+        end["port"].set('')
+
+    def _fill_ports(self, end):
+        uid = self._uid(end)
+        if uid is None: return
+        rack = end["rack"].get()
+        comp = self.plan.project.get(rack).get(uid)
+        names = port_names(comp)
+        ports = [p for p in names if self.plan.is_free(endpoint(rack, uid, p))]
+        if comp.get('patch'):
+            ports += [f"{p} rear" for p in names if self.plan.is_free(endpoint(rack, uid, p, "rear"))]
+        end["port"].config(values=ports)
+        end["port"].set(ports[0] if ports else '')
+
+    def _uid(self, end):
+        n = end["item"].current()
+        return end["uids"][n] if end["item"].get() and 0 <= n < len(end["uids"]) else None
+
+    def _endpoints(self, end, count):
+        # The chosen port and the free ones listed after it.
+        uid, port, ports = self._uid(end), end["port"].get(), list(end["port"].cget('values') or ())
+        if uid is None or port not in ports: return []
+        chosen = ports[ports.index(port):ports.index(port) + count]
+        return [endpoint(end["rack"].get(), uid, p[:-5], "rear") if p.endswith(" rear") else endpoint(end["rack"].get(), uid, p)
+                for p in chosen]
+
+    def connect(self):
+        count = max(1, self.count_var.get() or 1)
+        a, b = (self._endpoints(end, count) for end in self.ends)
+        if not a or not b:
+            messagebox.showwarning("Connect", "Pick an item and a port for both ends.", parent=self.top); return
+        if len(a) < count or len(b) < count:
+            messagebox.showwarning("Connect", f"There are not {count} free ports in a row on both ends.", parent=self.top); return
+        if self.on_connect([(x, y, self.route_var.get()) for x, y in zip(a, b)]):
+            for end in self.ends: self._fill_ports(end)
+
+
+class CablingWindow:
+    # The project's connections with cable types and lengths (problems in
+    # red) and the cable bill of materials.
+    def __init__(self, root, plan, on_change, on_close):
+        self.plan = plan
+        self.on_change = on_change
+        self.on_close = on_close
+        self.window = tk.Toplevel(root)
+        self.window.title("Cabling")
+        self.window.configure(bg='#2e2e2e')
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        toolbar = tk.Frame(self.window, bg='#2e2e2e')
+        toolbar.pack(fill=tk.X)
+        tk.Button(toolbar, text="Connect...", command=self.open_connect, bg='#4CAF50', fg='white').pack(side=tk.LEFT, padx=2, pady=2)
+        tk.Button(toolbar, text="Disconnect", command=self.disconnect, bg='#f44336', fg='white').pack(side=tk.LEFT, padx=2, pady=2)
+        tk.Button(toolbar, text="Save BOM CSV...", command=self.save_bom, bg='#009688', fg='white').pack(side=tk.LEFT, padx=2, pady=2)
+        tk.Button(toolbar, text="Close", command=self.close, bg='#607D8B', fg='white').pack(side=tk.LEFT, padx=2, pady=2)
+        self.summary = tk.Label(toolbar, bg='#2e2e2e', fg='#cccccc')
+        self.summary.pack(side=tk.LEFT, padx=10)
+
+        self.listbox = tk.Listbox(self.window, bg='#1e1e1e', fg='#cccccc', font=('Courier', 9), width=110, height=20,
+                                  selectmode=tk.EXTENDED, relief=tk.FLAT)
+        self.listbox.pack(fill=tk.BOTH, expand=True, padx=5, pady=(5, 0))
+        self.bom_text = tk.Text(self.window, bg='#1e1e1e', fg='#cccccc', font=('Courier', 9), width=110, height=8, relief=tk.FLAT)
+        self.bom_text.pack(fill=tk.X, padx=5, pady=5)
+        self.refresh()
+
+    def refresh(self):
+        racks = {r.name: r for r in self.plan.project.racks}
+        lengths = self.plan.lengths()
+        self.listbox.delete(0, tk.END)
+        for conn, cable, length in zip(self.plan.connections, self.plan.cable_types(lengths), lengths):
+            self.listbox.insert(tk.END, describe_connection(conn, racks, length, cable))
+        problems = self.plan.problems()
+        for n in {p["connection"] for p in problems}:
+            self.listbox.itemconfig(n, fg='#EF5350')
+        bom = self.plan.bom()
+        self.summary.config(text=f"{len(self.plan.connections)} connections, {bom['total_m']:g} m of cable"
+                                 + (f", {len(problems)} problems" if problems else ""))
+        self.bom_text.config(state='normal')
+        self.bom_text.delete('1.0', tk.END)
+        for row in bom["cables"]:
+            self.bom_text.insert(tk.END, f"{row['count']:5d} x {row['length_m']:>4g} m  {row['cable']}\n")
+        if bom["unmeasured"]:
+            self.bom_text.insert(tk.END, f"{bom['unmeasured']:5d} cables with a missing end are not counted\n")
+        self.bom_text.config(state='disabled')
+
+    def open_connect(self):
+        ConnectDialog(self.window, self.plan, self.connect)
+
+    def connect(self, links):
+        # All or nothing, like the JSON-RPC "connect" method.
+        from rack_rpc import RpcError, connect_links
+        try:
+            connect_links(self.plan, [{"a": a, "b": b, "route": route} for a, b, route in links])
+        except RpcError as e:
+            messagebox.showerror("Connect", f"{e}", parent=self.window); return False
+        self.on_change()
+        return True
+
+    def disconnect(self):
+        connections = self.plan.connections
+        chosen = [connections[i] for i in self.listbox.curselection() or ()]
+        if not chosen: return
+        for conn in chosen:
+            self.plan.disconnect(conn)
+        self.on_change()
+
+    def save_bom(self):
+        path = filedialog.asksaveasfilename(parent=self.window, defaultextension=".csv", filetypes=[("CSV files", "*.csv")])
+        if not path: return
+        try:
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(["Cable", "Length (m)", "Count"])
+                for row in self.plan.bom()["cables"]:
+                    writer.writerow([row["cable"], row["length_m"], row["count"]])
+        except OSError as e:
+            messagebox.showerror("Save", f"{e}", parent=self.window)
+
+    def close(self):
+        self.window.destroy()
+        self.on_close()
+
+
+class PerfPanel:
+    # Live call counts and timings of the instrumented hot paths plus canvas
+    # and history gauges. The app keeps the profiler enabled while it is open.
+    def __init__(self, root, profiler, on_close):
+        self.root = root
+        self.profiler = profiler
+        self.on_close = on_close
+        self._job = None
+
+        self.window = tk.Toplevel(root)
+        self.window.title("Performance")
+        self.window.configure(bg='#2e2e2e')
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        toolbar = tk.Frame(self.window, bg='#2e2e2e')
+        toolbar.pack(fill=tk.X)
+        tk.Button(toolbar, text="Reset", command=self.profiler.reset, bg='#607D8B', fg='white').pack(side=tk.LEFT, padx=2, pady=2)
+        tk.Button(toolbar, text="Save Trace...", command=self.save_trace, bg='#009688', fg='white').pack(side=tk.LEFT, padx=2, pady=2)
+        self.cprofile_btn = tk.Button(toolbar, text="Start cProfile", command=self.toggle_cprofile, bg='#673AB7', fg='white')
+        self.cprofile_btn.pack(side=tk.LEFT, padx=2, pady=2)
+
+        self.text = tk.Text(self.window, bg='#1e1e1e', fg='#cccccc', font=('Courier', 9), width=74, height=32,
+                            relief=tk.FLAT, state='disabled')
+        self.text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.refresh()
+
+    def refresh(self):
+        text = format_summary(self.profiler.summary(), self.profiler.sample_gauges())
+        self.text.config(state='normal')
+        self.text.delete('1.0', tk.END)
+        self.text.insert('1.0', text)
+        self.text.config(state='disabled')
+        self._job = self.root.after(PERF_REFRESH_MS, self.refresh)
+
+    def save_trace(self):
+        path = filedialog.asksaveasfilename(parent=self.window, defaultextension=".json",
+                                            filetypes=[("Chrome trace", "*.json")], initialfile="rackplanner-trace.json")
+        if not path: return
+        try:
+            self.profiler.write_chrome_trace(path)
+        except OSError as e:
+            messagebox.showerror("Save Trace", f"{e}", parent=self.window)
+
+    def toggle_cprofile(self):
+        if not self.profiler.profiling:
+            self.profiler.start_cprofile()
+            self.cprofile_btn.config(text="Stop cProfile...")
+            return
+        path = filedialog.asksaveasfilename(parent=self.window, defaultextension=".prof",
+                                            filetypes=[("cProfile stats", "*.prof")], initialfile="rackplanner.prof")
+        self.cprofile_btn.config(text="Start cProfile")
+        try:
+            self.profiler.stop_cprofile(path or None)
+        except OSError as e:
+            messagebox.showerror("Save Profile", f"{e}", parent=self.window)
+
+    def close(self):
+        if self._job:
+            self.root.after_cancel(self._job)
+        self.profiler.stop_cprofile()
+        self.window.destroy()
+        self.on_close()
+
+
+class RoomView:
+    # Rows of racks on one zoomable canvas. Only racks that intersect the
+    # viewport have canvas items; they are drawn at a level of detail that
+    # depends on zoom and redrawn only when the rack, zoom or layout changes.
+    def __init__(self, root, project, on_open_rack, on_close, prepare_rack=None):
+        self.project = project
+        self.on_open_rack = on_open_rack
+        self.on_close = on_close
+        self.prepare_rack = prepare_rack
+        self.zoom = 0.25
+        self.view = "Front"
+        self.active_rack = None
+        self._drawn = {}
+        self._layout_key = None
+        self._rows = []
+
+        self.window = tk.Toplevel(root)
+        self.window.title("Room View")
+        self.window.configure(bg='#2e2e2e')
+        self.window.geometry("1000x700")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        toolbar = tk.Frame(self.window, bg='#2e2e2e')
+        toolbar.pack(fill=tk.X)
+        tk.Button(toolbar, text="-", width=3, command=lambda: self.set_zoom(self.zoom / 1.25), bg='#607D8B', fg='white').pack(side=tk.LEFT, padx=2, pady=2)
+        tk.Button(toolbar, text="+", width=3, command=lambda: self.set_zoom(self.zoom * 1.25), bg='#607D8B', fg='white').pack(side=tk.LEFT, padx=2, pady=2)
+        tk.Button(toolbar, text="Switch View (Front/Rear)", command=self.toggle_view, bg='#673AB7', fg='white').pack(side=tk.LEFT, padx=2, pady=2)
+        self.info_label = tk.Label(toolbar, text="", bg='#2e2e2e', fg='#cccccc')
+        self.info_label.pack(side=tk.LEFT, padx=10)
+
+        frame = tk.Frame(self.window, bg='#1e1e1e')
+        frame.pack(fill=tk.BOTH, expand=True)
+        self.x_scrollbar = tk.Scrollbar(frame, orient="horizontal")
+        self.x_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.y_scrollbar = tk.Scrollbar(frame, orient="vertical")
+        self.y_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas = tk.Canvas(frame, bg='#1e1e1e', highlightthickness=0,
+                                xscrollcommand=self._on_xview, yscrollcommand=self._on_yview)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.x_scrollbar.config(command=self.canvas.xview)
+        self.y_scrollbar.config(command=self.canvas.yview)
+
+        self.canvas.bind("<Configure>", lambda e: self.refresh())
+        self.canvas.bind("<Double-Button-1>", self._on_double_click)
+        self.canvas.bind("<MouseWheel>", self._on_mousewheel)
+        self.canvas.bind("<Button-4>", self._on_mousewheel)
+        self.canvas.bind("<Button-5>", self._on_mousewheel)
+        self.canvas.bind("<Control-MouseWheel>", self._on_zoom_wheel)
+        self.canvas.bind("<Control-Button-4>", self._on_zoom_wheel)
+        self.canvas.bind("<Control-Button-5>", self._on_zoom_wheel)
+
+        self.refresh()
+
+    def close(self):
+        self.window.destroy()
+        self.on_close()
+
+    def _on_xview(self, first, last):
+        self.x_scrollbar.set(first, last)
+        self.refresh()
+
+    def _on_yview(self, first, last):
+        self.y_scrollbar.set(first, last)
+        self.refresh()
+
+    def _on_mousewheel(self, event):
+        if event.num == 4 or event.delta > 0: self.canvas.yview_scroll(-1, "units")
+        elif event.num == 5 or event.delta < 0: self.canvas.yview_scroll(1, "units")
+
+    def _on_zoom_wheel(self, event):
+        self.set_zoom(self.zoom * (1.25 if event.num == 4 or event.delta > 0 else 0.8))
+        return "break"
+
+    def toggle_view(self):
+        self.view = "Rear" if self.view == "Front" else "Front"
+        self.refresh(force=True)
+
+    def set_zoom(self, zoom):
+        zoom = max(ROOM_MIN_ZOOM, min(ROOM_MAX_ZOOM, zoom))
+        if zoom == self.zoom: return
+        # Keep the world point at the centre of the viewport where it was.
+        cx = (self.canvas.canvasx(0) + self.canvas.winfo_width() / 2) / self.zoom
+        cy = (self.canvas.canvasy(0) + self.canvas.winfo_height() / 2) / self.zoom
+        self.zoom = zoom
+        self.refresh(force=True)
+        world_w, world_h = self._world_size()
+        if world_w * zoom > 0:
+            self.canvas.xview_moveto(max(0, (cx * zoom - self.canvas.winfo_width() / 2) / (world_w * zoom)))
+        if world_h * zoom > 0:
+            self.canvas.yview_moveto(max(0, (cy * zoom - self.canvas.winfo_height() / 2) / (world_h * zoom)))
+
+    def _slot_width(self):
+        return elevation_size(0, 1)[0]
+
+    def _layout(self):
+        # Row bands in unzoomed world pixels: (top, bottom, racks).
+        key = tuple((id(r), r.row, r.rack_height) for r in self.project.racks)
+        if key != self._layout_key:
+            self._layout_key = key
+            self._rows = []
+            top = 0
+            for _, racks in self.project.rows():
+                bottom = top + max(elevation_size(r.rack_height, 1)[1] for r in racks)
+                self._rows.append((top, bottom, racks))
+                top = bottom
+        return self._rows
+
+    def _world_size(self):
+        rows = self._layout()
+        if not rows: return 0, 0
+        return max(len(racks) for _, _, racks in rows) * self._slot_width(), rows[-1][1]
+
+    def _visible_racks(self):
+        z = self.zoom
+        x1, y1 = self.canvas.canvasx(0) / z, self.canvas.canvasy(0) / z
+        x2, y2 = x1 + self.canvas.winfo_width() / z, y1 + self.canvas.winfo_height() / z
+        slot_w = self._slot_width()
+        first_col, last_col = max(0, int(x1 // slot_w)), int(x2 // slot_w)
+        visible = {}
+        for top, bottom, racks in self._layout():
+            if bottom < y1 or top > y2: continue
+            for col in range(first_col, min(last_col, len(racks) - 1) + 1):
+                visible[racks[col]] = (col * slot_w, top)
+        return visible
+
+    def rack_at(self, x, y):
+        wx, wy = self.canvas.canvasx(x) / self.zoom, self.canvas.canvasy(y) / self.zoom
+        col = int(wx // self._slot_width())
+        for top, bottom, racks in self._layout():
+            if top <= wy < bottom and 0 <= col < len(racks):
+                return racks[col]
+        return None
+
+    def _on_double_click(self, event):
+        rack = self.rack_at(event.x, event.y)
+        if rack is not None:
+            self.on_open_rack(rack)
+
+    def refresh(self, force=False):
+        world_w, world_h = self._world_size()
+        self.canvas.configure(scrollregion=(0, 0, world_w * self.zoom, world_h * self.zoom))
+        if force:
+            self.canvas.delete("room_rack")
+            self._drawn = {}
+
+        visible = self._visible_racks()
+        for rack in [r for r in self._drawn if r not in visible]:
+            self.canvas.delete(self._drawn.pop(rack)[0])
+        for rack, origin in visible.items():
+            if self.prepare_rack: self.prepare_rack(rack)
+            state = (rack.version, origin, rack is self.active_rack)
+            drawn = self._drawn.get(rack)
+            if drawn and drawn[1] == state: continue
+            if drawn: self.canvas.delete(drawn[0])
+            self._drawn[rack] = (self._draw_rack(rack, origin), state)
+
+        detail = "full detail" if self.zoom >= ROOM_DETAIL_ZOOM else "overview"
+        self.info_label.config(text=f"{len(self.project.racks)} racks, {len(visible)} drawn | {self.view} | zoom {self.zoom:.0%} ({detail})")
+
+    def _draw_rack(self, rack, origin):
+        z = self.zoom
+        tag = f"room_rack_{id(rack)}"
+        tags = ("room_rack", tag)
+        title = rack.name if z >= ROOM_LABEL_ZOOM else ''
+        width, height, shapes = elevation_shapes(rack.rack_height, rack.views, (self.view,), BASE_DPI * z,
+                                                 titles=(title,), detail=z >= ROOM_DETAIL_ZOOM)
+        ox, oy = origin[0] * z, origin[1] * z
+        for shape in shapes:
+            kind = shape[0]
+            if kind == 'rect':
+                _, x1, y1, x2, y2, fill, outline = shape
+                self.canvas.create_rectangle(ox + x1, oy + y1, ox + x2, oy + y2, fill=fill, outline=outline or '', tags=tags)
+            elif kind == 'line':
+                _, x1, y1, x2, y2, color, w = shape
+                self.canvas.create_line(ox + x1, oy + y1, ox + x2, oy + y2, fill=color, width=max(1, w), tags=tags)
+            elif kind == 'oval':
+                _, x1, y1, x2, y2, fill = shape
+                self.canvas.create_oval(ox + x1, oy + y1, ox + x2, oy + y2, fill=fill, outline='', tags=tags)
+            else:
+                _, x, y, text, color, size, anchor, bold = shape
+                font = ('Arial', -max(1, int(size)), 'bold') if bold else ('Arial', -max(1, int(size)))
+                self.canvas.create_text(ox + x, oy + y, text=text, fill=color, font=font, anchor=anchor, tags=tags)
+        if rack is self.active_rack:
+            self.canvas.create_rectangle(ox + 2, oy + 2, ox + width - 2, oy + height - 2, outline='#4FC3F7', width=2, tags=tags)
+        return tag
+
 
 class RackPlannerApp:
     def __init__(self, root):
@@ -19,51 +841,64 @@ class RackPlannerApp:
         self.root.title("RackPlanner Pro")
         self.root.configure(bg='#2e2e2e')
         
-        self.rack_height = DEFAULT_U
-        self.rack_items = [None] * self.rack_height
-        
-        self.views = {
-            "Front": [],
-            "Rear": []
-        }
+        self.project = RackProject()
+        self.model = self.project.racks[0]
         self.current_view = "Front"
-        self.placed_components_data = self.views[self.current_view]
+        self.room_view = None
+        self.journal = None
+        # Set while the project is a .rackdb file: its racks are loaded on
+        # first use and saves only write what changed.
+        self.store = None
+        self.rpc = None
+        # Project a comparison was made against; while set, changes on the
+        # current rack face are outlined on the canvas.
+        self.diff_base = None
+        self.diff_window = None
+        self.cables = CablePlan(self.project)
+        self.cabling_window = None
 
         self._dragging_component = None
-        self._drag_start_x = 0
-        self._drag_start_y = 0
+        self._drag_offset_y = 0
+        # Drag feedback items are created once and then only moved, recoloured
+        # or hidden; motion events are coalesced into one update per idle pass.
         self._drag_highlight_rects = []
         self._ghost_rect_id = None
         self._ghost_text_id = None
+        self._drag_slot = None
+        self._drag_pending_y = None
+        self._drag_job = None
 
-        self._history = []
-        self._history_index = -1
+        self.history = History()
+        for rack in self.project.racks:
+            self.history.watch(rack)
         
+        self.catalog_index = CatalogIndex()
+        self._palette_filter_job = None
         self.search_var = tk.StringVar()
         self.search_var.trace("w", self.update_palette_filtered)
 
         self.default_categories = {
             "Networking": {
-                "UDM Pro": {"size": 1, "color": "#FFC107", "watts": 50, "weight": 4},
-                "Router": {"size": 1, "color": "#FFC107", "watts": 30, "weight": 2},
-                "Managed Switch": {"size": 1, "color": "#FFC107", "watts": 60, "weight": 4},
-                "PoE Switch": {"size": 1, "color": "#FFC107", "watts": 350, "weight": 5}
+                "UDM Pro": {"size": 1, "color": "#FFC107", "watts": 50, "weight": 4, "ports": {"RJ45": 9, "SFP+": 2, "C14": 1}},
+                "Router": {"size": 1, "color": "#FFC107", "watts": 30, "weight": 2, "ports": {"RJ45": 4, "C14": 1}},
+                "Managed Switch": {"size": 1, "color": "#FFC107", "watts": 60, "weight": 4, "ports": {"RJ45": 24, "SFP+": 4, "C14": 1}},
+                "PoE Switch": {"size": 1, "color": "#FFC107", "watts": 350, "weight": 5, "ports": {"RJ45": 48, "SFP+": 4, "C14": 1}}
             },
             "Servers": {
-                "1U Server": {"size": 1, "color": "#4CAF50", "watts": 250, "weight": 15},
-                "2U Server": {"size": 2, "color": "#4CAF50", "watts": 500, "weight": 25},
-                "4U Server": {"size": 4, "color": "#4CAF50", "watts": 900, "weight": 45}
+                "1U Server": {"size": 1, "color": "#4CAF50", "watts": 250, "weight": 15, "ports": {"RJ45": 2, "C14": 2}},
+                "2U Server": {"size": 2, "color": "#4CAF50", "watts": 500, "weight": 25, "ports": {"RJ45": 4, "C14": 2}},
+                "4U Server": {"size": 4, "color": "#4CAF50", "watts": 900, "weight": 45, "ports": {"RJ45": 4, "C14": 2}}
             },
             "Storage": {
                 "Disk Shelf": {"size": 3, "color": "#9E9E9E", "watts": 300, "weight": 30},
-                "NAS Appliance": {"size": 2, "color": "#9E9E9E", "watts": 100, "weight": 10}
+                "NAS Appliance": {"size": 2, "color": "#9E9E9E", "watts": 100, "weight": 10, "ports": {"RJ45": 2, "C14": 1}}
             },
             "Power": {
-                "UPS": {"size": 2, "color": "#F44336", "watts": 50, "weight": 30},
-                "PDU": {"size": 1, "color": "#F44336", "watts": 0, "weight": 2}
+                "UPS": {"size": 2, "color": "#F44336", "watts": 50, "weight": 30, "ports": {"C13": 6}},
+                "PDU": {"size": 1, "color": "#F44336", "watts": 0, "weight": 2, "ports": {"C13": 8}}
             },
             "Accessories": {
-                "Patch Panel": {"size": 1, "color": "#8BC34A", "watts": 0, "weight": 1},
+                "Patch Panel": {"size": 1, "color": "#8BC34A", "watts": 0, "weight": 1, "ports": {"RJ45": 24}, "patch": True},
                 "Cable Management": {"size": 1, "color": "#8BC34A", "watts": 0, "weight": 0.5},
                 "2U Shelf": {"size": 2, "color": "#8BC34A", "watts": 0, "weight": 3}
             },
@@ -75,9 +910,137 @@ class RackPlannerApp:
         
         self.component_categories = copy.deepcopy(self.default_categories)
 
+        # Catalog files start collapsed and are only parsed when expanded or
+        # searched; headers show the counts cached from earlier runs.
+        self.catalog_store = CatalogStore()
+        self._collapsed = set()
+
+        # Hot-path timings, off unless the Performance panel (F12) is open or
+        # RACKPLANNER_PROFILE names a trace file to write on exit.
+        self.profiler = Profiler()
+        self.perf_panel = None
+        self._perf_probe_job = None
+        self._perf_trace_path = os.environ.get("RACKPLANNER_PROFILE")
+        self._history_size = (None, 0)
+
+        # Only the rack is drawn before the window first paints; catalog
+        # discovery, the palette and autosave recovery follow right after.
+        self.startup_marks = [("imports", STARTUP_IMPORTED)]
         self.setup_ui()
+        self._setup_profiler()
         self._draw_rack_and_components()
         self._record_current_state()
+        self._mark_startup("ui built")
+        self._startup_done = False
+        self.canvas.bind("<Expose>", self._on_first_paint)
+        self.root.after(FIRST_PAINT_TIMEOUT_MS, self._finish_startup)
+
+    def _mark_startup(self, label):
+        self.startup_marks.append((label, time.perf_counter()))
+
+    def _on_first_paint(self, event=None):
+        self.canvas.unbind("<Expose>")
+        self._mark_startup("first paint")
+        self.root.after_idle(self._finish_startup)
+
+    def _finish_startup(self):
+        if self._startup_done: return
+        self._startup_done = True
+        self.catalog_store.discover()
+        self._collapsed = set(self.catalog_store.names())
+        self.update_palette()
+        self._mark_startup("palette ready")
+        self._start_autosave()
+        self._mark_startup("autosave ready")
+        if os.environ.get("RACKPLANNER_RPC_PORT"):
+            self._start_rpc(int(os.environ["RACKPLANNER_RPC_PORT"]))
+        if os.environ.get("RACKPLANNER_STARTUP_REPORT"):
+            print(json.dumps(self.startup_report()), file=sys.stderr)
+
+    def startup_report(self):
+        # Milliseconds since the module started importing, per milestone, plus
+        # the time spent in each step.
+        report, last = {}, STARTUP_T0
+        for label, t in self.startup_marks:
+            report[label] = {"at_ms": round((t - STARTUP_T0) * 1000, 1), "took_ms": round((t - last) * 1000, 1)}
+            last = t
+        report["catalog_files"] = len(self.catalog_store.files)
+        return report
+
+    def _setup_profiler(self):
+        self.profiler.add_target(self, PERF_APP_CALLS, "app")
+        self.profiler.add_target(self.renderer, ("sync",), "renderer")
+        self.profiler.add_target(self.heat_strip, ("sync",), "heat_strip")
+        self.profiler.add_target(self.palette, ("set_rows", "refresh"), "palette")
+        self.profiler.add_target(self.catalog_index, ("search", "rebuild"), "catalog")
+        self.profiler.add_target(self.canvas, PERF_CANVAS_CALLS, "tk.canvas")
+        self.profiler.add_target(self.palette_canvas, PERF_CANVAS_CALLS, "tk.palette")
+        self.profiler.add_gauge("canvas items", lambda: len(self.canvas.find_all()))
+        self.profiler.add_gauge("palette canvas items", lambda: len(self.palette_canvas.find_all()))
+        self.profiler.add_gauge("palette rows", lambda: len(self.palette.rows))
+        self.profiler.add_gauge("components", lambda: sum(len(c) for r in self.project.racks for c in r.views.values()))
+        self.profiler.add_gauge("history entries", lambda: len(self.history))
+        self.profiler.add_gauge("history ops", lambda: self.history.op_count)
+        self.profiler.add_gauge("history bytes", self._history_bytes)
+        self.root.bind("<F12>", self.toggle_perf_panel)
+        if self._perf_trace_path:
+            self._set_profiling(True)
+
+    def _history_bytes(self):
+        # Walking the history is not free, so only redo it after edits.
+        key = (len(self.history), self.history.op_count, self.history.can_redo())
+        if self._history_size[0] != key:
+            self._history_size = (key, self.history.nbytes())
+        return self._history_size[1]
+
+    def _set_profiling(self, on):
+        if on:
+            self.profiler.enable()
+            if not self._perf_probe_job:
+                self._perf_probe()
+        else:
+            self.profiler.disable()
+            if self._perf_probe_job:
+                self.root.after_cancel(self._perf_probe_job)
+                self._perf_probe_job = None
+
+    def _perf_probe(self, due=None):
+        # Time the Tk event loop spends redrawing or blocked shows up as
+        # lateness of this timer.
+        now = time.perf_counter()
+        if due is not None:
+            self.profiler.record("tk.event_loop_lag", due, max(0.0, now - due))
+        self._perf_probe_job = self.root.after(PERF_PROBE_MS, self._perf_probe, now + PERF_PROBE_MS / 1000)
+
+    def toggle_perf_panel(self, event=None):
+        if self.perf_panel:
+            self.perf_panel.close()
+            return
+        self._set_profiling(True)
+        self.perf_panel = PerfPanel(self.root, self.profiler, self._on_perf_panel_closed)
+
+    def _on_perf_panel_closed(self):
+        self.perf_panel = None
+        if not self._perf_trace_path:
+            self._set_profiling(False)
+
+    @property
+    def rack_height(self):
+        return self.model.rack_height
+
+    @property
+    def views(self):
+        return self.model.views
+
+    @property
+    def placed_components_data(self):
+        return self.model.views[self.current_view]
+
+    @property
+    def depth_shadows(self):
+        # Full-depth items mounted on the other face; they block this one too.
+        return [c for view, comps in self.model.views.items() if view != self.current_view
+                for c in comps if c.get('depth') == 'full' and not c.get('rail')]
 
     def setup_ui(self):
         main_frame = tk.Frame(self.root, bg='#2e2e2e')
@@ -98,13 +1061,10 @@ class RackPlannerApp:
         self.palette_scrollbar = tk.Scrollbar(palette_frame, orient="vertical")
         self.palette_scrollbar.pack(side="right", fill="y")
 
-        self.palette_canvas = tk.Canvas(palette_frame, bg='#3c3c3c', highlightthickness=0, yscrollcommand=self.palette_scrollbar.set)
+        self.palette_canvas = tk.Canvas(palette_frame, bg='#3c3c3c', highlightthickness=0, width=PALETTE_WIDTH_PX-20)
         self.palette_canvas.pack(fill=tk.BOTH, expand=True)
-        self.palette_scrollbar.config(command=self.palette_canvas.yview)
-        
-        self.palette_inner_frame = tk.Frame(self.palette_canvas, bg='#3c3c3c')
-        self.palette_canvas.create_window((0, 0), window=self.palette_inner_frame, anchor="nw", width=PALETTE_WIDTH_PX-20)
-        self.palette_inner_frame.bind("<Configure>", lambda e: self.palette_canvas.configure(scrollregion = self.palette_canvas.bbox("all")))
+        self.palette = VirtualPalette(self.palette_canvas, self.palette_scrollbar, self._on_palette_pick,
+                                      PALETTE_WIDTH_PX-20, self._is_custom_category, self._on_palette_toggle)
 
         self.palette_canvas.bind("<Button-4>", self._on_palette_mousewheel)
         self.palette_canvas.bind("<Button-5>", self._on_palette_mousewheel)
@@ -119,6 +1079,9 @@ class RackPlannerApp:
         self.canvas = tk.Canvas(canvas_container, width=RACK_RIGHT_MARGIN + 40, bg='#1e1e1e', highlightthickness=0)
         self.canvas.pack(pady=10, expand=True)
         
+        self.renderer = RackCanvasRenderer(self.canvas, self._on_component_right_click)
+        self.heat_strip = HeatStrip(self.canvas)
+
         self.canvas.bind("<Button-1>", self._start_drag)
         self.canvas.bind("<B1-Motion>", self._drag_motion)
         self.canvas.bind("<ButtonRelease-1>", self._drop)
@@ -133,11 +1096,27 @@ class RackPlannerApp:
         self.rack_size_menu.pack(fill=tk.X, pady=(0, 10))
         self.rack_size_menu.bind("<<ComboboxSelected>>", self.change_rack_size)
 
+        tk.Label(controls, text="Rack:", bg='#2e2e2e', fg='white').pack(anchor='w')
+        self.rack_select_var = tk.StringVar(value=self.model.name)
+        self.rack_select_menu = ttk.Combobox(controls, textvariable=self.rack_select_var, state='readonly')
+        self.rack_select_menu.pack(fill=tk.X, pady=(0, 5))
+        self.rack_select_menu.bind("<<ComboboxSelected>>", lambda e: self._select_rack(self.project.get(self.rack_select_var.get())))
+        rack_btn_frame = tk.Frame(controls, bg='#2e2e2e')
+        rack_btn_frame.pack(fill=tk.X, pady=(0, 5))
+        tk.Button(rack_btn_frame, text="Add Rack", command=self.add_rack, bg='#607D8B', fg='white').pack(side=tk.LEFT, expand=True, fill=tk.X, padx=(0,2))
+        tk.Button(rack_btn_frame, text="Remove Rack", command=self.remove_rack, bg='#607D8B', fg='white').pack(side=tk.RIGHT, expand=True, fill=tk.X, padx=(2,0))
+        room_frame = tk.Frame(controls, bg='#2e2e2e')
+        room_frame.pack(fill=tk.X, pady=(0, 10))
+        tk.Button(room_frame, text="Room View", command=self.open_room_view, bg='#673AB7', fg='white').pack(side=tk.LEFT, expand=True, fill=tk.X, padx=(0,2))
+        tk.Button(room_frame, text="Cabling", command=self.open_cabling, bg='#673AB7', fg='white').pack(side=tk.RIGHT, expand=True, fill=tk.X, padx=(2,0))
+        self._update_rack_selector()
+
         self.view_btn = tk.Button(controls, text="Switch View (Front/Rear)", command=self.toggle_view, bg='#673AB7', fg='white')
         self.view_btn.pack(fill=tk.X, pady=(0, 10))
 
         tk.Button(controls, text="New Custom Item", command=self.add_custom_component, bg='#2196f3', fg='white').pack(fill=tk.X, pady=5)
         tk.Button(controls, text="Import List as Folder", command=self.import_custom_list, bg='#4CAF50', fg='white').pack(fill=tk.X, pady=2)
+        tk.Button(controls, text="Auto-Place BOM", command=self.auto_place_bom, bg='#4CAF50', fg='white').pack(fill=tk.X, pady=2)
         
         tk.Frame(controls, height=5, bg='#2e2e2e').pack()
 
@@ -150,6 +1129,11 @@ class RackPlannerApp:
         self.redo_btn = tk.Button(undo_redo_frame, text="Redo", command=self.redo, bg='#607D8B', fg='white')
         self.redo_btn.pack(side=tk.RIGHT, expand=True, fill=tk.X, padx=(2,0))
 
+        compare_frame = tk.Frame(controls, bg='#2e2e2e')
+        compare_frame.pack(fill=tk.X, pady=5)
+        tk.Button(compare_frame, text="Compare File", command=self.compare_with_file, bg='#795548', fg='white').pack(side=tk.LEFT, expand=True, fill=tk.X, padx=(0,2))
+        tk.Button(compare_frame, text="Compare Undo", command=self.compare_with_history, bg='#795548', fg='white').pack(side=tk.RIGHT, expand=True, fill=tk.X, padx=(2,0))
+
         tk.Frame(controls, height=5, bg='#2e2e2e').pack()
 
         tk.Button(controls, text="Save Project", command=self.save_rack_config, bg='#ff9800', fg='white').pack(fill=tk.X, pady=5)
@@ -166,8 +1150,11 @@ class RackPlannerApp:
         self.power_label.pack(fill=tk.X, padx=5, pady=2)
         self.weight_label = tk.Label(stats_frame, text="Weight: 0 kg", bg='#2e2e2e', fg='#81C784', anchor='w', font=('Arial', 9, 'bold'))
         self.weight_label.pack(fill=tk.X, padx=5, pady=2)
+        self.heat_label = tk.Label(stats_frame, text="Heat: 0 BTU/h", bg='#2e2e2e', fg='#FF8A65', anchor='w', font=('Arial', 9, 'bold'))
+        self.heat_label.pack(fill=tk.X, padx=5, pady=2)
+        self.peak_label = tk.Label(stats_frame, text="Peak: 0 W/U", bg='#2e2e2e', fg='#FF8A65', anchor='w')
+        self.peak_label.pack(fill=tk.X, padx=5, pady=2)
 
-        self.update_palette()
         self._update_undo_redo_buttons()
 
     def toggle_view(self):
@@ -175,296 +1162,602 @@ class RackPlannerApp:
             self.current_view = "Rear"
         else:
             self.current_view = "Front"
-        self.placed_components_data = self.views[self.current_view]
         self.view_label.config(text=f"Rack View: {self.current_view}")
         self._draw_rack_and_components()
 
     def update_palette_filtered(self, *args):
-        self.update_palette()
+        if self._palette_filter_job:
+            self.root.after_cancel(self._palette_filter_job)
+        self._palette_filter_job = self.root.after(SEARCH_DEBOUNCE_MS, self._apply_palette_filter)
 
     def update_palette(self):
-        search_term = self.search_var.get().lower()
-
-        for widget in self.palette_inner_frame.winfo_children():
-            widget.destroy()
-
-        for category_name, category_items in self.component_categories.items():
-            matching_items = {k: v for k, v in category_items.items() if search_term in k.lower()}
-            
-            if not matching_items and search_term not in category_name.lower():
-                continue
-            
-            items_to_show = matching_items if search_term else category_items
-            if search_term and search_term in category_name.lower():
-                items_to_show = category_items
-
-            if items_to_show:
-                header_fg = '#4FC3F7' if category_name not in self.default_categories else 'white'
-                ttk.Label(self.palette_inner_frame, text=f"-- {category_name} --", foreground=header_fg) \
-                    .pack(fill=tk.X, pady=(10,2))
-                
-                for comp_name, comp_info in items_to_show.items():
-                    comp_size = comp_info['size']
-                    comp_color = comp_info['color']
-                    
-                    palette_item_frame = tk.Frame(self.palette_inner_frame, bd=1, relief="solid", bg=comp_color)
-                    palette_item_frame.pack(fill=tk.X, padx=5, pady=2)
-                    
-                    palette_label = tk.Label(palette_item_frame, text=f"{comp_name} ({comp_size}U)", 
-                                             bg=comp_color, fg='black', font=('Arial', 9))
-                    palette_label.pack(side=tk.LEFT, padx=5, pady=2)
-
-                    handler = lambda e, n=comp_name, s=comp_size, c=comp_color, i=comp_info: \
-                              self._place_component_from_palette(n, s, c, i)
-                    
-                    palette_item_frame.bind("<Button-1>", handler)
-                    palette_label.bind("<Button-1>", handler)
-
-        self.palette_inner_frame.update_idletasks()
-        self.palette_canvas.configure(scrollregion=self.palette_canvas.bbox("all"))
+        self.catalog_index.rebuild(self._palette_categories())
+        self._apply_palette_filter()
+
+    def _is_custom_category(self, category_name):
+        return category_name not in self.default_categories and category_name not in self.catalog_store.files
+
+    def _palette_order(self):
+        return list(self.component_categories) + [n for n in self.catalog_store.names() if n not in self.component_categories]
+
+    def _palette_categories(self):
+        # Project categories first; a loaded catalog file with the same name
+        # as one of them is hidden.
+        categories = dict(self.component_categories)
+        for name in self.catalog_store.names():
+            if name not in categories and self.catalog_store.is_loaded(name):
+                categories[name] = self.catalog_store.load(name)
+        return categories
+
+    def _index_catalog(self, name):
+        if name not in self.component_categories:
+            self.catalog_index.add_category(name, self.catalog_store.load(name))
+
+    def _load_catalogs(self):
+        # Loads and indexes every catalog file not loaded yet; True if there
+        # were any.
+        missing = [n for n in self.catalog_store.names() if not self.catalog_store.is_loaded(n)]
+        if missing:
+            self.catalog_store.load_all()
+            for name in missing:
+                if self.catalog_store.is_loaded(name):
+                    self._index_catalog(name)
+        return bool(missing)
+
+    def _all_categories(self):
+        if self._load_catalogs():
+            self._apply_palette_filter(keep_scroll=True)
+        return self._palette_categories()
+
+    def _apply_palette_filter(self, keep_scroll=False):
+        self._palette_filter_job = None
+        text = self.search_var.get()
+        searching = any(parse_query(text))
+        if searching:
+            self._load_catalogs()
+
+        # Search results come best first; categories are listed in the order
+        # of their best match, or in palette order when not searching.
+        by_category = {}
+        for entry_id in self.catalog_index.search(text):
+            category_name, comp_name, comp_info = self.catalog_index.entries[entry_id]
+            by_category.setdefault(category_name, []).append(('item', category_name, comp_name, comp_info))
+
+        rows = []
+        for category_name in (list(by_category) if searching else self._palette_order()):
+            items = by_category.get(category_name, [])
+            loaded = category_name in self.component_categories or self.catalog_store.is_loaded(category_name)
+            if loaded and not items: continue
+            collapsed = category_name in self._collapsed and not searching
+            rows.append(('header', category_name, len(items) if loaded else self.catalog_store.count(category_name), collapsed))
+            if not collapsed:
+                rows.extend(items)
+        self.palette.set_rows(rows, keep_scroll)
+
+    def _on_palette_toggle(self, category_name):
+        if any(parse_query(self.search_var.get())): return
+        if category_name not in self._collapsed:
+            self._collapsed.add(category_name)
+        else:
+            self._collapsed.discard(category_name)
+            if category_name not in self.component_categories and not self.catalog_store.is_loaded(category_name):
+                try:
+                    self.catalog_store.load(category_name)
+                except (OSError, ValueError) as e:
+                    self.catalog_store.files.pop(category_name, None)
+                    self._apply_palette_filter(keep_scroll=True)
+                    messagebox.showerror("Catalog", f"{category_name}: {e}"); return
+                self._index_catalog(category_name)
+        self._apply_palette_filter(keep_scroll=True)
+
+    def _on_palette_pick(self, comp_name, comp_info):
+        self._place_component_from_palette(comp_name, comp_info['size'], comp_info['color'], comp_info)
 
     def _place_component_from_palette(self, comp_name, comp_size, comp_color, comp_info):
-        placed = False
-        self._sync_rack_items()
-        
-        for start_u_slot in range(1, self.rack_height - comp_size + 2):
-            if self.is_slot_available(start_u_slot, comp_size):
-                new_comp_data = {
-                    'name': comp_name,
-                    'start_u_slot': start_u_slot,
-                    'size_u': comp_size,
-                    'color': comp_color,
-                    'watts': comp_info.get('watts', 0),
-                    'weight': comp_info.get('weight', 0)
-                }
-                self.placed_components_data.append(new_comp_data)
-                self._render_single_component(new_comp_data)
-                self._sync_rack_items()
-                self.update_stats()
-                self._record_current_state()
-                placed = True
-                break
-        
-        if not placed:
+        comp_info = dict(comp_info, size=comp_size, color=comp_color)
+        new_comp_data = self.model.place(self.current_view, comp_name, comp_info)
+
+        if new_comp_data:
+            self._draw_rack_and_components()
+            self.update_stats()
+            self._record_current_state()
+        else:
             messagebox.showerror("No Space", f"Cannot place '{comp_name}' ({comp_size}U). No space available.")
 
     def _draw_rack_and_components(self):
-        self.canvas.delete("all")
-        self.rack_items = [None] * self.rack_height
-
-        total_h = U_HEIGHT * self.rack_height
-        self.canvas.config(height=total_h)
+        self.renderer.sync(self.rack_height, self.placed_components_data, self.depth_shadows)
+        self.heat_strip.sync(self.model, self.current_view)
+        self.update_stats()
+        if self.diff_base is not None:
+            self._draw_diff_overlay()
+        if self.room_view:
+            self.room_view.refresh()
+        if self.cabling_window:
+            self.cabling_window.refresh()
+
+    def _draw_diff_overlay(self):
+        # Solid outline where a changed device is now, dashed where a moved
+        # or removed one was. Overlay items are disabled so clicks reach the
+        # components underneath.
+        self.canvas.delete("diff_overlay")
+        diff = diff_racks(self.model.name, self.diff_base.get(self.model.name), self.model)
+        if diff is None: return
+        for change in diff["changes"]:
+            if change["view"] != self.current_view: continue
+            color = DIFF_COLORS[change["change"]]
+            if change["change"] in ("moved", "removed"):
+                start = change["from"] if change["change"] == "moved" else change["start_u_slot"]
+                x1, y1, x2, y2 = self.renderer.component_bounds({'start_u_slot': start, 'size_u': change['size_u']})
+                self.canvas.create_rectangle(x1, y1, x2, y2, outline=color, width=2, dash=(4, 3), state='disabled', tags="diff_overlay")
+            if change["change"] != "removed":
+                x1, y1, x2, y2 = self.renderer.component_bounds(change)
+                self.canvas.create_rectangle(x1, y1, x2, y2, outline=color, width=3, state='disabled', tags="diff_overlay")
+        self.canvas.tag_raise("diff_overlay")
+
+    def compare_with_file(self):
+        file_path = filedialog.askopenfilename(filetypes=PROJECT_FILETYPES)
+        if not file_path: return
+        try:
+            base = load_project(file_path)
+        except Exception as e:
+            messagebox.showerror("Compare", f"{e}"); return
+        # Stubs of a .rackdb would otherwise diff as empty racks.
+        self._load_all_racks()
+        self._show_diff(base, os.path.basename(file_path))
+
+    def compare_with_history(self):
+        if not self.history.can_undo():
+            messagebox.showinfo("Compare", "There are no earlier states to compare with."); return
+        steps = simpledialog.askinteger("Compare", "Compare with the layout how many undo steps back?", minvalue=1, initialvalue=1)
+        if not steps: return
+        self._load_all_racks()
+        base = build_project(parse_project(project_data(self.project)))
+        steps = self.history.rewind(steps, dict(zip(self.project.racks, base.racks)))
+        self._show_diff(base, f"{steps} undo step{'s' if steps != 1 else ''} back")
+
+    def _show_diff(self, base, label):
+        if self.diff_window:
+            self.diff_window.close()
+        self.diff_base = base
+        self.diff_window = DiffWindow(self.root, diff_projects(base, self.project), label, self.clear_diff)
+        self._draw_rack_and_components()
 
-        self.canvas.create_rectangle(RACK_LEFT_MARGIN, 0, RACK_RIGHT_MARGIN, total_h, fill='#282828', outline='#555555', width=0)
+    def clear_diff(self):
+        self.diff_base = None
+        self.diff_window = None
+        self.canvas.delete("diff_overlay")
 
-        for i in range(self.rack_height):
-            y = i * U_HEIGHT
-            self.canvas.create_line(RACK_LEFT_MARGIN, y, RACK_RIGHT_MARGIN, y, fill='#444444', width=1)
-            self.canvas.create_text(15, y + U_HEIGHT // 2, anchor='center', fill='#888888', text=f"{self.rack_height - i}")
-            
-            for j in [1, 2, 3]:
-                hole_y = y + (j * U_HEIGHT / 4)
-                self.canvas.create_oval(RACK_LEFT_MARGIN + 5, hole_y - 2, RACK_LEFT_MARGIN + 9, hole_y + 2, fill="#111111", outline="")
-                self.canvas.create_oval(RACK_RIGHT_MARGIN - 9, hole_y - 2, RACK_RIGHT_MARGIN - 5, hole_y + 2, fill="#111111", outline="")
+    def _update_rack_selector(self):
+        self.rack_select_menu.config(values=[r.name for r in self.project.racks])
+        self.rack_select_var.set(self.model.name)
 
-        self.canvas.create_line(RACK_LEFT_MARGIN, 0, RACK_LEFT_MARGIN, total_h, fill='#555555', width=2)
-        self.canvas.create_line(RACK_RIGHT_MARGIN, 0, RACK_RIGHT_MARGIN, total_h, fill='#555555', width=2)
-        self.canvas.create_line(RACK_LEFT_MARGIN, total_h, RACK_RIGHT_MARGIN, total_h, fill='#555555', width=1)
+    def _ensure_loaded(self, rack):
+        if self.store: self.store.load_rack(rack)
 
-        for comp_data in self.placed_components_data:
-            self._render_single_component(comp_data)
-        
-        self._sync_rack_items()
-        self.update_stats()
+    def _load_all_racks(self):
+        for rack in self.project.racks:
+            self._ensure_loaded(rack)
 
-    def _render_single_component(self, comp_data):
-        start_index_0_based_top = self.rack_height - (comp_data['start_u_slot'] + comp_data['size_u'] - 1)
-        y1 = start_index_0_based_top * U_HEIGHT
-        y2 = y1 + comp_data['size_u'] * U_HEIGHT
-        
-        color_hex = comp_data.get('color', 'skyblue')
-        
-        if len(color_hex) == 7:
-            r, g, b = int(color_hex[1:3], 16), int(color_hex[3:5], 16), int(color_hex[5:7], 16)
-            text_color = 'white' if (0.299*r + 0.587*g + 0.114*b)/255 < 0.5 else 'black'
-        else:
-            text_color = 'black'
+    def _select_rack(self, rack):
+        if rack is None or rack is self.model: return
+        self._ensure_loaded(rack)
+        self._cancel_drag()
+        self.model = rack
+        self.renderer.clear_components()
+        self.rack_size_var.set(self.rack_height)
+        self._update_rack_selector()
+        if self.room_view:
+            self.room_view.active_rack = rack
+        self._draw_rack_and_components()
 
-        rect = self.canvas.create_rectangle(RACK_LEFT_MARGIN + 2, y1 + 1, RACK_RIGHT_MARGIN - 2, y2 - 1, 
-                                            fill=color_hex, outline='#333333', width=1, tags="component_item")
-        text = self.canvas.create_text(RACK_LEFT_MARGIN + RACK_WIDTH_PX // 2, (y1 + y2) // 2, 
-                                        fill=text_color, font=('Arial', 9, 'bold'), text=comp_data['name'], tags="component_item")
+    def _set_project(self, project, store=None):
+        if self.store and self.store is not store:
+            self.store.close()
+        self.store = store
+        for rack in self.project.racks:
+            self.history.unwatch(rack)
+            if self.journal: self.journal.unwatch(rack)
+        self.history.clear()
+        if self.cabling_window:
+            self.cabling_window.close()
+        self.project = project
+        self.cables = CablePlan(project)
+        for rack in project.racks:
+            self.history.watch(rack)
+            if self.journal: self.journal.watch(rack)
+        self.model = None
+        self.current_view = "Front"
+        self.view_label.config(text=f"Rack View: {self.current_view}")
+        if self.room_view:
+            self.room_view.project = project
+        self._select_rack(project.racks[0])
+        self._update_undo_redo_buttons()
+        self._autosave_now()
 
-        comp_data['rect_id'] = rect
-        comp_data['text_id'] = text
+    def _apply_project_categories(self, project):
+        if project["component_categories"] is not None:
+            self.component_categories = project["component_categories"]
+        else:
+            self.component_categories = copy.deepcopy(self.default_categories)
+            if project["custom_components"] is not None:
+                self.component_categories["Custom"] = project["custom_components"]
+        self.update_palette()
 
-        self.canvas.tag_bind(rect, '<Button-3>', lambda e, data=comp_data: self.delete_component_on_click(e, data))
-        self.canvas.tag_bind(text, '<Button-3>', lambda e, data=comp_data: self.delete_component_on_click(e, data))
+    def _start_autosave(self):
+        try:
+            recovered = recover_project()
+        except Exception:
+            recovered = None
+        if recovered and messagebox.askyesno("Recover", "RackPlanner did not shut down cleanly. Recover autosaved work?"):
+            project, data = recovered
+            self._apply_project_categories(data)
+            self._set_project(project)
+        self.journal = Journal()
+        for rack in self.project.racks:
+            self.journal.watch(rack)
+        self._autosave_now()
+        self.root.after(AUTOSAVE_INTERVAL_MS, self._autosave_tick)
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+
+    def _autosave_capture(self):
+        categories = {name: dict(items) for name, items in self.component_categories.items()}
+        data = project_data(self.project, categories)
+        return self.store.fill_project_data(data) if self.store else data
+
+    def _journal_capture(self):
+        # Like _autosave_capture, but racks of an open .rackdb that were never
+        # loaded are left in the file instead of being read for every snapshot.
+        categories = {name: dict(items) for name, items in self.component_categories.items()}
+        data = project_data(self.project, categories)
+        return self.store.mark_stored_racks(data) if self.store else data
+
+    def _autosave_now(self):
+        if self.journal:
+            self.journal.compact(self._journal_capture, force=True)
+
+    def _autosave_tick(self):
+        self.journal.compact(self._journal_capture)
+        self.root.after(AUTOSAVE_INTERVAL_MS, self._autosave_tick)
+
+    def _on_close(self):
+        if self.journal:
+            self.journal.close(discard=True)
+        if self.rpc:
+            self.rpc.stop()
+        if self.store:
+            self.store.close()
+        if self._perf_trace_path:
+            try:
+                self.profiler.write_chrome_trace(self._perf_trace_path)
+            except OSError as e:
+                print(f"Could not write trace: {e}", file=sys.stderr)
+        self.root.destroy()
+
+    @contextmanager
+    def batch(self, rack=None):
+        # Scripting entry point: edits to `rack` (default: the one on screen)
+        # inside the block are one validated transaction, one undo step and
+        # one redraw.
+        #     with app.batch() as rack:
+        #         rack.move(rack.get(3), 10)
+        #         rack.remove(rack.get(7))
+        rack = rack or self.model
+        self._ensure_loaded(rack)
+        self._cancel_drag()
+        with self.history.group():
+            with rack.transaction():
+                yield rack
+        self._draw_rack_and_components()
+        self._update_undo_redo_buttons()
 
-    def _sync_rack_items(self):
-        self.rack_items = [None] * self.rack_height
-        for comp_data in self.placed_components_data:
-            start_index_0_based_top = self.rack_height - (comp_data['start_u_slot'] + comp_data['size_u'] - 1)
-            for i in range(start_index_0_based_top, start_index_0_based_top + comp_data['size_u']):
-                if 0 <= i < self.rack_height:
-                    self.rack_items[i] = comp_data['name']
+    def _start_rpc(self, port):
+        from rack_rpc import RpcServer
+        try:
+            self.rpc = RpcServer({
+                "list_racks": self._rpc_list_racks,
+                "get_rack": self._rpc_get_rack,
+                "apply": self._rpc_apply,
+                "add_rack": self._rpc_add_rack,
+                "cables": self._rpc_cables,
+                "connect": self._rpc_connect,
+                "disconnect": self._rpc_disconnect,
+            }, port).start()
+        except OSError as e:
+            print(f"JSON-RPC server not started on port {port}: {e}", file=sys.stderr); return
+        self._rpc_poll()
+
+    def _rpc_poll(self):
+        self.rpc.pump()
+        self.root.after(BACKGROUND_POLL_MS, self._rpc_poll)
+
+    def _rpc_rack(self, name):
+        from rack_rpc import RpcError, INVALID_PARAMS
+        rack = self.project.get(name) if name is not None else self.model
+        if rack is None:
+            raise RpcError(INVALID_PARAMS, f"No rack named {name!r}.")
+        self._ensure_loaded(rack)
+        return rack
+
+    def _rpc_list_racks(self):
+        from rack_rpc import rack_summary
+        self._load_all_racks()
+        return [rack_summary(r) for r in self.project.racks]
+
+    def _rpc_get_rack(self, rack=None):
+        from rack_rpc import rack_detail
+        return rack_detail(self._rpc_rack(rack))
+
+    def _rpc_apply(self, ops, rack=None):
+        from rack_rpc import apply_ops, rack_summary
+        model = self._rpc_rack(rack)
+        with self.batch(model):
+            added = apply_ops(model, ops)
+        return {"added": added, "rack": rack_summary(model)}
+
+    def _rpc_cables(self):
+        from rack_rpc import cable_report
+        self._load_all_racks()
+        return cable_report(self.cables)
+
+    def _rpc_connect(self, links):
+        from rack_rpc import connect_links
+        self._load_all_racks()
+        added = connect_links(self.cables, links)
+        self._on_cabling_changed()
+        return {"added": added}
+
+    def _rpc_disconnect(self, indexes):
+        from rack_rpc import RpcError, INVALID_PARAMS
+        connections = self.cables.connections
+        if not all(isinstance(i, int) and 0 <= i < len(connections) for i in indexes):
+            raise RpcError(INVALID_PARAMS, "indexes must be connection positions as listed by 'cables'.")
+        for conn in [connections[i] for i in set(indexes)]:
+            self.cables.disconnect(conn)
+        self._on_cabling_changed()
+        return len(connections)
+
+    def _rpc_add_rack(self, name=None, rack_height=DEFAULT_U, row=0):
+        rack = self.project.add_rack(name, int(rack_height), int(row))
+        self._watch_new_rack(rack)
+        self._update_rack_selector()
+        self._autosave_now()
+        if self.room_view: self.room_view.refresh()
+        return rack.name
+
+    def _run_in_background(self, work, on_done, on_poll=None):
+        result = {}
+        def target():
+            try: result['value'] = work()
+            except Exception as e: result['error'] = e
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        def poll():
+            if thread.is_alive():
+                if on_poll: on_poll()
+                self.root.after(BACKGROUND_POLL_MS, poll); return
+            on_done(result.get('value'), result.get('error'))
+        self.root.after(BACKGROUND_POLL_MS, poll)
+
+    def add_rack(self):
+        name = simpledialog.askstring("Add Rack", "Rack Name:", initialvalue=self.project.unique_name())
+        if not name: return
+        row = simpledialog.askinteger("Add Rack", "Row:", minvalue=0, initialvalue=self.model.row)
+        if row is None: return
+        try:
+            rack = self.project.add_rack(name, self.rack_height, row)
+        except ValueError as e:
+            messagebox.showerror("Add Rack", f"{e}"); return
+        self.history.watch(rack)
+        if self.journal: self.journal.watch(rack)
+        self._select_rack(rack)
+        self._autosave_now()
+
+    def remove_rack(self):
+        if len(self.project.racks) == 1:
+            messagebox.showerror("Remove Rack", "A project needs at least one rack."); return
+        cables = sum(1 for c in self.project.connections if self.model.name in (c["a"]["rack"], c["b"]["rack"]))
+        extra = f" and its {cables} cable{'s' if cables != 1 else ''}" if cables else ""
+        if not messagebox.askyesno("Remove Rack", f"Remove '{self.model.name}' and everything in it{extra}?"): return
+        rack = self.model
+        index = self.project.racks.index(rack)
+        self.project.remove_rack(rack)
+        self.history.forget(rack)
+        if self.journal: self.journal.unwatch(rack)
+        self._select_rack(self.project.racks[min(index, len(self.project.racks) - 1)])
+        if self.cabling_window: self.cabling_window.refresh()
+        self._update_undo_redo_buttons()
+        self._autosave_now()
+
+    def open_room_view(self):
+        if self.room_view:
+            self.room_view.window.lift(); return
+        self.room_view = RoomView(self.root, self.project, self._select_rack, self._on_room_view_closed, self._ensure_loaded)
+        self.room_view.active_rack = self.model
+        self.room_view.refresh(force=True)
+
+    def _on_room_view_closed(self):
+        self.room_view = None
+
+    def open_cabling(self):
+        if self.cabling_window:
+            self.cabling_window.window.lift(); return
+        self._load_all_racks()
+        self.cabling_window = CablingWindow(self.root, self.cables, self._on_cabling_changed, self._on_cabling_closed)
+
+    def _on_cabling_changed(self):
+        # Connections are not part of undo history; the journal snapshot
+        # keeps them safe.
+        if self.cabling_window:
+            self.cabling_window.refresh()
+        self._autosave_now()
+
+    def _on_cabling_closed(self):
+        self.cabling_window = None
+
+    def _on_component_right_click(self, event, uid):
+        comp_data = self.model.get(uid)
+        if comp_data is not None:
+            self.delete_component_on_click(event, comp_data)
 
     def update_stats(self):
-        occupied_slots = set()
-        for comp in self.placed_components_data:
-            start_index_0_based_top = self.rack_height - (comp['start_u_slot'] + comp['size_u'] - 1)
-            for i in range(start_index_0_based_top, start_index_0_based_top + comp['size_u']):
-                if 0 <= i < self.rack_height:
-                    occupied_slots.add(i)
-        
-        self.used_u_label.config(text=f"Used: {len(occupied_slots)}")
+        conflict = self.model.has_overlaps(self.current_view)
+        self.used_u_label.config(text=f"Used: {self.model.used_u(self.current_view)}" + (" (conflicts)" if conflict else ""),
+                                 fg='#EF9A9A' if conflict else 'white')
         
-        total_watts = 0
-        total_weight = 0
-        for comp in self.views["Front"] + self.views["Rear"]:
-            total_watts += comp.get('watts', 0)
-            total_weight += comp.get('weight', 0)
-
-        self.power_label.config(text=f"Power: {total_watts} W")
-        self.weight_label.config(text=f"Weight: {total_weight} kg")
+        total_watts = self.model.total_watts()
+        self.power_label.config(text=f"Power: {round(total_watts, 2):g} W")
+        self.weight_label.config(text=f"Weight: {round(self.model.total_weight(), 2):g} kg")
+        self.heat_label.config(text=f"Heat: {total_watts * BTU_PER_WATT:.0f} BTU/h")
+        peak, peak_u = self.heat_strip.peak()
+        self.peak_label.config(text=f"Peak: {peak:.0f} W/U" + (f" at U{peak_u}" if peak else ""))
 
     def _record_current_state(self):
-        current_state = {
-            'rack_height': self.rack_height,
-            'views': copy.deepcopy(self.views),
-            'current_view_name': self.current_view
-        }
-        self._history = self._history[:self._history_index + 1]
-        self._history.append(current_state)
-        self._history_index = len(self._history) - 1
+        self.history.checkpoint()
         self._update_undo_redo_buttons()
 
-    def _load_state_from_history(self, state_data):
-        self.rack_height = state_data['rack_height']
+    def _show_history_change(self, change):
+        if change is None: return
+        rack, view = change
+        if rack is not self.model:
+            self._select_rack(rack)
         self.rack_size_var.set(self.rack_height)
-        self.views = copy.deepcopy(state_data['views'])
-        self.current_view = state_data.get('current_view_name', 'Front')
-        self.placed_components_data = self.views[self.current_view]
-        self.view_label.config(text=f"Rack View: {self.current_view}")
+        if view and view != self.current_view:
+            self.current_view = view
+            self.view_label.config(text=f"Rack View: {self.current_view}")
         self._draw_rack_and_components()
         self._update_undo_redo_buttons()
 
     def _update_undo_redo_buttons(self):
-        self.undo_btn.config(state=tk.NORMAL if self._history_index > 0 else tk.DISABLED)
-        self.redo_btn.config(state=tk.NORMAL if self._history_index < len(self._history) - 1 else tk.DISABLED)
+        self.undo_btn.config(state=tk.NORMAL if self.history.can_undo() else tk.DISABLED)
+        self.redo_btn.config(state=tk.NORMAL if self.history.can_redo() else tk.DISABLED)
 
     def undo(self):
-        if self._history_index > 0:
-            self._history_index -= 1
-            self._load_state_from_history(self._history[self._history_index])
+        self._show_history_change(self.history.undo())
+
     def redo(self):
-        if self._history_index < len(self._history) - 1:
-            self._history_index += 1
-            self._load_state_from_history(self._history[self._history_index])
+        self._show_history_change(self.history.redo())
 
     def _start_drag(self, event):
-        self._dragging_component = None
-        self._clear_highlights()
-        self._clear_ghost()
+        self._cancel_drag()
 
         if event.widget == self.canvas:
-            closest_item_ids = self.canvas.find_closest(event.x, event.y)
-            if not closest_item_ids: return
-
-            clicked_item_id = closest_item_ids[0]
-            for comp_data in self.placed_components_data:
-                if comp_data.get('rect_id') == clicked_item_id or comp_data.get('text_id') == clicked_item_id:
-                    self._dragging_component = comp_data
-                    
-                    start_index_0_based_top = self.rack_height - (self._dragging_component['start_u_slot'] + self._dragging_component['size_u'] - 1)
-                    for i in range(start_index_0_based_top, start_index_0_based_top + self._dragging_component['size_u']):
-                        if 0 <= i < self.rack_height: self.rack_items[i] = None
-                    
-                    self.canvas.itemconfig(self._dragging_component['rect_id'], state='hidden')
-                    self.canvas.itemconfig(self._dragging_component['text_id'], state='hidden')
-
-                    original_coords = self.canvas.coords(comp_data['rect_id'])
-                    x1, y1, x2, y2 = original_coords
-
-                    self._ghost_rect_id = self.canvas.create_rectangle(x1, y1, x2, y2, fill=self._dragging_component['color'], outline='gray', stipple='gray50', width=2)
-                    self._ghost_text_id = self.canvas.create_text((x1+x2)/2, (y1+y2)/2, fill='black', font=('Arial', 10, 'bold'), text=self._dragging_component['name'])
-                    break
-        
-        if self._dragging_component:
-            self._drag_start_x = event.x 
-            self._drag_start_y = event.y
+            current = self.canvas.find_withtag('current')
+            uid = self.renderer.uid_at(current[0]) if current else None
+            comp_data = self.model.get(uid) if uid is not None else None
+            if comp_data is None or self.model.view_of(comp_data) != self.current_view: return
+
+            self._dragging_component = comp_data
+            x1, y1, x2, y2 = self.renderer.component_coords(comp_data)
+            self.renderer.show_component(comp_data, False)
+            self._show_ghost(comp_data, x1, y1, x2, y2)
+            # Where in the item it was grabbed, so it moves with the pointer
+            # instead of its top jumping to it.
+            self._drag_offset_y = event.y - (self.rack_height - (comp_data['start_u_slot'] + comp_data['size_u'] - 1)) * U_HEIGHT
 
     def _drag_motion(self, event):
         if self._dragging_component:
-            self._clear_highlights()
-            target_u = int(event.y / U_HEIGHT)
-            size_u = self._dragging_component['size_u']
-            start_u = self.rack_height - (target_u + size_u - 1)
-            start_u = max(1, min(start_u, self.rack_height - size_u + 1))
-            
-            is_valid = self.is_slot_available(start_u, size_u)
-
-            snapped_top_y = (self.rack_height - (start_u + size_u - 1)) * U_HEIGHT
-            self.canvas.coords(self._ghost_rect_id, RACK_LEFT_MARGIN, snapped_top_y, RACK_RIGHT_MARGIN, snapped_top_y + size_u * U_HEIGHT)
-            self.canvas.coords(self._ghost_text_id, RACK_LEFT_MARGIN + RACK_WIDTH_PX // 2, snapped_top_y + (size_u * U_HEIGHT)/2)
-            self._highlight_slots(start_u, size_u, is_valid)
+            self._drag_pending_y = event.y
+            if self._drag_job is None:
+                self._drag_job = self.root.after_idle(self._apply_drag_motion)
+
+    def _drag_target(self, y):
+        # Whole-U items snap to whole U, half-U items to half U.
+        size_u = self._dragging_component['size_u']
+        step = 1 if size_u == int(size_u) else SUBSLOTS
+        top = round((y - self._drag_offset_y) * step / U_HEIGHT) / step
+        start_u = self.rack_height - (top + size_u - 1)
+        return as_u(max(1, min(start_u, self.rack_height - size_u + 1)))
+
+    def _apply_drag_motion(self):
+        self._drag_job = None
+        if not self._dragging_component or self._drag_pending_y is None: return
+        start_u = self._drag_target(self._drag_pending_y)
+        if start_u == self._drag_slot: return
+        self._drag_slot = start_u
+
+        size_u = self._dragging_component['size_u']
+        is_valid = self.is_slot_available(start_u, size_u, ignore=self._dragging_component)
+        x1, y1, x2, y2 = self.renderer.component_bounds(dict(self._dragging_component, start_u_slot=start_u))
+        self.canvas.coords(self._ghost_rect_id, x1, y1, x2, y2)
+        self.canvas.coords(self._ghost_text_id, (x1 + x2) / 2, (y1 + y2) / 2)
+        self._highlight_slots(start_u, size_u, is_valid)
 
     def _drop(self, event):
         if self._dragging_component:
-            if not self._ghost_rect_id:
+            if self._drag_job:
+                self.root.after_cancel(self._drag_job)
+                self._drag_job = None
+            self._drag_pending_y = event.y
+            start_u = self._drag_target(event.y)
+            comp_data = self._dragging_component
+
+            if start_u == comp_data['start_u_slot']:
                 self._cancel_drag()
-                return
-
-            ghost_y = self.canvas.coords(self._ghost_rect_id)[1]
-            size_u = self._dragging_component['size_u']
-            start_u = self.rack_height - (int(ghost_y / U_HEIGHT) + size_u - 1)
-            start_u = max(1, min(start_u, self.rack_height - size_u + 1))
-
-            if self.is_slot_available(start_u, size_u):
-                self._dragging_component['start_u_slot'] = start_u
+            elif self.is_slot_available(start_u, comp_data['size_u'], ignore=comp_data):
+                self._end_drag()
+                self.model.move(comp_data, start_u)
                 self._draw_rack_and_components()
                 self._record_current_state()
             else:
                 self._cancel_drag()
-            
-            self._clear_highlights()
-            self._clear_ghost()
-            self._dragging_component = None
+
+    def _end_drag(self):
+        if self._drag_job:
+            self.root.after_cancel(self._drag_job)
+            self._drag_job = None
+        self.renderer.show_component(self._dragging_component)
+        self._clear_highlights()
+        self._clear_ghost()
+        self._dragging_component = None
+        self._drag_slot = None
+        self._drag_pending_y = None
 
     def _cancel_drag(self):
         if self._dragging_component:
-            self.canvas.itemconfig(self._dragging_component['rect_id'], state='normal')
-            self.canvas.itemconfig(self._dragging_component['text_id'], state='normal')
-            self._sync_rack_items()
-            self._clear_highlights()
-            self._clear_ghost()
-            self._dragging_component = None
-
-    def is_slot_available(self, start_u_slot, size_u):
-        start_index = self.rack_height - (start_u_slot + size_u - 1)
-        if start_index < 0 or start_index + size_u > self.rack_height: return False
-        for i in range(start_index, start_index + size_u):
-            if self.rack_items[i] is not None: return False
-        return True
-    
+            self._end_drag()
+
+    def is_slot_available(self, start_u_slot, size_u, ignore=None):
+        return self.model.is_slot_available(self.current_view, start_u_slot, size_u, ignore=ignore)
+
+    def _show_ghost(self, comp_data, x1, y1, x2, y2):
+        if self._ghost_rect_id is None:
+            self._ghost_rect_id = self.canvas.create_rectangle(x1, y1, x2, y2, outline='gray', stipple='gray50', width=2)
+            self._ghost_text_id = self.canvas.create_text((x1+x2)/2, (y1+y2)/2, fill='black', font=('Arial', 10, 'bold'))
+        self.canvas.coords(self._ghost_rect_id, x1, y1, x2, y2)
+        self.canvas.coords(self._ghost_text_id, (x1+x2)/2, (y1+y2)/2)
+        self.canvas.itemconfig(self._ghost_rect_id, fill=comp_data['color'], state='normal')
+        self.canvas.itemconfig(self._ghost_text_id, text=comp_data['name'], state='normal')
+        self.canvas.tag_raise("drag_highlight")
+        self.canvas.tag_raise(self._ghost_rect_id)
+        self.canvas.tag_raise(self._ghost_text_id)
+
     def _highlight_slots(self, start_u_slot, size_u, is_valid):
-        self._clear_highlights()
         color = '#A5D6A7' if is_valid else '#EF9A9A'
-        start_index = max(0, self.rack_height - (start_u_slot + size_u - 1))
-        end_index = min(self.rack_height, start_index + size_u)
-
-        for i in range(start_index, end_index):
-            y1 = i * U_HEIGHT
-            self._drag_highlight_rects.append(self.canvas.create_rectangle(RACK_LEFT_MARGIN, y1, RACK_RIGHT_MARGIN, y1 + U_HEIGHT, fill=color, stipple='gray50', outline=color))
-        if self._ghost_rect_id: self.canvas.tag_raise(self._ghost_rect_id); self.canvas.tag_raise(self._ghost_text_id)
+        top = self.rack_height - (start_u_slot + size_u - 1)
+        start_index = max(0, int(top))
+        end_index = min(self.rack_height, math.ceil(top + size_u))
+
+        while len(self._drag_highlight_rects) < end_index - start_index:
+            self._drag_highlight_rects.append(self.canvas.create_rectangle(0, 0, 0, 0, stipple='gray50', state='hidden', tags="drag_highlight"))
+            self.canvas.tag_raise(self._ghost_rect_id)
+            self.canvas.tag_raise(self._ghost_text_id)
+        for n, rect_id in enumerate(self._drag_highlight_rects):
+            i = start_index + n
+            if i < end_index:
+                # Half-U items only light up the half they would take.
+                y1, y2 = max(i, top) * U_HEIGHT, min(i + 1, top + size_u) * U_HEIGHT
+                self.canvas.coords(rect_id, RACK_LEFT_MARGIN, y1, RACK_RIGHT_MARGIN, y2)
+                self.canvas.itemconfig(rect_id, fill=color, outline=color, state='normal')
+            else:
+                self.canvas.itemconfig(rect_id, state='hidden')
 
     def _clear_highlights(self):
-        for rect_id in self._drag_highlight_rects: self.canvas.delete(rect_id)
-        self._drag_highlight_rects = []
-    
+        for rect_id in self._drag_highlight_rects: self.canvas.itemconfig(rect_id, state='hidden')
+
     def _clear_ghost(self):
-        if self._ghost_rect_id: self.canvas.delete(self._ghost_rect_id); self._ghost_rect_id = None
-        if self._ghost_text_id: self.canvas.delete(self._ghost_text_id); self._ghost_text_id = None
+        if self._ghost_rect_id:
+            self.canvas.itemconfig(self._ghost_rect_id, state='hidden')
+            self.canvas.itemconfig(self._ghost_text_id, state='hidden')
 
     def _on_palette_mousewheel(self, event):
         if event.num == 4 or event.delta > 0: self.palette_canvas.yview_scroll(-1, "units")
@@ -473,98 +1766,198 @@ class RackPlannerApp:
     def add_custom_component(self):
         name = simpledialog.askstring("New", "Component Name:")
         if not name: return
-        size = simpledialog.askinteger("New", "Size (U):", minvalue=1, maxvalue=self.rack_height)
+        size = simpledialog.askfloat("New", "Size (U, halves allowed):", minvalue=0.5, maxvalue=self.rack_height)
         if not size: return
+        try:
+            size = as_u(size)
+        except ValueError as e:
+            messagebox.showerror("New", f"{e}"); return
+        mounting = simpledialog.askstring("New", "Mounting: half or full depth, or Left/Right for a 0U side-rail item:", initialvalue="half")
+        if not mounting: return
+        mounting = mounting.strip().lower()
+        if mounting not in DEPTHS and mounting.capitalize() not in RAILS:
+            messagebox.showerror("New", f"Unknown mounting '{mounting}'."); return
         watts = simpledialog.askinteger("New", "Power (W):", minvalue=0, initialvalue=0) or 0
         weight = simpledialog.askfloat("New", "Weight (kg):", minvalue=0.0, initialvalue=0.0) or 0
+        ports = simpledialog.askstring("New", "Ports, e.g. RJ45:24, SFP+:2 (empty for none):")
+        try:
+            ports = parse_ports(ports) if ports and ports.strip() else None
+        except ValueError as e:
+            messagebox.showerror("New", f"{e}"); return
+        patch = bool(ports) and messagebox.askyesno("New", "Is it a patch panel (ports wired through to the rear)?")
         color = colorchooser.askcolor()[1] or 'skyblue'
 
         self.component_categories["Custom"][name] = {"size": size, "color": color, "watts": watts, "weight": weight}
-        self.update_palette()
+        if mounting == 'full':
+            self.component_categories["Custom"][name]['depth'] = 'full'
+        elif mounting.capitalize() in RAILS:
+            self.component_categories["Custom"][name]['rail'] = mounting.capitalize()
+        if ports:
+            self.component_categories["Custom"][name]['ports'] = ports
+        if patch:
+            self.component_categories["Custom"][name]['patch'] = True
+        self.catalog_index.add_entry("Custom", name, self.component_categories["Custom"][name])
+        self._apply_palette_filter(keep_scroll=True)
+        self._autosave_now()
 
     def import_custom_list(self):
-        file_path = filedialog.askopenfilename(filetypes=[("JSON files", "*.json")])
+        from rack_catalog_import import ImportCancelled, import_catalog, write_report
+        file_path = filedialog.askopenfilename(filetypes=[("Catalogs", "*.json *.jsonl *.ndjson *.csv *.tsv"), ("All files", "*.*")])
         if not file_path: return
 
-        category_name = os.path.splitext(os.path.basename(file_path))[0]
+        # Parsing, validation and writing the catalog files happen on a worker
+        # thread; the dialog polls its progress.
+        cancel = threading.Event()
+        state = {'progress': (0, 1, 0)}
+        dialog = ProgressDialog(self.root, "Importing Catalog", cancel.set)
+
+        def work():
+            categories, report = import_catalog(file_path, on_progress=lambda *a: state.update(progress=a), cancel=cancel)
+            self.catalog_store.check_new(categories)
+            saved = [self.catalog_store.write_catalog(name, items) + (items,) for name, items in categories.items()]
+            return saved, report
+
+        def poll():
+            done, total, rows = state['progress']
+            dialog.update(done / total if total else 1, f"{rows:,} rows read ({done / total:.0%})" if total else "")
+
+        def finished(result, error):
+            dialog.close()
+            if isinstance(error, ImportCancelled): return
+            if error:
+                messagebox.showerror("Import Error", f"{error}"); return
+            saved, report = result
+            for name, path, digest, items in saved:
+                self.catalog_store.register(name, path, items, digest)
+                self.component_categories.pop(name, None)
+                self._collapsed.discard(name)
+                self.catalog_index.add_category(name, items)
+            self._apply_palette_filter()
+            self._autosave_now()
+
+            message = f"Imported {report['imported']:,} of {report['rows']:,} rows into: {', '.join(n for n, _, _, _ in saved) or 'nothing'}"
+            if report['duplicates']:
+                message += f"\n{report['duplicates']:,} duplicate names replaced earlier rows."
+            if not report['error_count']:
+                messagebox.showinfo("Imported", message); return
+            examples = "\n".join(f"Row {e['row']}: {e['error']}" for e in report['errors'][:5])
+            if messagebox.askyesno("Imported", f"{message}\n{report['error_count']:,} rows were rejected, e.g.\n{examples}\n\nSave a report of the rejected rows?"):
+                report_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")])
+                if report_path: write_report(report, report_path)
+
+        self._run_in_background(work, finished, poll)
+
+    def _watch_new_rack(self, rack):
+        self.history.watch(rack)
+        if self.journal: self.journal.watch(rack)
+
+    def auto_place_bom(self):
+        from rack_solver import resolve_bom, rack_capacity, solve, apply_solution
+        file_path = filedialog.askopenfilename(filetypes=[("JSON files", "*.json")])
+        if not file_path: return
 
         try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-            
-            if not isinstance(data, dict):
-                raise ValueError("JSON must be a dictionary.")
-
-            self.component_categories[category_name] = data
-            self.update_palette()
-            messagebox.showinfo("Imported", f"Created new palette folder: {category_name}")
-            
+            with open(file_path, 'r') as f: devices = resolve_bom(json.load(f), self._all_categories())
         except Exception as e:
-            messagebox.showerror("Import Error", f"{e}")
+            messagebox.showerror("Auto-Place", f"{e}"); return
+
+        power_cap = simpledialog.askfloat("Auto-Place", "Power budget per rack (W), 0 for none:", minvalue=0.0, initialvalue=0.0)
+        if power_cap is None: return
+        weight_cap = simpledialog.askfloat("Auto-Place", "Weight budget per rack (kg), 0 for none:", minvalue=0.0, initialvalue=0.0)
+        if weight_cap is None: return
+        spare = simpledialog.askinteger("Auto-Place", "Racks the solver may add if needed:", minvalue=0, initialvalue=0)
+        if spare is None: return
+        self._load_all_racks()
+
+        racks = list(self.project.racks)
+        capacities = [rack_capacity(r, self.current_view) for r in racks]
+        capacities += [{'rack_height': self.rack_height, 'occupied': {}, 'watts': 0, 'weight': 0, 'new': True} for _ in range(spare)]
+
+        self.root.config(cursor="watch")
+        self.root.update_idletasks()
+        try:
+            solution = solve(devices, capacities, power_cap or None, weight_cap or None,
+                             workers=min(4, os.cpu_count() or 1), view=self.current_view)
+            with self.history.group():
+                apply_solution(self.project, racks, solution, self.current_view, self.rack_height,
+                               self.model.row, on_new_rack=self._watch_new_rack)
+        except Exception as e:
+            messagebox.showerror("Auto-Place", f"{e}"); return
+        finally:
+            self.root.config(cursor="")
+
+        self._update_rack_selector()
+        self._draw_rack_and_components()
+        self._update_undo_redo_buttons()
+        self._autosave_now()
+        summary = f"Placed {len(solution['placements'])} of {len(devices)} devices in {solution['racks_used']} racks."
+        if solution['unplaced']:
+            messagebox.showwarning("Auto-Place", f"{summary}\n{len(solution['unplaced'])} devices did not fit.")
+        else:
+            messagebox.showinfo("Auto-Place", summary)
 
     def save_rack_config(self):
-        file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON files", "*.json")])
+        file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=PROJECT_FILETYPES)
         if not file_path: return
+        if is_store_path(file_path):
+            self._save_to_store(file_path); return
 
-        save_data = {
-            "version": "3.0",
-            "rack_height": self.rack_height,
-            "views": self.views,
-            "component_categories": self.component_categories
-        }
-        
-        for view in save_data['views'].values():
-            for c in view: c.pop('rect_id', None); c.pop('text_id', None)
+        save_data = self._autosave_capture()
+
+        def done(_, error):
+            if error: messagebox.showerror("Error", f"{error}")
+            else: messagebox.showinfo("Saved", "Project saved.")
+        self._run_in_background(lambda: write_project(file_path, save_data), done)
 
+    def _save_to_store(self, file_path):
+        # Saving to the open .rackdb only writes changed rows; any other
+        # target is written in full to a fresh file.
+        categories = {name: dict(items) for name, items in self.component_categories.items()}
         try:
-            with open(file_path, 'w') as f: json.dump(save_data, f, indent=4)
+            if not (self.store and os.path.exists(file_path) and os.path.samefile(self.store.path, file_path)):
+                self._load_all_racks()
+                if os.path.exists(file_path): os.remove(file_path)
+                store = ProjectStore(file_path)
+                if self.store: self.store.close()
+                self.store = store
+            self.store.save(self.project, categories)
             messagebox.showinfo("Saved", "Project saved.")
         except Exception as e: messagebox.showerror("Error", f"{e}")
 
     def load_rack_config(self):
-        file_path = filedialog.askopenfilename(filetypes=[("JSON files", "*.json")])
+        file_path = filedialog.askopenfilename(filetypes=PROJECT_FILETYPES)
         if not file_path: return
 
-        try:
-            with open(file_path, 'r') as f: data = json.load(f)
-
-            self.rack_height = data.get("rack_height", DEFAULT_U)
-            self.rack_size_var.set(self.rack_height)
-            
-            if "component_categories" in data:
-                self.component_categories = data["component_categories"]
-            else:
-                self.component_categories = copy.deepcopy(self.default_categories)
-                if "custom_components" in data:
-                    self.component_categories["Custom"] = data["custom_components"]
+        if is_store_path(file_path):
+            try:
+                store = ProjectStore(file_path)
+                try:
+                    project, categories = store.open()
+                except Exception:
+                    store.close(); raise
+                self._apply_project_categories({"component_categories": categories, "custom_components": None})
+                self._set_project(project, store)
+                messagebox.showinfo("Loaded", "Project loaded.")
+            except Exception as e: messagebox.showerror("Error", f"{e}")
+            return
 
-            self.update_palette()
+        try:
+            with open(file_path, 'r') as f: project = parse_project(json.load(f))
 
-            if "views" in data:
-                self.views = data["views"]
-            else:
-                self.views = {"Front": data.get("placed_components", []), "Rear": []}
-            
-            self.current_view = "Front"
-            self.placed_components_data = self.views[self.current_view]
-            self.view_label.config(text=f"Rack View: {self.current_view}")
-            
-            self._draw_rack_and_components()
-            self._record_current_state()
+            self._apply_project_categories(project)
+            self._set_project(build_project(project))
             messagebox.showinfo("Loaded", "Project loaded.")
         except Exception as e: messagebox.showerror("Error", f"{e}")
 
     def delete_component_on_click(self, event, component_data):
         if messagebox.askyesno("Delete", f"Delete '{component_data['name']}'?"):
-            self.canvas.delete(component_data['rect_id'])
-            self.canvas.delete(component_data['text_id'])
-            self.placed_components_data.remove(component_data)
+            self.model.remove(component_data)
             self._draw_rack_and_components()
             self._record_current_state()
 
     def clear_rack(self):
         if messagebox.askyesno("Clear", f"Clear {self.current_view} view?"):
-            self.placed_components_data.clear()
+            self.model.clear(self.current_view)
             self._draw_rack_and_components()
             self._record_current_state()
 
@@ -573,20 +1966,27 @@ class RackPlannerApp:
         if new_height < self.rack_height:
              if not messagebox.askyesno("Warning", "Shrinking rack may remove items."):
                  self.rack_size_var.set(self.rack_height); return
-        self.rack_height = new_height
-        for view in self.views.values():
-            view[:] = [c for c in view if c['start_u_slot'] + c['size_u'] - 1 <= self.rack_height]
+        self.model.set_height(new_height)
         self._draw_rack_and_components()
         self._record_current_state()
 
     def export_canvas_as_image(self):
-        self.canvas.update_idletasks()
-        x = self.root.winfo_x() + self.canvas.winfo_x() + 20
-        y = self.root.winfo_y() + self.canvas.winfo_y() + 50
-        file_path = filedialog.asksaveasfilename(defaultextension=".png", filetypes=[("PNG files", "*.png")])
-        if file_path:
-            try: ImageGrab.grab(bbox=(x, y, x + self.canvas.winfo_width(), y + self.canvas.winfo_height())).save(file_path); messagebox.showinfo("Saved", f"Image saved.")
-            except Exception as e: messagebox.showerror("Error", f"{e}")
+        file_path = filedialog.asksaveasfilename(defaultextension=".png", filetypes=[
+            ("PNG files", "*.png"), ("SVG files", "*.svg"), ("PDF book, all racks", "*.pdf")])
+        if not file_path: return
+        if file_path.lower().endswith(".pdf"):
+            self.export_book(file_path); return
+        try: render_elevation(self.rack_height, self.views, file_path); messagebox.showinfo("Saved", f"Image saved.")
+        except Exception as e: messagebox.showerror("Error", f"{e}")
+
+    def export_book(self, file_path):
+        # One page per rack with its legend; the racks are captured here and
+        # the pages written in the background.
+        racks = parse_project(self._autosave_capture())["racks"]
+        def done(pages, error):
+            if error: messagebox.showerror("Error", f"{error}")
+            else: messagebox.showinfo("Saved", f"Book saved ({pages} pages).")
+        self._run_in_background(lambda: write_book(racks, file_path), done)
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+# Reproducible timings for the model, catalog search, history, persistence,
+# export and (when a display is available) the Tk app, on synthetic data.
+# Results are JSON so runs can be diffed:
+#
+#   python benchmarks/bench_rack.py -o before.json
+#   python benchmarks/bench_rack.py -o after.json --compare before.json
+#
+# GUI benchmarks use $DISPLAY, or start Xvfb if it is installed; otherwise
+# they are reported as skipped.
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from rack_catalog import CatalogIndex
+from rack_export import elevation_shapes, render_svg, write_book
+from rack_history import History
+from rack_io import build_project, project_data, read_project, write_project
+from rack_model import VIEWS, RackModel, RackProject
+
+RACK_HEIGHTS = (4, 12, 24, 42, 48)
+CATALOG_SIZES = (10, 1000, 10000, 100000)
+WORDS = ("switch", "server", "storage", "router", "firewall", "patch", "panel", "ups", "pdu", "shelf",
+         "chassis", "blade", "array", "gateway", "controller", "appliance", "node", "gpu", "edge", "core")
+VENDORS = ("Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark", "Wayne", "Tyrell")
+QUERIES = ("switch", "acme server", "stor 2u", "swtich", "size:2 watts<500", "node gpu", "zzz")
+
+
+def make_catalog(n, rng):
+    categories = {}
+    for i in range(n):
+        vendor = VENDORS[i % len(VENDORS)]
+        name = f"{vendor} {rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {i}"
+        categories.setdefault(vendor, {})[name] = {
+            "size": rng.choice((1, 1, 1, 2, 2, 4)),
+            "color": "#%06x" % rng.randrange(1 << 24),
+            "watts": rng.randrange(0, 1200, 10),
+            "weight": rng.randrange(1, 60),
+        }
+    return categories
+
+
+def make_ops(rack_height, n, rng):
+    # ('place', view, size, watts) / ('move', pick, target) / ('remove', pick)
+    ops = []
+    for _ in range(n):
+        r = rng.random()
+        if r < 0.5:
+            ops.append(('place', rng.choice(VIEWS), rng.choice((1, 1, 2, 2, 4)), rng.randrange(0, 800, 10)))
+        elif r < 0.85:
+            ops.append(('move', rng.random(), rng.randint(1, rack_height)))
+        else:
+            ops.append(('remove', rng.random()))
+    return ops
+
+
+def apply_ops(model, ops, on_change=None):
+    counts = {'place': 0, 'move': 0, 'remove': 0, 'full': 0}
+    for op in ops:
+        if op[0] == 'place':
+            if model.place(op[1], "Item", {"size": op[2], "watts": op[3], "weight": 5}) is None:
+                counts['full'] += 1
+                continue
+        else:
+            comps = [c for v in model.views.values() for c in v]
+            if not comps:
+                continue
+            comp = comps[int(op[1] * len(comps))]
+            if op[0] == 'move':
+                if not model.is_slot_available(model.view_of(comp), op[2], comp['size_u'], ignore=comp):
+                    continue
+                model.move(comp, op[2])
+            else:
+                model.remove(comp)
+        counts[op[0]] += 1
+        if on_change:
+            on_change()
+    return counts
+
+
+def make_project(racks, rack_height, fill, rng):
+    project = RackProject([])
+    for r in range(racks):
+        model = project.add_rack(f"Rack {r + 1}", rack_height, row=r // 10)
+        for view in VIEWS:
+            while model.used_u(view) < rack_height * fill:
+                if model.place(view, f"Device {rng.randrange(10**6)}", {"size": rng.choice((1, 2)), "watts": 100, "weight": 10}) is None:
+                    break
+    return project
+
+
+def timed(fn, repeat):
+    # Returns (per-run seconds, last result); a fresh fn() setup is the
+    # caller's job.
+    times, result = [], None
+    for _ in range(repeat):
+        gc.collect()
+        t = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t)
+    return times, result
+
+
+def record(results, name, times, ops=None, **extra):
+    entry = {"runs": len(times), "best_s": min(times), "median_s": statistics.median(times)}
+    if ops:
+        entry["ops"] = ops
+        entry["best_us_per_op"] = min(times) / ops * 1e6
+    entry.update(extra)
+    results[name] = entry
+    print(f"{name:48s} {entry['best_s'] * 1000:10.2f} ms" + (f"  {entry['best_us_per_op']:8.2f} us/op" if ops else ""), file=sys.stderr)
+
+
+def bench_model(results, args):
+    for h in RACK_HEIGHTS:
+        ops = make_ops(h, args.ops, random.Random(args.seed + h))
+        times, counts = timed(lambda: apply_ops(RackModel(h), ops), args.repeat)
+        record(results, f"model/ops/{h}U", times, len(ops), counts=counts)
+
+        model = RackModel(h)
+        apply_ops(model, ops[:len(ops) // 2])
+        probes = [(VIEWS[i % 2], 1 + i % h, 1 + i % 4) for i in range(args.ops * 10)]
+        times, _ = timed(lambda: [model.is_slot_available(v, s, z) for v, s, z in probes], args.repeat)
+        record(results, f"model/is_slot_available/{h}U", times, len(probes))
+
+
+def bench_catalog(results, args):
+    for n in CATALOG_SIZES:
+        if args.quick and n > 10000:
+            continue
+        categories = make_catalog(n, random.Random(args.seed + n))
+        times, index = timed(lambda: CatalogIndex(categories), max(1, args.repeat // 2))
+        record(results, f"catalog/build/{n}", times, n)
+        for q in QUERIES:
+            times, hits = timed(lambda: index.search(q), args.repeat)
+            record(results, f"catalog/search/{n}/{q}", times, hits=len(hits))
+        extra = make_catalog(1000, random.Random(args.seed + n + 1))
+        extra = {f"{k} extra": v for k, v in extra.items()}
+        times, _ = timed(lambda: [index.add_category(k, v) for k, v in extra.items()], 1)
+        record(results, f"catalog/add_1000/{n}", times, 1000)
+
+
+def bench_history(results, args):
+    for h in (12, 42):
+        ops = make_ops(h, args.ops, random.Random(args.seed + 100 + h))
+
+        def run():
+            model, history = RackModel(h), History()
+            history.watch(model)
+            apply_ops(model, ops, history.checkpoint)
+            return model, history
+
+        times, (model, history) = timed(run, args.repeat)
+        record(results, f"history/record/{h}U", times, len(ops), entries=len(history), op_count=history.op_count)
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        model, history = run()
+        retained = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        results[f"history/record/{h}U"]["retained_bytes"] = retained
+
+        def undo_redo():
+            n = 0
+            while history.can_undo():
+                history.undo()
+                n += 1
+            while history.can_redo():
+                history.redo()
+            return n
+
+        times, steps = timed(undo_redo, 1)
+        record(results, f"history/undo_redo_all/{h}U", times, max(1, 2 * steps))
+
+
+def bench_persistence(results, args):
+    rng = random.Random(args.seed + 200)
+    with tempfile.TemporaryDirectory() as tmp:
+        for racks, h in ((1, 42), (20, 42), (200, 48)):
+            if args.quick and racks > 20:
+                continue
+            project = make_project(racks, h, 0.8, rng)
+            path = os.path.join(tmp, f"p{racks}.json")
+            items = sum(len(c) for r in project.racks for c in r.views.values())
+
+            times, _ = timed(lambda: write_project(path, project_data(project)), args.repeat)
+            record(results, f"persist/save/{racks}x{h}U", times, items, bytes=os.path.getsize(path))
+            times, loaded = timed(lambda: build_project(read_project(path)), args.repeat)
+            record(results, f"persist/load/{racks}x{h}U", times, items)
+            assert sum(len(c) for r in loaded.racks for c in r.views.values()) == items
+
+
+def bench_export(results, args):
+    project = make_project(1, 48, 0.9, random.Random(args.seed + 300))
+    rack = project.racks[0]
+    times, (_, _, shapes) = timed(lambda: elevation_shapes(rack.rack_height, rack.views), args.repeat)
+    record(results, "export/shapes/48U", times, shapes=len(shapes))
+    with tempfile.TemporaryDirectory() as tmp:
+        times, _ = timed(lambda: render_svg(rack.rack_height, rack.views, os.path.join(tmp, "r.svg")), args.repeat)
+        record(results, "export/svg/48U", times)
+        racks = 20 if args.quick else 200
+        room = project_data(make_project(racks, 42, 0.8, random.Random(args.seed + 301)))["racks"]
+        path = os.path.join(tmp, "room.pdf")
+        times, _ = timed(lambda: write_book(room, path), args.repeat)
+        record(results, f"export/pdf-book/{racks}x42U", times, racks, bytes=os.path.getsize(path))
+
+
+def start_display():
+    # Returns (display available, Xvfb process or None, reason).
+    try:
+        import tkinter
+    except ImportError as e:
+        return False, None, f"tkinter unavailable: {e}"
+    if os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin"):
+        return True, None, None
+    if not shutil.which("Xvfb"):
+        return False, None, "no $DISPLAY and Xvfb is not installed"
+    display = f":{90 + os.getpid() % 100}"
+    proc = subprocess.Popen(["Xvfb", display, "-screen", "0", "1600x1200x24", "-nolisten", "tcp"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.environ["DISPLAY"] = display
+    for _ in range(50):
+        try:
+            tkinter.Tk().destroy()
+            return True, proc, None
+        except tkinter.TclError:
+            time.sleep(0.1)
+    proc.terminate()
+    return False, None, "Xvfb did not start"
+
+
+def bench_gui(results, args):
+    ok, xvfb, reason = start_display()
+    if not ok:
+        results["gui"] = {"skipped": reason}
+        print(f"{'gui':48s} skipped: {reason}", file=sys.stderr)
+        return
+    tmp = tempfile.mkdtemp()
+    os.environ["RACKPLANNER_AUTOSAVE_DIR"] = os.path.join(tmp, "autosave")
+    os.environ["RACKPLANNER_CACHE_DIR"] = os.path.join(tmp, "cache")
+    os.environ["RACKPLANNER_CATALOG_PATH"] = ""
+    try:
+        import tkinter as tk
+        import RackBuilder
+        root = tk.Tk()
+        root.withdraw()
+        app = RackBuilder.RackPlannerApp(root)
+        app._finish_startup()
+        root.update()
+
+        for h in (12, 42):
+            for view in VIEWS:
+                app.model.clear(view)
+            app.model.set_height(h)
+            app.history.clear()
+            info = {"size": 1, "color": "#4CAF50", "watts": 100, "weight": 5}
+
+            def place_all():
+                n = 0
+                while app.model.first_free(app.current_view, 1):
+                    app._place_component_from_palette("Bench", 1, info["color"], info)
+                    n += 1
+                return n
+
+            times, placed = timed(place_all, 1)
+            record(results, f"gui/place_from_palette/{h}U", times, placed)
+
+            def redraw():
+                app.renderer.clear_components()
+                app._draw_rack_and_components()
+                root.update_idletasks()
+
+            times, _ = timed(redraw, args.repeat)
+            record(results, f"gui/full_redraw/{h}U", times, items=len(app.placed_components_data))
+
+            times, _ = timed(lambda: [app._record_current_state() for _ in range(100)], args.repeat)
+            record(results, f"gui/record_current_state/{h}U", times, 100, history_entries=len(app.history))
+
+        for n in CATALOG_SIZES:
+            if args.quick and n > 10000:
+                continue
+            app.component_categories = make_catalog(n, random.Random(args.seed + n))
+            times, _ = timed(lambda: (app.update_palette(), root.update_idletasks()), max(1, args.repeat // 2))
+            record(results, f"gui/update_palette/{n}", times, n)
+        app._on_close()
+    finally:
+        if xvfb:
+            xvfb.terminate()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    print(f"\n{'benchmark':48s} {'before':>10s} {'after':>10s} {'change':>8s}", file=sys.stderr)
+    for name, entry in results.items():
+        old = baseline.get(name)
+        if not old or "best_s" not in entry or "best_s" not in old:
+            continue
+        change = entry["best_s"] / old["best_s"] - 1 if old["best_s"] else 0
+        print(f"{name:48s} {old['best_s'] * 1000:8.2f}ms {entry['best_s'] * 1000:8.2f}ms {change:+8.1%}", file=sys.stderr)
+
+
+SUITES = {
+    "model": bench_model,
+    "catalog": bench_catalog,
+    "history": bench_history,
+    "persist": bench_persistence,
+    "export": bench_export,
+    "gui": bench_gui,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "-C", ROOT, "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="RackPlanner benchmarks.")
+    parser.add_argument("-o", "--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--only", action="append", choices=sorted(SUITES), help="run only these suites")
+    parser.add_argument("--quick", action="store_true", help="skip the largest data sets")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--ops", type=int, default=5000, help="operations per model/history sequence")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.only or SUITES:
+        SUITES[name](results, args)
+
+    out = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    text = json.dumps(out, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
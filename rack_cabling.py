@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# Port-level cabling. Catalog items list their ports by type ("ports":
+# {"RJ45": 48, "SFP+": 4}, named "RJ45 1" ... "SFP+ 4"); patch panels are
+# marked "patch": true and every port has a front and a rear side wired
+# through. Connections live in the project (RackProject.connections) and name
+# both ends by rack, item uid and port. Lengths are computed for all
+# connections in one pass, routes between devices are found over the trunks
+# between patch panels, and the bill of materials groups cables by type and
+# stock length.
+import heapq
+import math
+import re
+from bisect import bisect_left
+
+U_HEIGHT_M = 0.04445
+RACK_PITCH_M = 0.6   # centre to centre of neighbouring racks in a row
+ROW_PITCH_M = 2.4    # between rows: rack depth plus aisle
+TRAY_RISE_M = 0.3    # from the top of a rack up to the overhead tray
+SLACK_M = 0.5        # service loop and dressing, per cable
+STOCK_LENGTHS_M = (0.5, 1, 1.5, 2, 3, 5, 7, 10, 15, 20, 30, 50)
+DAC_MAX_M = 5        # passive copper; longer runs need active optical cables
+# Power cords join an outlet to an inlet; every other port joins its own type.
+MATES = {"C13": "C14", "C14": "C13", "C19": "C20", "C20": "C19"}
+CABLE_TYPES = {
+    "RJ45": "Cat6", "SFP+": "SFP+ DAC", "SFP28": "SFP28 DAC", "QSFP28": "QSFP28 DAC", "OSFP": "OSFP DAC",
+    "LC": "LC-LC OM4", "XLR": "XLR", "C13": "C13-C14 power", "C14": "C13-C14 power",
+    "C19": "C19-C20 power", "C20": "C19-C20 power",
+}
+PORT_SPEC_RE = re.compile(r"^([A-Za-z0-9+\-]+)\s*[:=x]\s*(\d+)$")
+
+
+def parse_ports(value):
+    # {port type: count} from a dict or a "RJ45:48, SFP+:4" string. Raises
+    # ValueError for anything else.
+    if isinstance(value, dict):
+        specs = list(value.items())
+    else:
+        specs = []
+        for part in re.split(r"[,;\s]+", str(value).strip()):
+            m = PORT_SPEC_RE.match(part)
+            if not m:
+                raise ValueError(f"ports must look like 'RJ45:48, SFP+:4': {value!r}")
+            specs.append(m.groups())
+    ports = {}
+    for kind, count in specs:
+        kind = str(kind).strip().upper()
+        if isinstance(count, bool) or not kind or ' ' in kind:
+            raise ValueError(f"bad port type {kind!r}")
+        try:
+            count = int(count)
+        except (TypeError, ValueError):
+            raise ValueError(f"port count for {kind} is not a number: {count!r}") from None
+        if count < 1:
+            raise ValueError(f"port count for {kind} must be positive")
+        ports[kind] = ports.get(kind, 0) + count
+    return ports
+
+
+def port_names(comp):
+    return [f"{kind} {n}" for kind, count in (comp.get('ports') or {}).items() for n in range(1, count + 1)]
+
+
+def port_type(comp, port, side="front"):
+    # Type of a named port of an item, or None if it has no such port. Only
+    # patch panels have a rear side.
+    if side != "front" and not (side == "rear" and comp.get('patch')):
+        return None
+    kind, _, n = str(port).rpartition(' ')
+    count = (comp.get('ports') or {}).get(kind)
+    if count and n.isdigit() and 1 <= int(n) <= count:
+        return kind
+    return None
+
+
+def mates(a, b):
+    return a == b or MATES.get(a) == b
+
+
+def endpoint(rack, uid, port, side="front"):
+    end = {"rack": rack, "uid": uid, "port": port}
+    if side != "front":
+        end["side"] = side
+    return end
+
+
+def end_key(end):
+    return end["rack"], end["uid"], end["port"], end.get("side", "front")
+
+
+def stock_length(m):
+    # Shortest stock cable at least m long; runs past the longest are cut to
+    # the next whole metre.
+    i = bisect_left(STOCK_LENGTHS_M, m - 1e-9)
+    return STOCK_LENGTHS_M[i] if i < len(STOCK_LENGTHS_M) else math.ceil(m)
+
+
+class CablePlan:
+    # The connections of a RackProject, a list of {"a": end, "b": end} dicts
+    # with optional "cable" and "label", plus the lookups to validate,
+    # measure and route them. Connections whose item is gone are kept, not
+    # dropped: undo brings the item back under the same uid. `distances`
+    # overrides the tray run between two racks, {(rack, rack): metres}.
+    def __init__(self, project, distances=None):
+        self.project = project
+        self.distances = {frozenset(pair): m for pair, m in (distances or {}).items()}
+        self._used = None
+        self._used_key = None
+        self._trunks_key = None
+        self._trunks = {}
+
+    @property
+    def connections(self):
+        return self.project.connections
+
+    def invalidate(self):
+        # Call after editing project.connections other than through the plan.
+        self._used = None
+        self._trunks_key = None
+
+    def _racks(self):
+        return {rack.name: rack for rack in self.project.racks}
+
+    def _used_ports(self):
+        key = (id(self.connections), len(self.connections))
+        if self._used is None or key != self._used_key:
+            self._used, self._used_key = {}, key
+            for conn in self.connections:
+                for side in ("a", "b"):
+                    self._used.setdefault(end_key(conn[side]), conn)
+        return self._used
+
+    def is_free(self, end):
+        return end_key(end) not in self._used_ports()
+
+    def connections_of(self, rack, uid):
+        return [c for c in self.connections if any(c[s]["rack"] == rack and c[s]["uid"] == uid for s in ("a", "b"))]
+
+    def resolve(self, end, racks=None):
+        # (rack, item) of an end, or (rack, None) / (None, None) when gone.
+        rack = (racks or self._racks()).get(end["rack"])
+        return rack, rack.get(end["uid"]) if rack else None
+
+    def _end_problem(self, end, racks):
+        rack, comp = self.resolve(end, racks)
+        if comp is None:
+            return "missing_item", None
+        kind = port_type(comp, end["port"], end.get("side", "front"))
+        if kind is None:
+            return "unknown_port", None
+        return None, kind
+
+    def check(self, a, b):
+        # Raises ValueError when a and b cannot be connected.
+        racks = self._racks()
+        kinds = []
+        for end in (a, b):
+            problem, kind = self._end_problem(end, racks)
+            if problem == "missing_item":
+                raise ValueError(f"No item {end['uid']!r} in rack {end['rack']!r}.")
+            if problem == "unknown_port":
+                raise ValueError(f"{self.resolve(end, racks)[1]['name']!r} has no port {end['port']!r}"
+                                 + (f" on the {end['side']} side." if end.get('side') else "."))
+            if not self.is_free(end):
+                raise ValueError(f"Port {end['port']!r} of {self.resolve(end, racks)[1]['name']!r} is already connected.")
+            kinds.append(kind)
+        if end_key(a) == end_key(b):
+            raise ValueError("A port cannot be connected to itself.")
+        if not mates(*kinds):
+            raise ValueError(f"Cannot connect a {kinds[0]} port to a {kinds[1]} port.")
+
+    def connect(self, a, b, cable=None, label=None):
+        self.check(a, b)
+        conn = {"a": dict(a), "b": dict(b)}
+        if cable: conn["cable"] = cable
+        if label: conn["label"] = label
+        self._add(conn)
+        return conn
+
+    def _add(self, conn):
+        used = self._used_ports()
+        self.connections.append(conn)
+        used[end_key(conn["a"])] = used[end_key(conn["b"])] = conn
+        self._used_key = (id(self.connections), len(self.connections))
+        if conn["a"].get("side") == conn["b"].get("side") == "rear":
+            self._trunks_key = None
+
+    def disconnect(self, conn):
+        self.connections.remove(conn)
+        self.invalidate()
+
+    def problems(self):
+        # [{"type", "connection": index, ...}] for ends that no longer resolve,
+        # ports an item does not have, ports used twice and mismatched types.
+        racks, seen, problems = self._racks(), {}, []
+        for n, conn in enumerate(self.connections):
+            kinds = []
+            for side in ("a", "b"):
+                end = conn[side]
+                problem, kind = self._end_problem(end, racks)
+                if problem:
+                    problems.append({"type": problem, "connection": n, "end": end})
+                key = end_key(end)
+                if key in seen:
+                    problems.append({"type": "port_in_use", "connection": n, "end": end, "other": seen[key]})
+                seen.setdefault(key, n)
+                kinds.append(kind)
+            if None not in kinds and not mates(*kinds):
+                problems.append({"type": "mismatch", "connection": n, "ports": kinds})
+        return problems
+
+    def rack_positions(self):
+        # Floor position (x, y) in metres of each rack: racks in order along
+        # their row, rows ROW_PITCH_M apart by row number.
+        return {rack.name: (i * RACK_PITCH_M, row * ROW_PITCH_M)
+                for row, racks in self.project.rows() for i, rack in enumerate(racks)}
+
+    def lengths(self, connections=None):
+        # Cable length in metres for each connection (None where an end does
+        # not resolve). Ends are gathered into flat per-end lists first and
+        # every length comes out of a single pass over them: within a rack a
+        # cable runs between the item centres, between racks it goes up to
+        # the tray, along it and down again.
+        connections = self.connections if connections is None else connections
+        racks, positions = self._racks(), self.rack_positions()
+        names, heights, tops, xs, ys = [], [], [], [], []
+        for conn in connections:
+            for side in ("a", "b"):
+                rack, comp = self.resolve(conn[side], racks)
+                if comp is None:
+                    names.append(None); heights.append(0.0); tops.append(0.0); xs.append(0.0); ys.append(0.0)
+                    continue
+                x, y = positions[rack.name]
+                names.append(rack.name)
+                heights.append((comp['start_u_slot'] - 1 + comp['size_u'] / 2) * U_HEIGHT_M)
+                tops.append(rack.rack_height * U_HEIGHT_M)
+                xs.append(x)
+                ys.append(y)
+        distances = self.distances
+        return [None if ra is None or rb is None
+                else round(abs(ha - hb) + SLACK_M, 2) if ra == rb
+                else round((ta - ha) + (tb - hb) + 2 * TRAY_RISE_M + SLACK_M
+                           + distances.get(frozenset((ra, rb)), abs(xa - xb) + abs(ya - yb)), 2)
+                for ra, rb, ha, hb, ta, tb, xa, xb, ya, yb in zip(
+                    names[0::2], names[1::2], heights[0::2], heights[1::2], tops[0::2], tops[1::2],
+                    xs[0::2], xs[1::2], ys[0::2], ys[1::2])]
+
+    def cable_types(self, lengths=None):
+        # Cable per connection: its own "cable", else one for its port type;
+        # rear-to-rear panel links are trunks and long DACs become AOCs.
+        lengths = self.lengths() if lengths is None else lengths
+        racks, types = self._racks(), []
+        for conn, length in zip(self.connections, lengths):
+            cable = conn.get("cable")
+            if not cable:
+                _, kind = self._end_problem(conn["a"], racks)
+                if kind is None:
+                    _, kind = self._end_problem(conn["b"], racks)
+                cable = CABLE_TYPES.get(kind, f"{kind} cable") if kind else "Unknown"
+                if length is not None and length > DAC_MAX_M and cable.endswith(" DAC"):
+                    cable = cable[:-4] + " AOC"
+                if conn["a"].get("side") == conn["b"].get("side") == "rear":
+                    cable += " trunk"
+            types.append(cable)
+        return types
+
+    def bom(self):
+        # {"cables": [{"cable", "length_m", "count"}], "total_m", "unmeasured"}
+        # with lengths rounded up to stock sizes.
+        lengths = self.lengths()
+        counts, unmeasured = {}, 0
+        for cable, length in zip(self.cable_types(lengths), lengths):
+            if length is None:
+                unmeasured += 1
+                continue
+            key = (cable, stock_length(length))
+            counts[key] = counts.get(key, 0) + 1
+        cables = [{"cable": cable, "length_m": length, "count": n} for (cable, length), n in sorted(counts.items())]
+        return {"cables": cables, "total_m": sum(c["length_m"] * c["count"] for c in cables), "unmeasured": unmeasured}
+
+    def _trunk_index(self):
+        # {rack: {other rack: [(length, type, (panel, port), (other panel,
+        # port)), ...]}}, shortest first: the rear-to-rear links between patch
+        # panels, panels keyed (rack, uid). Rebuilt when a trunk or a rack
+        # changes; which of their front ports are free is looked up per route.
+        key = (id(self.connections), tuple((id(r), r.version) for r in self.project.racks))
+        if key == self._trunks_key:
+            return self._trunks
+        racks = self._racks()
+        trunks = [c for c in self.connections if c["a"].get("side") == c["b"].get("side") == "rear"]
+        index = {}
+        for conn, length in zip(trunks, self.lengths(trunks)):
+            (ra, ca), (rb, cb) = self.resolve(conn["a"], racks), self.resolve(conn["b"], racks)
+            if length is None or not (ca.get('patch') and cb.get('patch')):
+                continue
+            kind = port_type(ca, conn["a"]["port"], "rear")
+            if kind is None or kind != port_type(cb, conn["b"]["port"], "rear"):
+                continue
+            a = ((ra.name, ca['uid']), conn["a"]["port"])
+            b = ((rb.name, cb['uid']), conn["b"]["port"])
+            index.setdefault(ra.name, {}).setdefault(rb.name, []).append((length, kind, a, b))
+            index.setdefault(rb.name, {}).setdefault(ra.name, []).append((length, kind, b, a))
+        for links in index.values():
+            for pairs in links.values():
+                pairs.sort()
+        self._trunks_key, self._trunks = key, index
+        return index
+
+    def route(self, a, b):
+        # Cables to add for a link from device port a to device port b: one
+        # cable within a rack or for a trunk (a rear panel port), otherwise
+        # cords onto a free trunk, cross connects where the route changes
+        # trunks, and a cord off the last trunk. The route with the shortest
+        # trunk run wins (Dijkstra over racks). Returns a list of connection
+        # dicts, not yet added, or None when the patch panels do not reach.
+        self.check(a, b)
+        if a["rack"] == b["rack"] or "rear" in (a.get("side"), b.get("side")):
+            return [{"a": dict(a), "b": dict(b)}]
+        kind = port_type(self.resolve(a)[1], a["port"])
+        used, index = self._used_ports(), self._trunk_index()
+
+        def free(panel, port):
+            return (panel[0], panel[1], port, "front") not in used
+
+        best, prev, heap = {a["rack"]: 0.0}, {}, [(0.0, a["rack"])]
+        while heap:
+            d, rack = heapq.heappop(heap)
+            if rack == b["rack"]:
+                break
+            if d > best[rack]:
+                continue
+            for other, pairs in index.get(rack, {}).items():
+                link = next((p for p in pairs if p[1] == kind and free(*p[2]) and free(*p[3])), None)
+                if link is None:
+                    continue
+                cost = d + link[0] + (SLACK_M if rack != a["rack"] else 0)
+                if cost < best.get(other, math.inf):
+                    best[other], prev[other] = cost, (rack, link)
+                    heapq.heappush(heap, (cost, other))
+        if b["rack"] not in prev:
+            return None
+        links, rack = [], b["rack"]
+        while rack != a["rack"]:
+            rack, link = prev[rack]
+            links.append(link)
+        links.reverse()
+        cables, here = [], dict(a)
+        for _, _, (panel, port), (far, far_port) in links:
+            cables.append({"a": here, "b": endpoint(panel[0], panel[1], port)})
+            here = endpoint(far[0], far[1], far_port)
+        cables.append({"a": here, "b": dict(b)})
+        return cables
+
+    def connect_route(self, a, b):
+        # Adds the cables of route(a, b); returns them, or None if unroutable.
+        cables = self.route(a, b)
+        for conn in cables or ():
+            self._add(conn)
+        return cables
+
+
+def describe_end(end, racks):
+    rack = racks.get(end["rack"])
+    comp = rack.get(end["uid"]) if rack else None
+    name = f"{comp['name']} (U{comp['start_u_slot']})" if comp else f"missing item {end['uid']}"
+    side = " rear" if end.get("side") == "rear" else ""
+    return f"{end['rack']}: {name} {end['port']}{side}"
+
+
+def describe_connection(conn, racks, length=None, cable=None):
+    text = f"{describe_end(conn['a'], racks)} <-> {describe_end(conn['b'], racks)}"
+    if cable:
+        text += f"  [{cable}"
+        text += f", {length:g} m]" if length is not None else "]"
+    if conn.get("label"):
+        text += f"  {conn['label']}"
+    return text
@@ -0,0 +1,562 @@
+#!/usr/bin/env python3
+# Component catalogs and their search, independent of the palette widgets.
+import hashlib
+import json
+import os
+import pickle
+import re
+import tempfile
+from bisect import bisect_left, bisect_right, insort
+from urllib.parse import unquote
+
+from rack_cabling import parse_ports
+from rack_model import DEPTHS, RAILS, as_u
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+USER_CATALOG_DIR = os.path.join(os.path.expanduser("~"), ".rackplanner", "catalogs")
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".rackplanner", "cache")
+MANIFEST_NAME = "catalogs.pickle"
+CACHE_VERSION = 3
+# Characters a category name may hold but a file name may not; they are
+# %-escaped in catalog file names, as is "%" itself.
+UNSAFE_FILE_CHARS = set('%/\\:*?"<>|')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+FILTER_RE = re.compile(r"^(size|u|watts|w|power|weight|kg)(:|=|<=|>=|<|>)(-?\d+(?:\.\d+)?)$", re.IGNORECASE)
+FILTER_FIELDS = {'size': 'size', 'u': 'size', 'watts': 'watts', 'w': 'watts', 'power': 'watts', 'weight': 'weight', 'kg': 'weight'}
+FILTER_OPS = {
+    ':': lambda a, b: a == b, '=': lambda a, b: a == b,
+    '<': lambda a, b: a < b, '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b, '>=': lambda a, b: a >= b,
+}
+FUZZY_MIN_LEN = 4
+RANK_LIMIT = 10000
+
+
+def parse_query(text):
+    # Splits a search into words and attribute filters such as "size:2" or
+    # "watts<500" (field, operator, number).
+    words, filters = [], []
+    for part in text.split():
+        m = FILTER_RE.match(part)
+        if m:
+            filters.append((FILTER_FIELDS[m.group(1).lower()], m.group(2), float(m.group(3))))
+        else:
+            words.extend(tokenize(part))
+    return words, filters
+
+
+def trigrams(token):
+    padded = f"${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    # Damerau-Levenshtein (adjacent transpositions), giving up above `limit`.
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class CatalogIndex:
+    # Lowercase token index over component names, category names and a size
+    # token ("2u"). A query matches an entry when every query word is a prefix
+    # of one of the entry's tokens, so matching a category name shows the
+    # whole category. Words that match nothing fall back to tokens within a
+    # small edit distance, found through a trigram index over the tokens.
+    # Entries can be added and removed without rebuilding; removed ids stay
+    # as None so ids are stable.
+    def __init__(self, categories=None):
+        self.rebuild(categories or {})
+
+    def rebuild(self, categories):
+        self.entries = []
+        self._entry_tokens = []
+        self._name_counts = []
+        self._ids = {}
+        self._postings = {}
+        self._trigrams = {}
+        self._unindexed = []
+        self._tokens = []
+        self._changed()
+        for category_name, category_items in categories.items():
+            self.add_category(category_name, category_items)
+
+    def _changed(self):
+        self._prefix_cache = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add_category(self, category_name, category_items):
+        # Replaces the category if it is already indexed.
+        self.remove_category(category_name)
+        category_tokens = tokenize(category_name)
+        new_tokens = set()
+        for comp_name, comp_info in category_items.items():
+            self._add(category_name, category_tokens, comp_name, comp_info, new_tokens)
+        self._merge_tokens(new_tokens)
+
+    def add_entry(self, category_name, comp_name, comp_info):
+        self.remove_entry(category_name, comp_name)
+        new_tokens = set()
+        self._add(category_name, tokenize(category_name), comp_name, comp_info, new_tokens)
+        self._merge_tokens(new_tokens)
+
+    def _add(self, category_name, category_tokens, comp_name, comp_info, new_tokens):
+        # Name tokens come first in an entry's token tuple; _name_counts says
+        # how many there are, for ranking.
+        entry_id = len(self.entries)
+        name_tokens = tuple(dict.fromkeys(tokenize(comp_name)))
+        extra = [t for t in category_tokens if t not in name_tokens]
+        size_token = f"{comp_info.get('size')}u"
+        if size_token not in name_tokens:
+            extra.append(size_token)
+        if comp_info.get('rail') and '0u' not in name_tokens:
+            extra.append('0u')
+        tokens = name_tokens + tuple(extra)
+        self.entries.append((category_name, comp_name, comp_info))
+        self._entry_tokens.append(tokens)
+        self._name_counts.append(len(name_tokens))
+        self._ids[(category_name, comp_name)] = entry_id
+        postings = self._postings
+        for token in tokens:
+            if token in postings:
+                postings[token].append(entry_id)
+            else:
+                postings[token] = [entry_id]
+                new_tokens.add(token)
+
+    def _merge_tokens(self, new_tokens):
+        if len(new_tokens) == 1:
+            insort(self._tokens, next(iter(new_tokens)))
+        elif new_tokens:
+            self._tokens = sorted(new_tokens.union(self._tokens))
+        self._unindexed.extend(new_tokens)
+        self._changed()
+
+    def remove_entry(self, category_name, comp_name):
+        entry_id = self._ids.pop((category_name, comp_name), None)
+        if entry_id is not None:
+            self.entries[entry_id] = None
+            self._changed()
+
+    def remove_category(self, category_name):
+        ids = [k for k in self._ids if k[0] == category_name]
+        for key in ids:
+            self.entries[self._ids.pop(key)] = None
+        if ids:
+            self._changed()
+
+    def _live(self, ids):
+        entries = self.entries
+        return {e for e in ids if entries[e] is not None}
+
+    def _prefix_width(self, word):
+        return bisect_right(self._tokens, word + "\uffff") - bisect_left(self._tokens, word)
+
+    def _prefix_matches(self, word):
+        hits = self._prefix_cache.get(word)
+        if hits is None:
+            hits = set()
+            i = bisect_left(self._tokens, word)
+            while i < len(self._tokens) and self._tokens[i].startswith(word):
+                hits.update(self._postings[self._tokens[i]])
+                i += 1
+            if len(self._prefix_cache) > 256:
+                self._prefix_cache.clear()
+            self._prefix_cache[word] = hits
+        return hits
+
+    def fuzzy_tokens(self, word):
+        # Indexed tokens within edit distance 1 (2 for words of 8+ letters) of
+        # `word`, or of its first len(word) letters, so a typo in a partly
+        # typed word still matches.
+        if len(word) < FUZZY_MIN_LEN:
+            return {}
+        # Trigrams are indexed on first use; numbers and very short tokens are
+        # never fuzzy-matched.
+        for token in self._unindexed:
+            if len(token) >= FUZZY_MIN_LEN - 1 and not token.isdigit():
+                for gram in trigrams(token):
+                    self._trigrams.setdefault(gram, []).append(token)
+        self._unindexed = []
+        limit = 1 if len(word) < 8 else 2
+        grams = trigrams(word)
+        # Each edit breaks at most three trigrams, and a prefix match also
+        # loses the word's closing one.
+        needed = max(1, len(grams) - 3 * limit - 1)
+        shared = {}
+        for gram in grams:
+            for token in self._trigrams.get(gram, ()):
+                shared[token] = shared.get(token, 0) + 1
+        found = {}
+        for token, count in shared.items():
+            if count < needed:
+                continue
+            d = min(edit_distance(word, token, limit), edit_distance(word, token[:len(word)], limit))
+            if d <= limit:
+                found[token] = d
+        return found
+
+    def _fuzzy_matches(self, word):
+        hits = set()
+        for token in self.fuzzy_tokens(word):
+            hits.update(self._postings[token])
+        return hits
+
+    def _match(self, words, fuzzy):
+        # The most specific word (fewest matching tokens) seeds the result; the
+        # rest either intersect postings or, once the result is smaller than
+        # the token range they would expand to, filter the survivors directly.
+        words = sorted(set(words), key=self._prefix_width)
+        result = None
+        for word in words:
+            if result is not None and not result:
+                break
+            exact = self._prefix_width(word)
+            if fuzzy and not exact:
+                hits = self._fuzzy_matches(word)
+            elif result is not None and len(result) < exact:
+                result = {e for e in result if any(t.startswith(word) for t in self._entry_tokens[e])}
+                continue
+            else:
+                hits = self._prefix_matches(word)
+            result = set(hits) if result is None else result & hits
+        return result
+
+    def _filtered(self, filters, result):
+        for field, op, value in filters:
+            test = FILTER_OPS[op]
+            candidates = range(len(self.entries)) if result is None else result
+            entries = self.entries
+            result = set()
+            for e in candidates:
+                entry = entries[e]
+                if entry is None: continue
+                try:
+                    if test(float(entry[2].get(field) or 0), value):
+                        result.add(e)
+                except (TypeError, ValueError):
+                    pass
+        return result
+
+    def _score(self, entry_id, words):
+        tokens, name_count = self._entry_tokens[entry_id], self._name_counts[entry_id]
+        score = 0
+        for word in words:
+            best = 0
+            for i, token in enumerate(tokens):
+                if token == word: s = 3
+                elif token.startswith(word): s = 2
+                else: continue
+                if i < name_count: s += 0.5
+                best = max(best, s)
+            score += best or 1
+        return score
+
+    def search(self, text):
+        # Entry ids, best matches first (ids in catalog order once more than
+        # RANK_LIMIT entries match, or when there are no words to rank by).
+        words, filters = parse_query(text)
+        if not words and not filters:
+            return sorted(self._live(range(len(self.entries))))
+        result = None
+        if words:
+            result = self._match(words, fuzzy=True)
+            if not result:
+                # No entry matches every word as typed: let each word also
+                # match by typo and try once more.
+                result = None
+                for word in words:
+                    hits = self._prefix_matches(word) | self._fuzzy_matches(word)
+                    result = hits if result is None else result & hits
+        if filters:
+            result = self._filtered(filters, result)
+        result = self._live(result)
+        if not words or len(result) > RANK_LIMIT:
+            return sorted(result)
+        return sorted(result, key=lambda e: (-self._score(e, words), e))
+
+
+def catalog_dirs():
+    # Bundled catalogs first; user and RACKPLANNER_CATALOG_PATH catalogs
+    # override bundled ones with the same name.
+    dirs = [os.path.dirname(os.path.abspath(__file__)), USER_CATALOG_DIR]
+    dirs += [d for d in os.environ.get("RACKPLANNER_CATALOG_PATH", "").split(os.pathsep) if d]
+    return dirs
+
+
+def catalog_file_name(name):
+    # File name stem for a category. Unlike rack_io.safe_file_name this keeps
+    # spaces and can be turned back into the name (catalog_name), so an
+    # imported "Enterprise Servers" replaces the bundled catalog and "A/B"
+    # and "A B" stay apart.
+    stem = "".join(f"%{ord(ch):02X}" if ch in UNSAFE_FILE_CHARS or ord(ch) < 32 else ch for ch in name)
+    # Hidden files are skipped and Windows drops trailing dots and spaces.
+    if stem[:1] == ".":
+        stem = "%2E" + stem[1:]
+    if stem[-1:] in (".", " "):
+        stem = stem[:-1] + f"%{ord(stem[-1]):02X}"
+    return stem
+
+
+def catalog_name(stem):
+    return unquote(stem) if "%" in stem else stem
+
+
+def normalize_item(info):
+    # Returns a clean copy of a catalog entry, or None if it has no usable size.
+    if not isinstance(info, dict):
+        return None
+    try:
+        size = as_u(info['size'])
+        watts = float(info.get('watts') or 0)
+        weight = float(info.get('weight') or 0)
+    except (KeyError, TypeError, ValueError):
+        return None
+    if size <= 0 or watts < 0 or weight < 0:
+        return None
+    item = dict(info)
+    item.update(size=size, color=str(info.get('color') or 'skyblue'),
+                watts=int(watts) if watts.is_integer() else watts,
+                weight=int(weight) if weight.is_integer() else weight)
+    # Mounting: "full" depth blocks both faces, a rail makes it a 0U item.
+    item.pop('depth', None)
+    item.pop('rail', None)
+    depth, rail = str(info.get('depth') or '').lower(), str(info.get('rail') or '').capitalize()
+    if depth in DEPTHS and depth != 'half':
+        item['depth'] = depth
+    if rail in RAILS:
+        item['rail'] = rail
+    # Ports ({type: count}) are dropped when malformed; "patch" only means
+    # something on an item with ports.
+    item.pop('ports', None)
+    item.pop('patch', None)
+    if info.get('ports'):
+        try:
+            item['ports'] = parse_ports(info['ports'])
+        except ValueError:
+            pass
+    if info.get('patch') and 'ports' in item:
+        item['patch'] = True
+    return item
+
+
+def parse_catalog(data):
+    # A catalog is {component name: {size, color, watts, weight}}. Returns the
+    # valid entries and the names that were skipped.
+    if not isinstance(data, dict) or not all(isinstance(v, dict) for v in data.values()):
+        raise ValueError("A catalog must be a JSON object of {name: {size, color, watts, weight}}.")
+    items, skipped = {}, []
+    for name, info in data.items():
+        item = normalize_item(info)
+        if item is None:
+            skipped.append(name)
+        else:
+            items[name] = item
+    return items, skipped
+
+
+def _write_atomic(file_path, data):
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(file_path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class CatalogStore:
+    # Catalog files (one category per *.json file, named after the file) from
+    # catalog_dirs(). Discovery only lists files; entry counts come from the
+    # cache manifest when a file has been seen before, and entries are loaded
+    # on first use. Parsed catalogs are pickled under their SHA-1, and the
+    # manifest maps each path to (mtime, size, sha1, count) so unchanged files
+    # are not even hashed again. A count of -1 marks a file that is not a
+    # catalog, which later discoveries skip until it changes.
+    def __init__(self, dirs=None, cache_dir=None):
+        self.dirs = catalog_dirs() if dirs is None else list(dirs)
+        self.cache_dir = cache_dir or os.environ.get("RACKPLANNER_CACHE_DIR", CACHE_DIR)
+        self.files = {}
+        self.skipped = {}
+        self._loaded = {}
+        self._manifest = None
+
+    def discover(self):
+        self.files = {}
+        for directory in self.dirs:
+            try:
+                names = sorted(os.listdir(directory))
+            except OSError:
+                continue
+            for name in names:
+                if name.lower().endswith(".json") and not name.startswith('.'):
+                    self.files[catalog_name(os.path.splitext(name)[0])] = os.path.join(directory, name)
+        for name in list(self.files):
+            entry = self._cached_entry(name)
+            if entry and entry[3] < 0:
+                del self.files[name]
+        self._loaded = {k: v for k, v in self._loaded.items() if k in self.files}
+        return self.names()
+
+    def names(self):
+        return sorted(self.files, key=str.lower)
+
+    def _load_manifest(self):
+        if self._manifest is None:
+            try:
+                with open(os.path.join(self.cache_dir, MANIFEST_NAME), 'rb') as f:
+                    version, self._manifest = pickle.load(f)
+                if version != CACHE_VERSION:
+                    self._manifest = {}
+            except Exception:
+                self._manifest = {}
+        return self._manifest
+
+    def _cached_entry(self, name):
+        path = self.files[name]
+        entry = self._load_manifest().get(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if entry and entry[:2] == (st.st_mtime_ns, st.st_size):
+            return entry
+        return None
+
+    def _remember(self, path, st, digest, count):
+        self._load_manifest()[path] = (st.st_mtime_ns, st.st_size, digest, count)
+        self._save(os.path.join(self.cache_dir, MANIFEST_NAME), (CACHE_VERSION, self._manifest))
+
+    def count(self, name):
+        # Entry count, or None if the file has not been loaded since it changed.
+        if name in self._loaded:
+            return len(self._loaded[name])
+        entry = self._cached_entry(name)
+        return entry[3] if entry else None
+
+    def is_loaded(self, name):
+        return name in self._loaded
+
+    def load(self, name):
+        if name in self._loaded:
+            return self._loaded[name]
+        path = self.files[name]
+        st = os.stat(path)
+        entry = self._cached_entry(name)
+        raw = None
+        if entry:
+            digest = entry[2]
+        else:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            digest = hashlib.sha1(raw).hexdigest()
+        cache_path = os.path.join(self.cache_dir, f"{digest}.pickle")
+        items = skipped = None
+        try:
+            with open(cache_path, 'rb') as f:
+                version, items, skipped = pickle.load(f)
+            if version != CACHE_VERSION:
+                items = None
+        except Exception:
+            items = None
+        if items is None:
+            if raw is None:
+                with open(path, 'rb') as f:
+                    raw = f.read()
+            try:
+                items, skipped = parse_catalog(json.loads(raw))
+            except ValueError:
+                self._remember(path, st, digest, -1)
+                raise
+            self._save(cache_path, (CACHE_VERSION, items, skipped))
+        if not entry:
+            self._remember(path, st, digest, len(items))
+        self._loaded[name] = items
+        self.skipped[name] = skipped
+        return items
+
+    def _save(self, file_path, obj):
+        # The cache only saves time; failing to write it is not an error.
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            _write_atomic(file_path, pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+        except OSError:
+            pass
+
+    def catalog_path(self, name, directory=None):
+        return os.path.join(directory or USER_CATALOG_DIR, f"{catalog_file_name(name)}.json")
+
+    def _file_owner(self, name, path, others):
+        # Another category already using the file `path`; file names are
+        # compared ignoring case, as on Windows and macOS.
+        key = os.path.normcase(os.path.abspath(path)).lower()
+        for other, other_path in others:
+            if other != name and os.path.normcase(os.path.abspath(other_path)).lower() == key:
+                return other
+        return None
+
+    def check_new(self, names, directory=None):
+        # Raises ValueError if two of `names`, or one of them and a known
+        # catalog, would be written to the same file. Call before
+        # write_catalog().
+        taken = list(self.files.items())
+        for name in names:
+            path = self.catalog_path(name, directory)
+            other = self._file_owner(name, path, taken)
+            if other is not None:
+                raise ValueError(f"Categories '{other}' and '{name}' would both be saved as {path}.")
+            taken.append((name, path))
+
+    def write_catalog(self, name, items, directory=None):
+        # Saves validated `items` as the catalog file for category `name` in
+        # `directory` (the user catalog folder by default) and primes the
+        # pickle cache. Only touches files, so it can run on a worker thread;
+        # pass the result to register() on the thread that owns the store.
+        # Returns (name, path, sha1).
+        directory = directory or USER_CATALOG_DIR
+        os.makedirs(directory, exist_ok=True)
+        path = self.catalog_path(name, directory)
+        raw = json.dumps(items, separators=(',', ':')).encode()
+        _write_atomic(path, raw)
+        digest = hashlib.sha1(raw).hexdigest()
+        self._save(os.path.join(self.cache_dir, f"{digest}.pickle"), (CACHE_VERSION, items, []))
+        return name, path, digest
+
+    def register(self, name, path, items, digest):
+        other = self._file_owner(name, path, self.files.items())
+        if other is not None:
+            raise ValueError(f"Catalog '{other}' is already saved as {path}.")
+        self._remember(path, os.stat(path), digest, len(items))
+        self.files[name] = path
+        self._loaded[name] = items
+        self.skipped[name] = []
+
+    def load_all(self):
+        # Files that turn out not to be catalogs (e.g. a project saved next to
+        # the bundled catalogs) are dropped.
+        for name in self.names():
+            try:
+                self.load(name)
+            except (OSError, ValueError):
+                del self.files[name]
+        return {name: self._loaded[name] for name in self.names()}
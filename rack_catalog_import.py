@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# Streaming catalog import for vendor and procurement exports: CSV/TSV, JSON
+# Lines, and JSON objects or arrays too large to parse in one go. Rows are
+# read incrementally, validated in batches, and bad rows end up in a report
+# instead of failing the import.
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+
+from rack_cabling import parse_ports
+from rack_catalog import CatalogStore
+from rack_io import write_json_atomic
+from rack_model import DEPTHS, RAILS
+
+BATCH_SIZE = 5000
+CHUNK_BYTES = 1 << 20
+MAX_REPORTED_ERRORS = 10000
+FIELD_ALIASES = {
+    'name': ('name', 'model', 'component', 'description', 'sku', 'part'),
+    'size': ('size', 'size_u', 'u', 'rack_units', 'ru', 'height_u'),
+    'watts': ('watts', 'power', 'power_w', 'w', 'max_power'),
+    'weight': ('weight', 'weight_kg', 'kg', 'mass'),
+    'color': ('color', 'colour'),
+    'category': ('category', 'vendor', 'family'),
+    'depth': ('depth', 'mounting_depth'),
+    'rail': ('rail', 'zero_u_rail'),
+    'ports': ('ports', 'interfaces', 'connectors'),
+    'patch': ('patch', 'patch_panel'),
+}
+NUMBER_RE = re.compile(r"^\s*(-?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?|-?\.\d+)\s*(u|w|kg)?\s*$", re.IGNORECASE)
+YES = ('1', 'true', 'yes', 'y')
+NO = ('0', 'false', 'no', 'n')
+COLOR_RE = re.compile(r"^(#[0-9a-fA-F]{3}|#[0-9a-fA-F]{6}|[A-Za-z][A-Za-z0-9 ]*)$")
+
+
+class ImportCancelled(Exception):
+    pass
+
+
+def _number(value, field):
+    if isinstance(value, bool):
+        raise ValueError(f"{field} is not a number")
+    if isinstance(value, (int, float)):
+        return value
+    m = NUMBER_RE.match(str(value))
+    if not m:
+        raise ValueError(f"{field} is not a number: {value!r}")
+    number = float(m.group(1).replace(',', ''))
+    return int(number) if number.is_integer() else number
+
+
+def normalize_row(row):
+    # Returns (name, item) or raises ValueError naming the bad field. Missing
+    # watts/weight count as 0 and a missing colour as the palette default.
+    name = str(row.get('name') or '').strip()
+    if not name:
+        raise ValueError("missing name")
+    if row.get('size') in (None, ''):
+        raise ValueError("missing size")
+    size = _number(row['size'], "size")
+    if size <= 0 or (size * 2) % 1:
+        raise ValueError(f"size must be a positive multiple of half a U: {row['size']!r}")
+    item = {'size': size}
+    for field in ('watts', 'weight'):
+        value = row.get(field)
+        item[field] = 0 if value in (None, '') else _number(value, field)
+        if item[field] < 0:
+            raise ValueError(f"{field} is negative: {value!r}")
+    color = str(row.get('color') or '').strip() or 'skyblue'
+    if not COLOR_RE.match(color):
+        raise ValueError(f"invalid color: {color!r}")
+    item['color'] = color
+    depth = str(row.get('depth') or '').strip().lower()
+    if depth:
+        if depth not in DEPTHS:
+            raise ValueError(f"depth must be one of {', '.join(DEPTHS)}: {row['depth']!r}")
+        item['depth'] = depth
+    rail = str(row.get('rail') or '').strip().capitalize()
+    if rail:
+        if rail not in RAILS:
+            raise ValueError(f"rail must be one of {', '.join(RAILS)}: {row['rail']!r}")
+        item['rail'] = rail
+    if row.get('ports') not in (None, '', {}):
+        item['ports'] = parse_ports(row['ports'])
+    patch = str(row.get('patch') or '').strip().lower()
+    if patch:
+        if patch not in YES + NO:
+            raise ValueError(f"patch must be yes or no: {row['patch']!r}")
+        if patch in YES:
+            if 'ports' not in item:
+                raise ValueError("a patch panel needs ports")
+            item['patch'] = True
+    for key, value in row.items():
+        if key not in item and key not in ('name', 'category', 'patch') and value not in (None, ''):
+            item[key] = value
+    return name, item
+
+
+def _canonical_keys(keys):
+    # Maps source column names to catalog fields; for each field the column
+    # matching its earliest alias wins, so "Name" beats "SKU".
+    folded = {k: str(k).strip().lower().replace(' ', '_').replace('-', '_') for k in keys}
+    mapping = dict(folded)
+    claimed = set()
+    for field, aliases in FIELD_ALIASES.items():
+        for alias in aliases:
+            match = next((k for k in keys if folded[k] == alias and k not in claimed), None)
+            if match is not None:
+                mapping[match] = field
+                claimed.add(match)
+                break
+    return mapping
+
+
+def _csv_rows(f, delimiter=None):
+    sample = f.read(64 * 1024)
+    f.seek(0)
+    if delimiter is None:
+        try:
+            delimiter = csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+        except csv.Error:
+            delimiter = ','
+    reader = csv.reader(f, delimiter=delimiter)
+    header = next(reader, None)
+    if not header:
+        return
+    mapping = _canonical_keys(header)
+    fields = [mapping[h] for h in header]
+    for values in reader:
+        if any(v.strip() for v in values):
+            yield dict(zip(fields, values))
+
+
+def _jsonl_rows(f):
+    for line_no, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"line {line_no}: {e}")
+
+
+def _json_values(f):
+    # Incremental parse of a top-level {name: {...}} object or [{...}] array:
+    # only the entry being decoded has to fit in memory.
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def more():
+        nonlocal buf, pos, eof
+        chunk = f.read(CHUNK_BYTES)
+        if not chunk:
+            eof = True
+        buf, pos = buf[pos:] + chunk, 0
+
+    def skip(chars=" \t\r\n"):
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            more()
+
+    def decode():
+        nonlocal pos
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+                # A number at the end of the buffer may continue in the next chunk.
+                if end < len(buf) or eof or not isinstance(value, (int, float)):
+                    pos = end
+                    return value
+            except ValueError:
+                if eof:
+                    raise
+            more()
+
+    skip()
+    if pos >= len(buf) or buf[pos] not in "{[":
+        raise ValueError("Expected a JSON object or array.")
+    is_object = buf[pos] == "{"
+    close = "}" if is_object else "]"
+    pos += 1
+    while True:
+        skip(" \t\r\n,")
+        if pos >= len(buf):
+            raise ValueError("Unexpected end of JSON file.")
+        if buf[pos] == close:
+            return
+        if is_object:
+            key = decode()
+            skip()
+            if buf[pos:pos + 1] != ":":
+                raise ValueError(f"Expected ':' after {key!r}.")
+            pos += 1
+            skip()
+            value = decode()
+            yield dict(value, name=key) if isinstance(value, dict) else ValueError(f"{key!r}: entry is not an object")
+        else:
+            value = decode()
+            yield value if isinstance(value, dict) else ValueError("array entry is not an object")
+
+
+def iter_rows(file_path):
+    ext = os.path.splitext(file_path)[1].lower()
+    with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+        if ext in ('.csv', '.tsv', '.txt'):
+            rows = _csv_rows(f, '\t' if ext == '.tsv' else None)
+        elif ext in ('.jsonl', '.ndjson'):
+            rows = _jsonl_rows(f)
+        else:
+            rows = _json_values(f)
+        for row in rows:
+            yield row, f.buffer.tell()
+
+
+def import_catalog(file_path, default_category=None, on_progress=None, cancel=None, batch_size=BATCH_SIZE):
+    # Returns ({category: {name: item}}, report). Rows with a category column
+    # go to that category, everything else to `default_category` (the file
+    # name by default). `on_progress(bytes_read, total_bytes, rows)` is called
+    # once per batch; setting the `cancel` event raises ImportCancelled.
+    default_category = default_category or os.path.splitext(os.path.basename(file_path))[0]
+    total = os.path.getsize(file_path)
+    categories = {}
+    report = {"file": file_path, "rows": 0, "imported": 0, "duplicates": 0, "error_count": 0, "errors": []}
+
+    mappings = {}
+
+    def flush(batch):
+        for row_no, row in batch:
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                if not isinstance(row, dict):
+                    raise ValueError("row is not an object")
+                if any(k not in FIELD_ALIASES for k in row):
+                    keys = tuple(row)
+                    if keys not in mappings:
+                        mappings[keys] = _canonical_keys(keys)
+                    mapping = mappings[keys]
+                    row = {mapping[k]: v for k, v in row.items()}
+                name, item = normalize_row(row)
+            except ValueError as e:
+                report["error_count"] += 1
+                if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                    name = row.get('name') if isinstance(row, dict) else None
+                    report["errors"].append({"row": row_no, "name": name, "error": f"{e}"})
+                continue
+            category = str(row.get('category') or '').strip() or default_category
+            items = categories.setdefault(category, {})
+            report["duplicates"] += name in items
+            items[name] = item
+
+    batch, position = [], 0
+    for row_no, (row, position) in enumerate(iter_rows(file_path), 1):
+        batch.append((row_no, row))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+            if cancel is not None and cancel.is_set():
+                raise ImportCancelled()
+            if on_progress:
+                on_progress(position, total, row_no)
+        report["rows"] = row_no
+    flush(batch)
+    report["imported"] = sum(len(items) for items in categories.values())
+    if on_progress:
+        on_progress(total, total, report["rows"])
+    return categories, report
+
+
+def write_report(report, file_path):
+    with open(file_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["row", "name", "error"])
+        for error in report["errors"]:
+            writer.writerow([error["row"], error["name"] or "", error["error"]])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a CSV/JSON Lines/JSON vendor export into RackPlanner catalogs.")
+    parser.add_argument("source")
+    parser.add_argument("-o", "--out-dir", default=".", help="where to write <category>.json catalogs")
+    parser.add_argument("-c", "--category", help="category for rows without one (default: source file name)")
+    parser.add_argument("--report", help="write rejected rows to this CSV file")
+    args = parser.parse_args(argv)
+
+    categories, report = import_catalog(args.source, args.category)
+    store = CatalogStore([])
+    store.check_new(categories, args.out_dir)
+    os.makedirs(args.out_dir, exist_ok=True)
+    for category, items in categories.items():
+        write_json_atomic(store.catalog_path(category, args.out_dir), items, indent=4)
+        print(f"{category}: {len(items)} components")
+    if args.report:
+        write_report(report, args.report)
+    print(f"{report['rows']} rows, {report['imported']} imported, {report['error_count']} rejected", file=sys.stderr)
+    return 1 if report["error_count"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
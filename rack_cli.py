@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# Headless project tools for CI: validate layouts and summarize U, power and
+# weight per view, one JSON Lines record per file.
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from rack_io import parse_project
+from rack_model import SUBSLOTS, as_u, from_slots, item_layers, to_slots
+
+PROJECT_KEYS = ("racks", "views", "placed_components")
+CHUNK_SIZE = 16
+
+
+def find_project_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+                for name in sorted(filenames):
+                    if name.lower().endswith(".json"):
+                        yield os.path.join(dirpath, name)
+        else:
+            yield path
+
+
+def check_rack(rack_height, views):
+    # Per-view summaries and problems. Overlaps are swept per occupancy layer
+    # (see rack_model.item_layers), so full-depth items also collide with
+    # items on the other face and 0U items only with their own rail.
+    problems, layers = [], {}
+    for view, comps in views.items():
+        for n, comp in enumerate(comps):
+            try:
+                name, start, size = comp['name'], as_u(comp['start_u_slot']), as_u(comp['size_u'])
+            except (KeyError, TypeError, ValueError):
+                problems.append({"type": "invalid", "view": view, "index": n,
+                                 "detail": "missing or non-numeric name/start_u_slot/size_u, or not a multiple of half a U"})
+                continue
+            if size <= 0 or start < 1 or start + size - 1 > rack_height:
+                problems.append({"type": "out_of_bounds", "view": view, "item": name, "start_u_slot": start, "size_u": size})
+            lo = to_slots(start - 1)
+            for layer in item_layers(view, comp):
+                layers.setdefault(layer, []).append((lo, lo + to_slots(size) - 1, name))
+
+    # Sweep in start order: each item only needs checking against the
+    # highest-reaching item seen so far. Spans are in half-U slots.
+    for layer, spans in layers.items():
+        spans.sort()
+        reach = None
+        for start, end, name in spans:
+            if reach is not None and start <= reach[0]:
+                problems.append({"type": "overlap", "view": layer, "items": [reach[1], name],
+                                 "u": [start // SUBSLOTS + 1, min(end, reach[0]) // SUBSLOTS + 1]})
+            if reach is None or end > reach[0]:
+                reach = (end, name)
+
+    summaries = {}
+    for view, comps in views.items():
+        used = set()
+        for start, end, _ in layers.get(view, []):
+            used.update(range(max(0, start), min(rack_height * SUBSLOTS - 1, end) + 1))
+        summaries[view] = {
+            "items": len(comps),
+            "used_u": from_slots(len(used)),
+            "free_u": rack_height - from_slots(len(used)),
+            "watts": sum(c.get('watts', 0) or 0 for c in comps if isinstance(c, dict)),
+            "weight": sum(c.get('weight', 0) or 0 for c in comps if isinstance(c, dict)),
+        }
+    return summaries, problems
+
+
+def check_project(data):
+    project = parse_project(data)
+    racks = []
+    for rack in project["racks"]:
+        views, problems = check_rack(rack["rack_height"], rack["views"])
+        racks.append({
+            "name": rack["name"],
+            "row": rack["row"],
+            "rack_height": rack["rack_height"],
+            "views": views,
+            "watts": sum(v["watts"] for v in views.values()),
+            "weight": sum(v["weight"] for v in views.values()),
+            "problems": problems,
+        })
+    return racks
+
+
+def check_file(path):
+    record = {"file": path}
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or not any(k in data for k in PROJECT_KEYS):
+            record["skipped"] = "not a project file"
+            return record
+        record["racks"] = check_project(data)
+        record["ok"] = not any(r["problems"] for r in record["racks"])
+    except Exception as e:
+        record["ok"] = False
+        record["error"] = f"{e}"
+    return record
+
+
+def cmd_check(args):
+    paths = list(find_project_files(args.paths))
+    out = open(args.output, 'w') if args.output else sys.stdout
+    pool = ProcessPoolExecutor(max_workers=args.jobs) if args.jobs != 1 else None
+    checked = failed = 0
+    try:
+        results = pool.map(check_file, paths, chunksize=CHUNK_SIZE) if pool else map(check_file, paths)
+        for record in results:
+            if "skipped" in record and not args.include_skipped:
+                continue
+            checked += "skipped" not in record
+            failed += record.get("ok") is False
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+    finally:
+        if pool:
+            pool.shutdown()
+        if out is not sys.stdout:
+            out.close()
+    print(f"{checked} projects checked, {failed} with problems", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def cmd_diff(args):
+    from rack_diff import diff_projects, load_project
+    diff = diff_projects(load_project(args.old), load_project(args.new))
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for rack in diff["racks"]:
+            if rack["status"] != "changed":
+                out.write(json.dumps({k: v for k, v in rack.items() if k != "changes"}) + "\n")
+            for change in rack["changes"]:
+                out.write(json.dumps(change) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    summary = diff["summary"]
+    counts = ", ".join(f"{n} {kind}" for kind, n in sorted(summary["changes"].items())) or "no item changes"
+    print(f"{summary['racks_changed']} racks changed, {summary['racks_unchanged']} unchanged: {counts}; "
+          f"power {summary['watts_delta']:+g} W, weight {summary['weight_delta']:+g} kg", file=sys.stderr)
+    return 1 if summary["racks_changed"] else 0
+
+
+def cmd_cables(args):
+    from rack_cabling import CablePlan, stock_length
+    from rack_diff import load_project
+    plan = CablePlan(load_project(args.project), {(a, b): float(m) for a, b, m in args.distance or ()})
+    lengths = plan.lengths()
+    problems = plan.problems()
+    bom = plan.bom()
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        if args.bom:
+            for row in bom["cables"]:
+                out.write(json.dumps(row) + "\n")
+        else:
+            for conn, cable, length in zip(plan.connections, plan.cable_types(lengths), lengths):
+                out.write(json.dumps(dict(conn, cable=cable, length_m=length,
+                                          stock_m=None if length is None else stock_length(length))) + "\n")
+        for problem in problems:
+            out.write(json.dumps({"problem": problem}) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"{len(plan.connections)} connections, {sum(r['count'] for r in bom['cables'])} cables totalling "
+          f"{bom['total_m']:g} m, {len(problems)} problems", file=sys.stderr)
+    return 1 if problems else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="RackPlanner project tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    check = sub.add_parser("check", help="validate projects and print U/power/weight per view as JSON Lines")
+    check.add_argument("paths", nargs="+", help="project files or directories (searched for *.json)")
+    check.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: CPU count, 1 = no pool)")
+    check.add_argument("-o", "--output", help="write JSON Lines here instead of stdout")
+    check.add_argument("--include-skipped", action="store_true", help="also emit records for non-project JSON files")
+    check.set_defaults(func=cmd_check)
+
+    diff = sub.add_parser("diff", help="list added, removed, moved and resized devices between two projects as JSON Lines")
+    diff.add_argument("old", help="project file (.json or .rackdb)")
+    diff.add_argument("new", help="project file (.json or .rackdb)")
+    diff.add_argument("-o", "--output", help="write JSON Lines here instead of stdout")
+    diff.set_defaults(func=cmd_diff)
+
+    cables = sub.add_parser("cables", help="list connections with cable types and lengths, or the cable BOM, as JSON Lines")
+    cables.add_argument("project", help="project file (.json or .rackdb)")
+    cables.add_argument("--bom", action="store_true", help="emit cable counts per type and stock length instead")
+    cables.add_argument("--distance", nargs=3, action="append", metavar=("RACK", "RACK", "METRES"),
+                        help="tray run between two racks, overriding the one derived from rows (repeatable)")
+    cables.add_argument("-o", "--output", help="write JSON Lines here instead of stdout")
+    cables.set_defaults(func=cmd_cables)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
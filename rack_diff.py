@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# Layout diffs between two projects: saved files, a live project, or a
+# rebuilt history state. Every rack face gets a digest of its placements so
+# unchanged racks are skipped without looking at their items; changed faces
+# are matched item by item (by uid, then by name and nearest position) into
+# added, removed, moved, resized and updated devices with power and weight
+# deltas. Projects are RackProjects or parsed project dicts (rack_io).
+import hashlib
+import json
+import weakref
+
+from rack_io import build_project, read_project
+from rack_model import RackModel
+
+DIFF_FIELDS = ('name', 'start_u_slot', 'size_u', 'color', 'watts', 'weight', 'depth', 'rail')
+UPDATE_FIELDS = ('color', 'watts', 'weight', 'depth', 'rail')
+
+# RackModel -> (version, digests); live racks are only rehashed after edits.
+_digests = weakref.WeakKeyDictionary()
+
+
+def _racks(project):
+    racks = project.racks if hasattr(project, 'racks') else project["racks"]
+    return {(r.name if isinstance(r, RackModel) else r["name"]): r for r in racks}
+
+
+def _rack_parts(rack):
+    if isinstance(rack, RackModel):
+        return rack.rack_height, rack.views
+    return rack["rack_height"], rack["views"]
+
+
+def view_digest(comps):
+    rows = sorted([c.get(k) for k in DIFF_FIELDS] for c in comps)
+    return hashlib.blake2b(json.dumps(rows, default=str).encode(), digest_size=16).hexdigest()
+
+
+def rack_digests(rack):
+    # {view: digest} plus the height under None.
+    if isinstance(rack, RackModel):
+        cached = _digests.get(rack)
+        if cached and cached[0] == rack.version:
+            return cached[1]
+    height, views = _rack_parts(rack)
+    digests = {view: view_digest(comps) for view, comps in views.items()}
+    digests[None] = height
+    if isinstance(rack, RackModel):
+        _digests[rack] = (rack.version, digests)
+    return digests
+
+
+def _totals(views):
+    comps = [c for v in views.values() for c in v]
+    return sum(c.get('watts', 0) or 0 for c in comps), sum(c.get('weight', 0) or 0 for c in comps)
+
+
+def match_items(old, new):
+    # Pairs (old, new) items of one rack face. Items keep their uid across
+    # saves, so uid plus name is tried first; what is left pairs up by name,
+    # nearest position first. Returns (pairs, removed, added).
+    by_uid = {c['uid']: c for c in new if c.get('uid') is not None}
+    pairs, used, rest = [], set(), []
+    for o in old:
+        n = by_uid.get(o.get('uid')) if o.get('uid') is not None else None
+        if n is not None and n['name'] == o['name'] and id(n) not in used:
+            pairs.append((o, n))
+            used.add(id(n))
+        else:
+            rest.append(o)
+    by_name = {}
+    for n in new:
+        if id(n) not in used:
+            by_name.setdefault(n['name'], []).append(n)
+    # Closest pairs first over all same-named items, so an item that did not
+    # move is not claimed by another one further away.
+    candidates = sorted((abs(n['start_u_slot'] - o['start_u_slot']), i, j)
+                        for i, o in enumerate(rest) for j, n in enumerate(by_name.get(o['name'], ())))
+    matched = set()
+    for _, i, j in candidates:
+        n = by_name[rest[i]['name']][j]
+        if i in matched or id(n) in used:
+            continue
+        matched.add(i)
+        used.add(id(n))
+        pairs.append((rest[i], n))
+    removed = [o for i, o in enumerate(rest) if i not in matched]
+    added = [n for n in new if id(n) not in used]
+    return pairs, removed, added
+
+
+def _record(change, rack, view, comp, **extra):
+    record = {"change": change, "rack": rack, "view": view, "name": comp['name'], "uid": comp.get('uid'),
+              "start_u_slot": comp['start_u_slot'], "size_u": comp['size_u']}
+    record.update(extra)
+    return record
+
+
+def diff_views(name, view, old, new):
+    changes = []
+    pairs, removed, added = match_items(old, new)
+    for comp in removed:
+        changes.append(_record("removed", name, view, comp, watts=-(comp.get('watts', 0) or 0), weight=-(comp.get('weight', 0) or 0)))
+    for comp in added:
+        changes.append(_record("added", name, view, comp, watts=comp.get('watts', 0) or 0, weight=comp.get('weight', 0) or 0))
+    for o, n in pairs:
+        if o['start_u_slot'] != n['start_u_slot']:
+            changes.append(_record("moved", name, view, n, **{"from": o['start_u_slot'], "to": n['start_u_slot']}))
+        if o['size_u'] != n['size_u']:
+            changes.append(_record("resized", name, view, n, **{"from": o['size_u'], "to": n['size_u']}))
+        fields = {k: [o.get(k), n.get(k)] for k in UPDATE_FIELDS if o.get(k) != n.get(k)}
+        if fields:
+            changes.append(_record("updated", name, view, n, fields=fields,
+                                   watts=(n.get('watts', 0) or 0) - (o.get('watts', 0) or 0),
+                                   weight=(n.get('weight', 0) or 0) - (o.get('weight', 0) or 0)))
+    changes.sort(key=lambda c: (c["view"], c["start_u_slot"]))
+    return changes
+
+
+def diff_racks(name, old, new):
+    # Summary of one rack, or None when old and new are the same. Either
+    # side may be None for a rack that only exists on the other.
+    if old is not None and new is not None:
+        old_digests, new_digests = rack_digests(old), rack_digests(new)
+        if old_digests == new_digests:
+            return None
+    else:
+        old_digests = new_digests = {}
+    old_height, old_views = _rack_parts(old) if old is not None else (None, {})
+    new_height, new_views = _rack_parts(new) if new is not None else (None, {})
+    changes = []
+    for view in list(old_views) + [v for v in new_views if v not in old_views]:
+        if old_digests.get(view) is not None and old_digests.get(view) == new_digests.get(view):
+            continue
+        changes.extend(diff_views(name, view, old_views.get(view, []), new_views.get(view, [])))
+    old_watts, old_weight = _totals(old_views)
+    new_watts, new_weight = _totals(new_views)
+    return {
+        "rack": name,
+        "status": "added" if old is None else "removed" if new is None else "changed",
+        "rack_height": [old_height, new_height],
+        "watts": [old_watts, new_watts],
+        "weight": [old_weight, new_weight],
+        "changes": changes,
+    }
+
+
+def diff_projects(old, new):
+    old_racks, new_racks = _racks(old), _racks(new)
+    racks, unchanged = [], 0
+    for name in list(old_racks) + [n for n in new_racks if n not in old_racks]:
+        diff = diff_racks(name, old_racks.get(name), new_racks.get(name))
+        if diff is None:
+            unchanged += 1
+        else:
+            racks.append(diff)
+    counts = {}
+    for rack in racks:
+        for change in rack["changes"]:
+            counts[change["change"]] = counts.get(change["change"], 0) + 1
+    return {
+        "racks": racks,
+        "summary": {
+            "racks_changed": len(racks),
+            "racks_unchanged": unchanged,
+            "changes": counts,
+            "watts_delta": sum(r["watts"][1] - r["watts"][0] for r in racks),
+            "weight_delta": sum(r["weight"][1] - r["weight"][0] for r in racks),
+        },
+    }
+
+
+def load_project(path):
+    # RackProject from a .json or .rackdb file, with every rack loaded.
+    if path.lower().endswith(".rackdb"):
+        from rack_store import ProjectStore
+        store = ProjectStore(path)
+        try:
+            project, _ = store.open()
+            for rack in project.racks:
+                store.load_rack(rack)
+        finally:
+            store.close()
+        return project
+    return build_project(read_project(path))
+
+
+def describe(change):
+    # One line of text for a change record.
+    where = f"{change['rack']} {change['view']}: {change['name']!r}"
+    if change["change"] == "moved":
+        return f"{where} moved U{change['from']} -> U{change['to']}"
+    if change["change"] == "resized":
+        return f"{where} resized {change['from']}U -> {change['to']}U"
+    if change["change"] == "updated":
+        fields = ", ".join(f"{k} {a} -> {b}" for k, (a, b) in change["fields"].items())
+        return f"{where} at U{change['start_u_slot']} updated: {fields}"
+    return f"{where} {change['change']} at U{change['start_u_slot']} ({change['size_u']}U)"
@@ -0,0 +1,604 @@
+#!/usr/bin/env python3
+# Offscreen rack elevations drawn straight from project data, so exports do
+# not depend on a visible window. Pillow is only needed for raster output.
+import argparse
+import os
+import sys
+import tempfile
+import zlib
+from collections import deque
+from html import escape as _html_escape
+
+from rack_io import read_project, safe_file_name
+from rack_model import BTU_PER_WATT, VIEWS
+
+BASE_DPI = 96
+U_PX = 40
+RACK_PX = 280
+LABEL_PX = 30
+TITLE_PX = 30
+RAIL_PX = 14
+GAP_PX = 40
+PAD_PX = 20
+EXPORT_FORMATS = ("png", "svg", "pdf")
+LEGEND_PX = 280
+LEGEND_ROW_PX = 18
+PAGE_GAP_PX = 40
+PAGES_PER_WORKER = 4
+BACKGROUND = '#1e1e1e'
+# Tk colour names used by the bundled catalogs; PDF needs them as RGB.
+COLOR_NAMES = {
+    'black': '#000000', 'white': '#ffffff', 'gray': '#bebebe', 'grey': '#bebebe', 'red': '#ff0000',
+    'green': '#00ff00', 'blue': '#0000ff', 'yellow': '#ffff00', 'orange': '#ffa500', 'purple': '#a020f0',
+    'skyblue': '#87ceeb', 'lightblue': '#add8e6', 'lightgreen': '#90ee90', 'lightgray': '#d3d3d3',
+    'lightgrey': '#d3d3d3', 'darkgray': '#a9a9a9', 'darkgrey': '#a9a9a9', 'silver': '#c0c0c0',
+    'gold': '#ffd700', 'pink': '#ffc0cb', 'brown': '#a52a2a', 'navy': '#000080', 'teal': '#008080',
+    'cyan': '#00ffff', 'magenta': '#ff00ff', 'tomato': '#ff6347', 'salmon': '#fa8072', 'khaki': '#f0e68c',
+    'orchid': '#da70d6', 'plum': '#dda0dd', 'tan': '#d2b48c', 'coral': '#ff7f50', 'steelblue': '#4682b4',
+    'slategray': '#708090', 'slategrey': '#708090', 'dimgray': '#696969', 'dimgrey': '#696969',
+}
+# Advance widths (1/1000 em) of the standard Helvetica fonts for ASCII 32-126,
+# so centred PDF text lines up without embedding a font.
+HELVETICA_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278, 556, 556, 556, 556,
+    556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556, 1015, 667, 667, 722, 722, 667, 611, 778,
+    722, 278, 500, 667, 556, 833, 722, 778, 667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278,
+    278, 278, 469, 556, 333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584)
+HELVETICA_BOLD_WIDTHS = (
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278, 556, 556, 556, 556,
+    556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611, 975, 722, 722, 722, 722, 667, 611, 778,
+    722, 278, 556, 722, 611, 833, 722, 778, 667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333,
+    278, 333, 584, 556, 333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584)
+
+
+def escape(text):
+    # xml.sax.saxutils.escape without its import cost (it pulls in urllib).
+    return _html_escape(text, quote=False)
+
+
+def text_color_for(color_hex):
+    if len(color_hex) == 7 and color_hex.startswith('#'):
+        r, g, b = int(color_hex[1:3], 16), int(color_hex[3:5], 16), int(color_hex[5:7], 16)
+        return 'white' if (0.299*r + 0.587*g + 0.114*b)/255 < 0.5 else 'black'
+    return 'black'
+
+
+def elevation_size(rack_height, view_count=len(VIEWS), dpi=BASE_DPI):
+    s = dpi / BASE_DPI
+    face_w = LABEL_PX + RACK_PX
+    width = (2 * PAD_PX + view_count * face_w + (view_count - 1) * GAP_PX) * s
+    height = (2 * PAD_PX + TITLE_PX + rack_height * U_PX) * s
+    return int(round(width)), int(round(height))
+
+
+def elevation_shapes(rack_height, views, view_names=VIEWS, dpi=BASE_DPI, titles=None, detail=True):
+    # Format-neutral drawing list: ('rect', x1, y1, x2, y2, fill, outline),
+    # ('line', x1, y1, x2, y2, color, width), ('oval', x1, y1, x2, y2, fill) and
+    # ('text', x, y, text, color, size, anchor, bold), in pixels at `dpi`.
+    # Without `detail` the rail holes, U numbers and labels are left out.
+    s = dpi / BASE_DPI
+    rack_h = rack_height * U_PX
+    face_w = LABEL_PX + RACK_PX
+    shapes = []
+
+    for n, view in enumerate(view_names):
+        left = PAD_PX + n * (face_w + GAP_PX)
+        rx1, rx2 = left + LABEL_PX, left + face_w
+        top = PAD_PX + TITLE_PX
+
+        title = titles[n] if titles else view
+        if title:
+            shapes.append(('text', (rx1 + rx2) / 2 * s, (PAD_PX + TITLE_PX / 2) * s, title, '#cccccc', 12 * s, 'center', True))
+        shapes.append(('rect', rx1 * s, top * s, rx2 * s, (top + rack_h) * s, '#282828', None))
+        for i in range(rack_height if detail else 0):
+            y = top + i * U_PX
+            shapes.append(('line', rx1 * s, y * s, rx2 * s, y * s, '#444444', s))
+            shapes.append(('text', (left + 15) * s, (y + U_PX / 2) * s, str(rack_height - i), '#888888', 9 * s, 'center', False))
+            for j in (1, 2, 3):
+                hole_y = y + j * U_PX / 4
+                shapes.append(('oval', (rx1 + 5) * s, (hole_y - 2) * s, (rx1 + 9) * s, (hole_y + 2) * s, '#111111'))
+                shapes.append(('oval', (rx2 - 9) * s, (hole_y - 2) * s, (rx2 - 5) * s, (hole_y + 2) * s, '#111111'))
+        shapes.append(('line', rx1 * s, top * s, rx1 * s, (top + rack_h) * s, '#555555', 2 * s))
+        shapes.append(('line', rx2 * s, top * s, rx2 * s, (top + rack_h) * s, '#555555', 2 * s))
+        shapes.append(('line', rx1 * s, (top + rack_h) * s, rx2 * s, (top + rack_h) * s, '#555555', s))
+
+        for comp in sorted(views.get(view, []), key=lambda c: bool(c.get('rail'))):
+            y1 = top + (rack_height - (comp['start_u_slot'] + comp['size_u'] - 1)) * U_PX
+            y2 = y1 + comp['size_u'] * U_PX
+            color_hex = comp.get('color', 'skyblue')
+            if comp.get('rail'):
+                # 0U items are narrow strips over their side rail, unlabelled.
+                x1 = rx1 + 1 if comp['rail'] == 'Left' else rx2 - RAIL_PX
+                shapes.append(('rect', x1 * s, (y1 + 1) * s, (x1 + RAIL_PX - 1) * s, (y2 - 1) * s, color_hex, '#333333'))
+                continue
+            shapes.append(('rect', (rx1 + 2) * s, (y1 + 1) * s, (rx2 - 2) * s, (y2 - 1) * s, color_hex, '#333333'))
+            if detail:
+                shapes.append(('text', (rx1 + rx2) / 2 * s, (y1 + y2) / 2 * s, comp['name'], text_color_for(color_hex), 9 * s, 'center', True))
+
+    width, height = elevation_size(rack_height, len(view_names), dpi)
+    return width, height, shapes
+
+
+def svg_elements(shapes):
+    out = []
+    for shape in shapes:
+        kind = shape[0]
+        if kind == 'rect':
+            _, x1, y1, x2, y2, fill, outline = shape
+            stroke = f' stroke="{outline}"' if outline else ''
+            out.append(f'<rect x="{x1:.1f}" y="{y1:.1f}" width="{x2 - x1:.1f}" height="{y2 - y1:.1f}" fill="{escape(fill)}"{stroke}/>')
+        elif kind == 'line':
+            _, x1, y1, x2, y2, color, w = shape
+            out.append(f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" stroke="{color}" stroke-width="{w:.1f}"/>')
+        elif kind == 'oval':
+            _, x1, y1, x2, y2, fill = shape
+            out.append(f'<ellipse cx="{(x1 + x2) / 2:.1f}" cy="{(y1 + y2) / 2:.1f}" rx="{(x2 - x1) / 2:.1f}" ry="{(y2 - y1) / 2:.1f}" fill="{fill}"/>')
+        else:
+            _, x, y, text, color, size, anchor, bold = shape
+            text_anchor = 'middle' if anchor == 'center' else 'start'
+            weight = ' font-weight="bold"' if bold else ''
+            out.append(f'<text x="{x:.1f}" y="{y:.1f}" fill="{color}" font-family="Arial, sans-serif" font-size="{size:.1f}"'
+                       f'{weight} text-anchor="{text_anchor}" dominant-baseline="central">{escape(text)}</text>')
+    return out
+
+
+def render_svg(rack_height, views, file_path, view_names=VIEWS, dpi=BASE_DPI):
+    width, height, shapes = elevation_shapes(rack_height, views, view_names, dpi)
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">',
+           f'<rect width="{width}" height="{height}" fill="#1e1e1e"/>']
+    out.extend(svg_elements(shapes))
+    out.append('</svg>')
+    with open(file_path, 'w') as f:
+        f.write("\n".join(out))
+
+
+def _font(size, bold):
+    from PIL import ImageFont
+    for name in (("DejaVuSans-Bold.ttf", "Arial Bold.ttf", "arialbd.ttf") if bold else ("DejaVuSans.ttf", "Arial.ttf", "arial.ttf")):
+        try:
+            return ImageFont.truetype(name, int(round(size)))
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=int(round(size)))
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def render_png(rack_height, views, file_path, view_names=VIEWS, dpi=BASE_DPI):
+    try:
+        from PIL import Image, ImageDraw
+    except ImportError:
+        raise RuntimeError("PNG export needs Pillow (pip install Pillow); SVG export does not.")
+
+    width, height, shapes = elevation_shapes(rack_height, views, view_names, dpi)
+    image = Image.new("RGB", (width, height), '#1e1e1e')
+    draw = ImageDraw.Draw(image)
+    fonts = {}
+    for shape in shapes:
+        kind = shape[0]
+        if kind == 'rect':
+            _, x1, y1, x2, y2, fill, outline = shape
+            draw.rectangle((x1, y1, x2, y2), fill=fill, outline=outline)
+        elif kind == 'line':
+            _, x1, y1, x2, y2, color, w = shape
+            draw.line((x1, y1, x2, y2), fill=color, width=max(1, int(round(w))))
+        elif kind == 'oval':
+            _, x1, y1, x2, y2, fill = shape
+            draw.ellipse((x1, y1, x2, y2), fill=fill)
+        else:
+            _, x, y, text, color, size, anchor, bold = shape
+            key = (int(round(size)), bold)
+            if key not in fonts:
+                fonts[key] = _font(size, bold)
+            left, top, right, bottom = draw.textbbox((0, 0), text, font=fonts[key])
+            if anchor == 'center':
+                x -= (right - left) / 2 + left
+            y -= (bottom - top) / 2 + top
+            draw.text((x, y), text, fill=color, font=fonts[key])
+    image.save(file_path, dpi=(dpi, dpi))
+
+
+def render_elevation(rack_height, views, file_path, dpi=BASE_DPI, view_names=VIEWS):
+    if os.path.splitext(file_path)[1].lower() == ".svg":
+        render_svg(rack_height, views, file_path, view_names, dpi)
+    else:
+        render_png(rack_height, views, file_path, view_names, dpi)
+
+
+def export_project(project_path, out_path, dpi=BASE_DPI):
+    # Multi-rack projects get one file per rack, named <out>-<rack>.<ext>.
+    racks = read_project(project_path)["racks"]
+    if len(racks) == 1:
+        render_elevation(racks[0]["rack_height"], racks[0]["views"], out_path, dpi)
+        return [out_path]
+    stem, ext = os.path.splitext(out_path)
+    written = []
+    for rack in racks:
+        rack_path = f"{stem}-{safe_file_name(rack['name'])}{ext}"
+        render_elevation(rack["rack_height"], rack["views"], rack_path, dpi)
+        written.append(rack_path)
+    return written
+
+
+def output_paths(project_paths, out_dir, fmt):
+    # [(project, output path)], named after the project file. Projects that
+    # share a file name (a/rack.json, b/rack.json) get their folder's name in
+    # front, then a number if that is not enough.
+    stems = [os.path.splitext(os.path.basename(path))[0] for path in project_paths]
+    taken, paths = set(), []
+    for path, stem in zip(project_paths, stems):
+        if stems.count(stem) > 1:
+            folder = os.path.basename(os.path.dirname(os.path.abspath(path)))
+            stem = f"{safe_file_name(folder)}-{stem}" if folder else stem
+        name, n = stem, 2
+        while name.lower() in taken:
+            name, n = f"{stem}-{n}", n + 1
+        taken.add(name.lower())
+        paths.append((path, os.path.join(out_dir, f"{name}.{fmt}")))
+    return paths
+
+
+def export_batch(project_paths, out_dir, fmt="png", dpi=BASE_DPI, workers=None):
+    # Renders each project in a worker process; yields (project, outputs,
+    # error) as each one finishes.
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path, out_path in output_paths(project_paths, out_dir, fmt):
+            jobs[pool.submit(export_project, path, out_path, dpi)] = (path, out_path)
+        for future in as_completed(jobs):
+            path, out_path = jobs[future]
+            try:
+                yield path, future.result(), None
+            except Exception as e:
+                yield path, None, f"{e}"
+
+
+def rack_totals(views):
+    # Power, weight, U used per face and a per-device breakdown for a legend.
+    watts = weight = 0
+    used, devices = {}, {}
+    for view, comps in views.items():
+        for comp in comps:
+            watts += comp.get('watts', 0) or 0
+            weight += comp.get('weight', 0) or 0
+            if not comp.get('rail'):
+                used[view] = used.get(view, 0) + comp['size_u']
+            key = (comp['name'], comp.get('color', 'skyblue'))
+            count, device_watts = devices.get(key, (0, 0))
+            devices[key] = (count + 1, device_watts + (comp.get('watts', 0) or 0))
+    return {"watts": watts, "weight": weight, "used": used,
+            "devices": [(name, color, count, w) for (name, color), (count, w) in sorted(devices.items())]}
+
+
+def book_page(rack, dpi=BASE_DPI):
+    # One book page: Front and Rear side by side with a legend to their right.
+    width, height, shapes = elevation_shapes(rack["rack_height"], rack["views"], dpi=dpi)
+    s = dpi / BASE_DPI
+    totals = rack_totals(rack["views"])
+    left, y = width / s, PAD_PX + TITLE_PX / 2
+
+    def line(text, color='#cccccc', size=10, bold=False, indent=0):
+        nonlocal y
+        shapes.append(('text', (left + indent) * s, y * s, text, color, size * s, 'start', bold))
+        y += LEGEND_ROW_PX
+
+    line(rack["name"], size=14, bold=True)
+    if rack.get("row") is not None:
+        line(f"Row {rack['row']}", '#888888')
+    y += LEGEND_ROW_PX / 2
+    line(f"Power: {totals['watts']:,g} W", '#FFD54F')
+    line(f"Heat: {totals['watts'] * BTU_PER_WATT:,.0f} BTU/h", '#FF8A65')
+    line(f"Weight: {totals['weight']:,g} kg", '#81C784')
+    line(", ".join(f"{view} {totals['used'].get(view, 0):g}/{rack['rack_height']}U" for view in VIEWS))
+    y += LEGEND_ROW_PX / 2
+    if totals["devices"]:
+        line("Devices", bold=True)
+    for name, color, count, watts in totals["devices"]:
+        shapes.append(('rect', left * s, (y - 6) * s, (left + 12) * s, (y + 6) * s, color, '#333333'))
+        label = name if len(name) <= 30 else name[:29] + "\u2026"
+        line(f"{count} x {label}" + (f"  ({watts:,g} W)" if watts else ""), indent=20)
+    height = max(height, int(round((y + PAD_PX) * s)))
+    return int(round((left + LEGEND_PX) * s)), height, shapes
+
+
+def _rgb(color):
+    color = COLOR_NAMES.get(color.lower().replace(' ', ''), color) if not color.startswith('#') else color
+    if len(color) == 4:
+        color = '#' + ''.join(c * 2 for c in color[1:])
+    try:
+        return tuple(int(color[i:i + 2], 16) / 255 for i in (1, 3, 5))
+    except ValueError:
+        return (0.5, 0.5, 0.5)
+
+
+def _pdf_text_width(text, size, bold):
+    widths = HELVETICA_BOLD_WIDTHS if bold else HELVETICA_WIDTHS
+    return sum(widths[ord(c) - 32] if 32 <= ord(c) < 127 else 556 for c in text) * size / 1000
+
+
+def _pdf_string(text):
+    # Literal string in WinAnsi; what it cannot encode becomes '?'.
+    raw = text.encode('cp1252', 'replace').decode('latin-1')
+    return "(" + raw.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def pdf_content(width, height, shapes, dpi=BASE_DPI):
+    # Page content stream for shapes in pixels at `dpi`: one transform maps
+    # them to points with y pointing down, as on screen. Colours and line
+    # widths are only set when they change.
+    k = 72 / dpi
+    ops = [f"{k:.4f} 0 0 {-k:.4f} 0 {height * k:.2f} cm",
+           "%.3f %.3f %.3f rg 0 0 %d %d re f" % (_rgb(BACKGROUND) + (width, height))]
+    state, colors = {}, {}
+
+    def use(op, value):
+        if state.get(op) != value:
+            state[op] = value
+            if op in ('w', 'J'):
+                ops.append(f"{value:.2f} w" if op == 'w' else f"{value} J")
+            else:
+                if value not in colors:
+                    colors[value] = "%.3f %.3f %.3f" % _rgb(value)
+                ops.append(f"{colors[value]} {op}")
+
+    for shape in shapes:
+        kind = shape[0]
+        if kind == 'rect':
+            _, x1, y1, x2, y2, fill, outline = shape
+            use('rg', fill)
+            if outline:
+                use('RG', outline)
+                use('w', 1)
+            ops.append(f"{x1:.2f} {y1:.2f} {x2 - x1:.2f} {y2 - y1:.2f} re {'B' if outline else 'f'}")
+        elif kind == 'line':
+            _, x1, y1, x2, y2, color, w = shape
+            use('RG', color)
+            use('w', w)
+            use('J', 0)
+            ops.append(f"{x1:.2f} {y1:.2f} m {x2:.2f} {y2:.2f} l S")
+        elif kind == 'oval':
+            _, x1, y1, x2, y2, fill = shape
+            cx, cy, rx, ry = (x1 + x2) / 2, (y1 + y2) / 2, (x2 - x1) / 2, (y2 - y1) / 2
+            if abs(rx - ry) < 0.01:
+                # A circle is a zero-length stroke with round caps: the rail
+                # holes are most of a page, and this keeps them short.
+                use('RG', fill)
+                use('w', 2 * rx)
+                use('J', 1)
+                ops.append(f"{cx:.2f} {cy:.2f} m {cx:.2f} {cy:.2f} l S")
+                continue
+            # Otherwise four Bezier quarter arcs.
+            use('rg', fill)
+            kx, ky = rx * 0.5523, ry * 0.5523
+            ops.append(f"{cx + rx:.2f} {cy:.2f} m "
+                       f"{cx + rx:.2f} {cy + ky:.2f} {cx + kx:.2f} {cy + ry:.2f} {cx:.2f} {cy + ry:.2f} c "
+                       f"{cx - kx:.2f} {cy + ry:.2f} {cx - rx:.2f} {cy + ky:.2f} {cx - rx:.2f} {cy:.2f} c "
+                       f"{cx - rx:.2f} {cy - ky:.2f} {cx - kx:.2f} {cy - ry:.2f} {cx:.2f} {cy - ry:.2f} c "
+                       f"{cx + kx:.2f} {cy - ry:.2f} {cx + rx:.2f} {cy - ky:.2f} {cx + rx:.2f} {cy:.2f} c f")
+        else:
+            _, x, y, text, color, size, anchor, bold = shape
+            use('rg', color)
+            if anchor == 'center':
+                x -= _pdf_text_width(text, size, bold) / 2
+            # The text matrix flips y back so glyphs are upright; the baseline
+            # sits about a third of the size below the centre line.
+            ops.append(f"BT /F{2 if bold else 1} {size:.2f} Tf 1 0 0 -1 {x:.2f} {y + size * 0.35:.2f} Tm {_pdf_string(text)} Tj ET")
+    return "\n".join(ops).encode('latin-1')
+
+
+class PdfBook:
+    # Writes a PDF page by page: each page goes to disk as it is added and
+    # only object offsets and page titles are kept for the trailer.
+    def __init__(self, file_path):
+        self.f = open(file_path, 'wb')
+        self.offsets = {}
+        self.pages = []
+        self.next_id = 5  # 1 catalog, 2 page tree, 3-4 fonts
+        self.f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        for obj_id, font in ((3, "Helvetica"), (4, "Helvetica-Bold")):
+            self._object(obj_id, f"<< /Type /Font /Subtype /Type1 /BaseFont /{font} /Encoding /WinAnsiEncoding >>".encode())
+
+    def _object(self, obj_id, body):
+        self.offsets[obj_id] = self.f.tell()
+        self.f.write(b"%d 0 obj\n" % obj_id + body + b"\nendobj\n")
+
+    def _new_id(self):
+        self.next_id += 1
+        return self.next_id - 1
+
+    def add_page(self, width_pt, height_pt, stream, title):
+        # `stream` is a zlib-compressed content stream.
+        content_id, page_id = self._new_id(), self._new_id()
+        self._object(content_id, b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        self._object(page_id, (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width_pt:.2f} {height_pt:.2f}]"
+                               f" /Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {content_id} 0 R >>").encode())
+        self.pages.append((page_id, title))
+
+    def close(self):
+        # Page tree, one bookmark per page, catalog, then the xref table.
+        kids = " ".join(f"{page_id} 0 R" for page_id, _ in self.pages)
+        self._object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.pages)} >>".encode())
+        outline_id = self._new_id()
+        item_ids = [self._new_id() for _ in self.pages]
+        for n, ((page_id, title), item_id) in enumerate(zip(self.pages, item_ids)):
+            links = "".join(f" /{key} {item_ids[m]} 0 R" for key, m in (("Prev", n - 1), ("Next", n + 1)) if 0 <= m < len(item_ids))
+            # Bookmarks take UTF-16, so rack names survive in full there.
+            self._object(item_id, (f"<< /Title <feff{title.encode('utf-16-be').hex()}> /Parent {outline_id} 0 R{links}"
+                                   f" /Dest [{page_id} 0 R /Fit] >>").encode('latin-1'))
+        ends = f" /First {item_ids[0]} 0 R /Last {item_ids[-1]} 0 R" if item_ids else ""
+        self._object(outline_id, f"<< /Type /Outlines{ends} /Count {len(item_ids)} >>".encode())
+        self._object(1, f"<< /Type /Catalog /Pages 2 0 R /Outlines {outline_id} 0 R /PageMode /UseOutlines >>".encode())
+        xref = self.f.tell()
+        self.f.write(b"xref\n0 %d\n0000000000 65535 f \n" % self.next_id)
+        self.f.write(b"".join(b"%010d 00000 n \n" % self.offsets[i] for i in range(1, self.next_id)))
+        self.f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (self.next_id, xref))
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+        else:
+            self.f.close()
+
+
+class SvgBook:
+    # Pages stacked top to bottom in one SVG. The size is only known at the
+    # end, so the header leaves room for it and is patched on close.
+    def __init__(self, file_path):
+        self.f = open(file_path, 'w', encoding='utf-8')
+        self.width, self.height, self.pages = 0, 0, 0
+        self.f.write(self._header() + "\n")
+
+    def _header(self):
+        header = (f'<svg xmlns="http://www.w3.org/2000/svg" width="{self.width}" height="{self.height}"'
+                  f' viewBox="0 0 {self.width} {self.height}"')
+        return f"{header:<140}>"
+
+    def add_page(self, width, height, elements, title):
+        if self.pages:
+            self.height += PAGE_GAP_PX
+        self.f.write(f'<g id="page-{self.pages + 1}" transform="translate(0 {self.height})"><title>{escape(title)}</title>\n'
+                     f'<rect width="{width}" height="{height}" fill="{BACKGROUND}"/>\n{elements}\n</g>\n')
+        self.width = max(self.width, width)
+        self.height += height
+        self.pages += 1
+
+    def close(self):
+        self.f.write('</svg>\n')
+        self.f.seek(0)
+        self.f.write(self._header())
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+        else:
+            self.f.close()
+
+
+def render_page(fmt, rack, dpi=BASE_DPI):
+    # (width, height, payload) for one rack: a compressed content stream in
+    # points for PDF, the page's elements for SVG. Runs in worker processes.
+    width, height, shapes = book_page(rack, dpi)
+    if fmt == "pdf":
+        return width * 72 / dpi, height * 72 / dpi, zlib.compress(pdf_content(width, height, shapes, dpi))
+    return width, height, "\n".join(svg_elements(shapes))
+
+
+def iter_racks(project_path):
+    # Racks of a project one at a time. A .rackdb file is read rack by rack,
+    # so a room of hundreds of racks is never in memory at once.
+    from rack_store import ProjectStore, is_store_path
+    if not is_store_path(project_path):
+        yield from read_project(project_path)["racks"]
+        return
+    store = ProjectStore(project_path)
+    try:
+        project, _ = store.open()
+        for rack in project.racks:
+            yield {"name": rack.name, "row": rack.row, "rack_height": rack.rack_height, "views": store.rack_views(rack)}
+    finally:
+        store.close()
+
+
+def _rendered_pages(racks, fmt, dpi, workers):
+    # Yields (rack name, rendered page) in rack order. With workers, only a
+    # few pages per worker are in flight, so memory stays flat however many
+    # racks there are (Executor.map would queue every rack up front).
+    if workers == 1:
+        for rack in racks:
+            yield rack["name"], render_page(fmt, rack, dpi)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    workers = workers or os.cpu_count() or 1
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for rack in racks:
+            pending.append((rack["name"], pool.submit(render_page, fmt, rack, dpi)))
+            if len(pending) >= workers * PAGES_PER_WORKER:
+                name, future = pending.popleft()
+                yield name, future.result()
+        while pending:
+            name, future = pending.popleft()
+            yield name, future.result()
+
+
+def write_book(racks, file_path, dpi=BASE_DPI, workers=1):
+    # One page per rack (Front, Rear and a legend) streamed into a multi-page
+    # PDF, or a single SVG with the pages stacked. Returns the page count.
+    # Pages go to a temp file next to the target, which replaces it only once
+    # the book is complete, as in rack_io.write_json_atomic.
+    fmt = "svg" if os.path.splitext(file_path)[1].lower() == ".svg" else "pdf"
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=f".{fmt}", dir=os.path.dirname(os.path.abspath(file_path)))
+    os.close(fd)
+    pages = 0
+    try:
+        with (SvgBook if fmt == "svg" else PdfBook)(tmp_path) as book:
+            for name, (width, height, payload) in _rendered_pages(racks, fmt, dpi, workers):
+                book.add_page(width, height, payload, name)
+                pages += 1
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return pages
+
+
+def export_book(project_path, out_path, dpi=BASE_DPI, workers=1):
+    return write_book(iter_racks(project_path), out_path, dpi, workers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render rack elevations (Front and Rear) from project files.")
+    parser.add_argument("projects", nargs="+", help="project files (.json; .rackdb for books)")
+    parser.add_argument("-o", "--out-dir", default=".", help="output directory (default: current directory)")
+    parser.add_argument("-f", "--format", choices=EXPORT_FORMATS, default="png",
+                        help="pdf writes one multi-page book per project")
+    parser.add_argument("--book", action="store_true", help="with -f svg, stack all racks of a project in one SVG")
+    parser.add_argument("--dpi", type=int, default=BASE_DPI)
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    if args.book and args.format == "png":
+        parser.error("--book needs -f pdf or -f svg")
+    if args.format == "pdf" or args.book:
+        return _main_books(args)
+    failed = 0
+    for path, outputs, error in export_batch(args.projects, args.out_dir, args.format, args.dpi, args.jobs):
+        if error:
+            failed += 1
+            print(f"{path}: error: {error}", file=sys.stderr)
+        else:
+            print(f"{path} -> {', '.join(outputs)}")
+    return 1 if failed else 0
+
+
+def _main_books(args):
+    # Projects one after another; the workers render pages of the current one.
+    os.makedirs(args.out_dir, exist_ok=True)
+    failed = 0
+    for path, out_path in output_paths(args.projects, args.out_dir, args.format):
+        try:
+            pages = export_book(path, out_path, args.dpi, args.jobs)
+        except Exception as e:
+            failed += 1
+            print(f"{path}: error: {e}", file=sys.stderr)
+            continue
+        print(f"{path} -> {out_path} ({pages} page{'s' if pages != 1 else ''})")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# Undo/redo as recorded model operations. Each entry holds the operations of
+# one user action (a drop, a rack shrink that drops several items, a scripted
+# batch) and is undone by applying their inverses to the model, so memory and
+# undo cost scale with the size of the edit rather than the size of the rack.
+from collections import deque
+from contextlib import contextmanager
+
+from rack_model import RackModel, clean_component
+from rack_perf import deep_size
+
+DEFAULT_HISTORY_DEPTH = 200
+DEFAULT_HISTORY_OPS = 50000
+
+
+class History:
+    def __init__(self, max_depth=DEFAULT_HISTORY_DEPTH, max_ops=DEFAULT_HISTORY_OPS):
+        self.max_depth = max_depth
+        self.max_ops = max_ops
+        self._undo = deque()
+        self._redo = []
+        self._pending = []
+        self._group_depth = 0
+        self._replaying = False
+        self._op_count = 0
+        self._listeners = {}
+
+    def watch(self, model):
+        def listener(kind, view, comp, prev):
+            self._record(model, kind, view, comp, prev)
+        self._listeners[id(model)] = (model, listener)
+        model.subscribe(listener)
+
+    def unwatch(self, model):
+        entry = self._listeners.pop(id(model), None)
+        if entry:
+            model.unsubscribe(entry[1])
+
+    def forget(self, model):
+        # For racks leaving the project: stop listening and drop every entry
+        # that would replay against the detached model.
+        self.unwatch(model)
+        self._pending = [op for op in self._pending if op[0] is not model]
+        kept = [entry for entry in self._undo if all(op[0] is not model for op in entry)]
+        self._undo = deque(kept)
+        self._op_count = sum(len(entry) for entry in kept)
+        self._redo = [entry for entry in self._redo if all(op[0] is not model for op in entry)]
+
+    def _record(self, model, kind, view, comp, prev):
+        if self._replaying:
+            return
+        if kind == 'add':
+            op = (model, 'add', view, clean_component(comp), None)
+        elif kind == 'remove':
+            op = (model, 'remove', view, clean_component(comp), prev)
+        elif kind == 'move':
+            op = (model, 'move', view, comp['uid'], (prev, comp['start_u_slot']))
+        elif kind == 'resize':
+            op = (model, 'resize', view, comp['uid'], (prev, comp['size_u']))
+        elif kind == 'height':
+            op = (model, 'height', None, None, (prev, model.rack_height))
+        else:
+            # A wholesale reload is a new baseline: nothing before it can be
+            # replayed against the new state.
+            self.clear()
+            return
+        self._pending.append(op)
+        self._redo.clear()
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self._pending = []
+        self._op_count = 0
+
+    def checkpoint(self):
+        # Closes the pending operations into one undo entry, unless a group()
+        # is open, in which case the group's exit does it.
+        if self._group_depth or not self._pending:
+            return
+        entry, self._pending = self._pending, []
+        self._undo.append(entry)
+        self._op_count += len(entry)
+        while self._undo and (len(self._undo) > self.max_depth or self._op_count > self.max_ops):
+            self._op_count -= len(self._undo.popleft())
+
+    @contextmanager
+    def group(self):
+        self._group_depth += 1
+        try:
+            yield self
+        finally:
+            self._group_depth -= 1
+            self.checkpoint()
+
+    def can_undo(self):
+        return bool(self._undo or self._pending)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def __len__(self):
+        return len(self._undo)
+
+    @property
+    def op_count(self):
+        return self._op_count + len(self._pending)
+
+    def nbytes(self):
+        # Approximate memory held by the recorded operations, not counting
+        # the models they point at.
+        return deep_size([self._undo, self._redo, self._pending], skip=(RackModel,))
+
+    def undo(self):
+        self.checkpoint()
+        if not self._undo:
+            return None
+        entry = self._undo.pop()
+        self._op_count -= len(entry)
+        change = self._replay(reversed(entry), inverse=True)
+        self._redo.append(entry)
+        return change
+
+    def redo(self):
+        if not self._redo:
+            return None
+        entry = self._redo.pop()
+        change = self._replay(entry, inverse=False)
+        self._undo.append(entry)
+        self._op_count += len(entry)
+        return change
+
+    def rewind(self, steps, models):
+        # Applies the inverses of the newest `steps` undo entries (pending
+        # operations count as one) to copies of the models, given as a
+        # {live model: copy} map, to rebuild an earlier state for comparison.
+        # The live models and the history itself are left alone.
+        entries = ([self._pending] if self._pending else []) + list(reversed(self._undo))
+        for entry in entries[:steps]:
+            self._replay(reversed(entry), inverse=True, models=models)
+        return min(steps, len(entries))
+
+    def _replay(self, ops, inverse, models=None):
+        # Returns (model, view) of the last operation applied so the caller can
+        # bring the affected rack face into view.
+        self._replaying = True
+        change = None
+        try:
+            for model, kind, view, data, values in ops:
+                if models is not None:
+                    model = models.get(model)
+                    if model is None: continue
+                if kind in ('add', 'remove'):
+                    if (kind == 'add') == inverse:
+                        model.remove(model.get(data['uid']))
+                    else:
+                        model.add(view, dict(data), check=False, index=values)
+                elif kind == 'move':
+                    model.move(model.get(data), values[0] if inverse else values[1], check=False)
+                elif kind == 'resize':
+                    model.resize(model.get(data), values[0] if inverse else values[1], check=False)
+                elif kind == 'height':
+                    model.set_height(values[0] if inverse else values[1])
+                change = (model, view or (change[1] if change else None))
+        finally:
+            self._replaying = False
+        return change
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# Project file reading and writing shared by the GUI and the headless tools.
+import json
+import os
+import tempfile
+
+from rack_model import DEFAULT_U, VIEWS, RackModel, RackProject, clean_component
+
+PROJECT_VERSION = "3.0"
+MULTI_RACK_VERSION = "4.0"
+
+
+def _parse_rack(data, default_name, default_row=0):
+    if "views" in data:
+        views = data["views"]
+    else:
+        views = {"Front": data.get("placed_components", []), "Rear": []}
+    for view in VIEWS:
+        views.setdefault(view, [])
+    return {
+        "name": data.get("name", data.get("rack_name", default_name)),
+        "row": data.get("row", default_row),
+        "rack_height": data.get("rack_height", DEFAULT_U),
+        "views": views,
+        "next_uid": data.get("next_uid", 1),
+    }
+
+
+def _is_end(end):
+    return isinstance(end, dict) and all(k in end for k in ("rack", "uid", "port"))
+
+
+def _parse_connections(connections):
+    if not isinstance(connections, list) or not all(
+            isinstance(c, dict) and _is_end(c.get("a")) and _is_end(c.get("b")) for c in connections):
+        raise ValueError("Project connections must be a list of {a, b} port ends with rack, uid and port.")
+    return connections
+
+
+def parse_project(data):
+    # Accepts v4.0 multi-rack projects ("racks"), the v3.0 single-rack layout
+    # ("views") and the legacy single-view layout ("placed_components" +
+    # "custom_components"). component_categories is None when the file does
+    # not embed a full catalog.
+    if not isinstance(data, dict):
+        raise ValueError("Project file must contain a JSON object.")
+
+    if "racks" in data:
+        racks = [_parse_rack(r, f"Rack {i + 1}") for i, r in enumerate(data["racks"])]
+        if not racks:
+            raise ValueError("Project has no racks.")
+    else:
+        racks = [_parse_rack(data, "Rack 1")]
+
+    return {
+        "racks": racks,
+        "component_categories": data.get("component_categories"),
+        "custom_components": data.get("custom_components"),
+        "connections": _parse_connections(data.get("connections") or []),
+    }
+
+
+def safe_file_name(name):
+    return "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in name) or "rack"
+
+
+def read_project(file_path):
+    with open(file_path, 'r') as f:
+        return parse_project(json.load(f))
+
+
+def build_project(project):
+    return RackProject([RackModel(r["rack_height"], r["views"], name=r["name"], row=r["row"], next_uid=r.get("next_uid", 1))
+                        for r in project["racks"]], project.get("connections"))
+
+
+def _rack_data(rack):
+    return {name: [clean_component(c) for c in comps] for name, comps in rack.views.items()}
+
+
+def project_data(project, component_categories=None):
+    # Single-rack projects keep the v3.0 layout so older builds can open them.
+    if len(project.racks) == 1:
+        rack = project.racks[0]
+        save_data = {
+            "version": PROJECT_VERSION,
+            "rack_name": rack.name,
+            "rack_height": rack.rack_height,
+            "next_uid": rack.next_uid,
+            "views": _rack_data(rack),
+        }
+    else:
+        save_data = {
+            "version": MULTI_RACK_VERSION,
+            "racks": [{"name": rack.name, "row": rack.row, "rack_height": rack.rack_height, "next_uid": rack.next_uid,
+                       "views": _rack_data(rack)} for rack in project.racks],
+        }
+    if project.connections:
+        save_data["connections"] = list(project.connections)
+    if component_categories is not None:
+        save_data["component_categories"] = component_categories
+    return save_data
+
+
+def write_json_atomic(file_path, data, indent=None):
+    # Write to a temp file in the same directory, fsync, then rename over the
+    # target, so readers see either the old file or the complete new one.
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=indent, separators=None if indent else (',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_project(file_path, save_data):
+    write_json_atomic(file_path, save_data, indent=4)
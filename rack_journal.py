@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# Autosave: every model change is appended as one compact line to the current
+# journal segment; compact() periodically swaps in a new segment and hands a
+# captured project to a background thread, which writes it as an atomic
+# snapshot and then deletes the segments the snapshot covers. After a crash,
+# recover() loads the snapshot and replays the remaining journal lines.
+import json
+import os
+import queue
+import re
+import threading
+
+from rack_io import build_project, parse_project, write_json_atomic
+from rack_model import clean_component
+
+AUTOSAVE_DIR = os.path.join(os.path.expanduser("~"), ".rackplanner", "autosave")
+SNAPSHOT_NAME = "snapshot.json"
+SEGMENT_RE = re.compile(r"^journal-(\d+)\.log$")
+
+
+def autosave_dir():
+    return os.environ.get("RACKPLANNER_AUTOSAVE_DIR", AUTOSAVE_DIR)
+
+
+def _segments(directory):
+    found = []
+    for name in os.listdir(directory):
+        m = SEGMENT_RE.match(name)
+        if m:
+            found.append((int(m.group(1)), os.path.join(directory, name)))
+    return sorted(found)
+
+
+def _read_records(directory, after_seq):
+    records = []
+    for _, path in _segments(directory):
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # torn final line from the crash
+                if record[0] > after_seq:
+                    records.append(record)
+    records.sort(key=lambda r: r[0])
+    return records
+
+
+def recover(directory=None):
+    # Returns (parsed project, journal records newer than the snapshot), or
+    # None when there is nothing to recover.
+    directory = directory or autosave_dir()
+    snapshot_path = os.path.join(directory, SNAPSHOT_NAME)
+    if not os.path.exists(snapshot_path):
+        return None
+    with open(snapshot_path, 'r') as f:
+        snapshot = json.load(f)
+    if snapshot["project"].get("store"):
+        from rack_store import fill_stored_racks
+        fill_stored_racks(snapshot["project"])
+    return parse_project(snapshot["project"]), _read_records(directory, snapshot["seq"])
+
+
+def replay(project, records):
+    # Applies journal records to a RackProject built from the snapshot.
+    # Returns how many could be applied.
+    applied = 0
+    for _, rack_name, kind, view, data in records:
+        rack = project.get(rack_name)
+        if rack is None:
+            continue
+        if kind == 'add':
+            rack.add(view, data, check=False)
+        elif kind == 'remove':
+            comp = rack.get(data)
+            if comp is None: continue
+            rack.remove(comp)
+        elif kind == 'move':
+            comp = rack.get(data[0])
+            if comp is None: continue
+            rack.move(comp, data[1], check=False)
+        elif kind == 'resize':
+            comp = rack.get(data[0])
+            if comp is None: continue
+            rack.resize(comp, data[1], check=False)
+        elif kind == 'height':
+            rack.set_height(data)
+        applied += 1
+    return applied
+
+
+def recover_project(directory=None):
+    recovered = recover(directory)
+    if recovered is None:
+        return None
+    data, records = recovered
+    project = build_project(data)
+    replay(project, records)
+    return project, data
+
+
+class Journal:
+    def __init__(self, directory=None):
+        self.directory = directory or autosave_dir()
+        os.makedirs(self.directory, exist_ok=True)
+        segments = _segments(self.directory)
+        self._segment = segments[-1][0] + 1 if segments else 1
+        self._seq = max([r[0] for r in _read_records(self.directory, 0)] + [self._snapshot_seq()])
+        self._file = open(self._segment_path(self._segment), 'a')
+        self._listeners = {}
+        self.pending_ops = 0
+        self.needs_snapshot = True
+        self.last_error = None
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="rack-autosave", daemon=True)
+        self._worker.start()
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, f"journal-{number:06d}.log")
+
+    def _snapshot_seq(self):
+        try:
+            with open(os.path.join(self.directory, SNAPSHOT_NAME), 'r') as f:
+                return json.load(f)["seq"]
+        except (OSError, ValueError, KeyError):
+            return 0
+
+    def watch(self, model):
+        def listener(kind, view, comp, prev):
+            self._record(model, kind, view, comp, prev)
+        self._listeners[id(model)] = (model, listener)
+        model.subscribe(listener)
+
+    def unwatch(self, model):
+        entry = self._listeners.pop(id(model), None)
+        if entry:
+            model.unsubscribe(entry[1])
+
+    def _record(self, model, kind, view, comp, prev):
+        if kind == 'add':
+            data = clean_component(comp)
+        elif kind == 'remove':
+            data = comp['uid']
+        elif kind == 'move':
+            data = [comp['uid'], comp['start_u_slot']]
+        elif kind == 'resize':
+            data = [comp['uid'], comp['size_u']]
+        elif kind == 'height':
+            data = model.rack_height
+        else:
+            self.needs_snapshot = True
+            return
+        self._seq += 1
+        self._file.write(json.dumps([self._seq, model.name, kind, view, data], separators=(',', ':')) + "\n")
+        self._file.flush()
+        self.pending_ops += 1
+
+    def compact(self, capture, force=False):
+        # `capture` runs here, on the thread that owns the models, and must
+        # return project data (rack_io.project_data) that nothing else will
+        # mutate; serializing and writing it happens on the worker thread.
+        # `force` is for structural changes (racks added, catalog edits) that
+        # the journal does not record.
+        if not (force or self.pending_ops or self.needs_snapshot):
+            return False
+        snapshot = {"seq": self._seq, "project": capture()}
+        covered = self._segment
+        self._file.close()
+        self._segment += 1
+        self._file = open(self._segment_path(self._segment), 'a')
+        self.pending_ops = 0
+        self.needs_snapshot = False
+        self._queue.put((snapshot, covered))
+        return True
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            snapshot, covered = job
+            try:
+                write_json_atomic(os.path.join(self.directory, SNAPSHOT_NAME), snapshot)
+                for number, path in _segments(self.directory):
+                    if number <= covered:
+                        os.remove(path)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+
+    def close(self, discard=False):
+        self._queue.put(None)
+        self._worker.join()
+        self._file.close()
+        for model, listener in self._listeners.values():
+            model.unsubscribe(listener)
+        self._listeners = {}
+        if discard:
+            for _, path in _segments(self.directory):
+                os.remove(path)
+            snapshot_path = os.path.join(self.directory, SNAPSHOT_NAME)
+            if os.path.exists(snapshot_path):
+                os.remove(snapshot_path)
@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+# Headless rack state. Nothing in here may import tkinter: layouts are scripted
+# and validated without a display.
+import math
+from contextlib import contextmanager
+
+DEFAULT_U = 12
+VIEWS = ("Front", "Rear")
+# 0U items (vertical PDUs, cable managers) hang on a side rail instead of
+# using rack units. A rail spans the whole depth of the rack.
+RAILS = ("Left", "Right")
+DEPTHS = ("half", "full")
+# Positions and sizes may be multiples of half a U; occupancy is tracked per
+# half U ("slot").
+SUBSLOTS = 2
+# Canvas bookkeeping older builds attached to component dicts; never persisted.
+TRANSIENT_KEYS = ('rect_id', 'text_id')
+BTU_PER_WATT = 3.412
+
+
+def as_u(value):
+    # A U position or size as stored: an int when whole, otherwise a float
+    # that is a multiple of half a U. Raises ValueError for anything else.
+    u = float(value)
+    if not math.isfinite(u) or (u * SUBSLOTS) % 1:
+        raise ValueError(f"{value!r} is not a multiple of 1/{SUBSLOTS} U.")
+    return int(u) if u.is_integer() else u
+
+
+def to_slots(u):
+    n = u * SUBSLOTS
+    if n % 1:
+        raise ValueError(f"{u!r} is not a multiple of 1/{SUBSLOTS} U.")
+    return int(n)
+
+
+def from_slots(n):
+    return n // SUBSLOTS if n % SUBSLOTS == 0 else n / SUBSLOTS
+
+
+def slot_mask(start_u_slot, size_u):
+    # Bit 0 is the lower half of U1 (bottom of the rack).
+    return ((1 << to_slots(size_u)) - 1) << to_slots(start_u_slot - 1)
+
+
+def whole_u_mask(rack_height):
+    # Bits of the slots a U starts on; whole-U items only start there.
+    return int("01" * rack_height, 2) if rack_height > 0 else 0
+
+
+def run_starts(free, width):
+    # Mask of the bits starting a run of `width` set bits, found with
+    # log2(width) shift-and-mask steps instead of a slot-by-slot scan.
+    run, span = free, 1
+    while span < width and run:
+        step = min(span, width - span)
+        run &= run >> step
+        span += step
+    return run
+
+
+def first_run(free, width):
+    # Lowest bit index starting a run of `width` set bits.
+    run = run_starts(free, width)
+    if not run:
+        return None
+    return (run & -run).bit_length() - 1
+
+
+def item_layers(view, comp):
+    # Occupancy layers an item takes up: its own face, both faces when it is
+    # full depth, or just its side rail when it is a 0U item.
+    rail = comp.get('rail')
+    if rail in RAILS:
+        return (rail,)
+    if comp.get('depth') == 'full' and view in VIEWS:
+        return VIEWS
+    return (view,)
+
+
+def changed_span(kind, comp, prev):
+    # Whole-U range (lo, hi) a model event touched, or None when it touched
+    # the whole rack (height changes and resets).
+    if kind in ('add', 'remove'):
+        lo, top = comp['start_u_slot'], comp['start_u_slot'] + comp['size_u']
+    elif kind == 'move':
+        lo, top = min(prev, comp['start_u_slot']), max(prev, comp['start_u_slot']) + comp['size_u']
+    elif kind == 'resize':
+        lo, top = comp['start_u_slot'], comp['start_u_slot'] + max(prev, comp['size_u'])
+    else:
+        return None
+    return math.floor(lo), math.ceil(top) - 1
+
+
+def clean_component(comp):
+    return {k: v for k, v in comp.items() if k not in TRANSIENT_KEYS}
+
+
+class RackModel:
+    def __init__(self, rack_height=DEFAULT_U, views=None, name="Rack 1", row=0, next_uid=1):
+        self.name = name
+        self.row = row
+        self.rack_height = rack_height
+        self.views = {v: [] for v in VIEWS}
+        # Bumped on every change so views of the rack can tell they are stale.
+        self.version = 0
+        self._next_uid = 1
+        self._index = {}
+        self._listeners = []
+        self._batch = None
+        self._reset_aggregates()
+        if views:
+            self.load(rack_height, views)
+        self._next_uid = max(self._next_uid, next_uid)
+
+    def _reset_aggregates(self):
+        # Per layer (each face and side rail, see item_layers): `_occupied` has
+        # a bit per used slot and `_shared` a bit per slot held by more than
+        # one item (a conflict: possible with hand-edited or legacy files, or
+        # a full-depth item behind one on the other face). Per view:
+        # `_watts`/`_weight` are running totals and `_power` the watts drawn
+        # per slot, with each item's draw spread evenly over its slots.
+        layers = list(self.views) + list(RAILS)
+        self._occupied = {layer: 0 for layer in layers}
+        self._shared = {layer: 0 for layer in layers}
+        self._watts = {v: 0 for v in self.views}
+        self._weight = {v: 0 for v in self.views}
+        self._power = {v: [0.0] * self.rack_height * SUBSLOTS for v in self.views}
+        self._whole = whole_u_mask(self.rack_height)
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, kind, view=None, comp=None, prev=None):
+        self.version += 1
+        if self._batch is not None:
+            # Listeners get the component as it was at this point once the
+            # transaction commits; the live dict is kept for rolling back.
+            self._batch.append((kind, view, comp, dict(comp) if comp else None, prev))
+            return
+        for listener in list(self._listeners):
+            listener(kind, view, comp, prev)
+
+    @contextmanager
+    def transaction(self):
+        # Batch edit. Inside the block add/place/move/resize/remove/set_height
+        # skip their own collision checks (so items can swap places) and
+        # listeners hear nothing. On exit the result is checked once: new
+        # overlaps or out-of-bounds items, like an exception in the block,
+        # roll the rack back without telling listeners and raise. Otherwise
+        # listeners get every operation in order. Nested blocks join the
+        # outer one.
+        if self._batch is not None:
+            yield self
+            return
+        self._batch = []
+        shared = dict(self._shared)
+        try:
+            yield self
+            self._check_batch(shared)
+        except BaseException:
+            self._rollback()
+            raise
+        events, self._batch = self._batch, None
+        for kind, view, _, snapshot, prev in events:
+            for listener in list(self._listeners):
+                listener(kind, view, snapshot, prev)
+
+    def _check_batch(self, shared_before):
+        touched = {e[2]['uid'] for e in self._batch if e[2] is not None}
+        for uid in touched:
+            entry = self._index.get(uid)
+            if entry and not self.in_bounds(entry[1]['start_u_slot'], entry[1]['size_u']):
+                raise ValueError(f"'{entry[1]['name']}' does not fit: U{entry[1]['start_u_slot']} + {entry[1]['size_u']}U is outside the rack.")
+        for layer, shared in self._shared.items():
+            new = shared & ~shared_before.get(layer, 0)
+            if new:
+                slot = (new & -new).bit_length() - 1
+                names = [c['name'] for c in self.items_at(layer, slot)]
+                raise ValueError(f"{layer} U{slot // SUBSLOTS + 1} would be used by {' and '.join(repr(n) for n in names)}.")
+
+    def _rollback(self):
+        # Inverse operations in reverse order; they land in the batch list
+        # that is thrown away below, so listeners hear nothing.
+        events = self._batch
+        self._batch = []
+        try:
+            for kind, view, comp, _, prev in reversed(events):
+                if kind == 'add':
+                    self.remove(comp)
+                elif kind == 'remove':
+                    self.add(view, comp, check=False, index=prev)
+                elif kind == 'move':
+                    self.move(comp, prev, check=False)
+                elif kind == 'resize':
+                    self.resize(comp, prev, check=False)
+                elif kind == 'height':
+                    self.set_height(prev)
+        finally:
+            self._batch = None
+
+    def _slots(self, comp):
+        # Slot range [lo, hi) of an item, clipped to the rack. Positions that
+        # are not on a half U (hand-edited files) are rounded down.
+        lo, width = comp['start_u_slot'] * SUBSLOTS - SUBSLOTS, comp['size_u'] * SUBSLOTS
+        if type(lo) is not int or type(width) is not int:
+            lo, width = int(lo), int(width)
+        hi, top = lo + width, self.rack_height * SUBSLOTS
+        return (lo if lo > 0 else 0), (hi if hi < top else top)
+
+    def _mark(self, view, comp, delta):
+        lo, hi = self._slots(comp)
+        watts = comp.get('watts', 0) or 0
+        self._watts[view] += delta * watts
+        self._weight[view] += delta * (comp.get('weight', 0) or 0)
+        if hi <= lo:
+            return
+        per_slot = delta * watts / (comp['size_u'] * SUBSLOTS)
+        if per_slot > 0:
+            power = self._power[view]
+            power[lo:hi] = [p + per_slot for p in power[lo:hi]]
+        elif per_slot:
+            # Rounded so that taking items out leaves exactly 0 behind.
+            power = self._power[view]
+            power[lo:hi] = [round(p + per_slot, 9) for p in power[lo:hi]]
+        mask = ((1 << (hi - lo)) - 1) << lo
+        for layer in item_layers(view, comp):
+            occupied, shared = self._occupied[layer], self._shared[layer]
+            if delta > 0:
+                shared |= occupied & mask
+                occupied |= mask
+            elif not shared & mask:
+                occupied &= ~mask
+            else:
+                occ, sh = self._rescan(layer, mask, comp)
+                occupied, shared = (occupied & ~mask) | occ, (shared & ~mask) | sh
+            self._occupied[layer], self._shared[layer] = occupied, shared
+
+    def _rescan(self, layer, mask, leaving):
+        # Occupied and shared bits within `mask` from the items left in
+        # `layer`. Only needed where items overlap, so a scan is fine.
+        occupied = shared = 0
+        for view, comps in self.views.items():
+            for comp in comps:
+                if comp is leaving or layer not in item_layers(view, comp):
+                    continue
+                lo, hi = self._slots(comp)
+                bits = ((1 << max(0, hi - lo)) - 1) << lo & mask
+                shared |= occupied & bits
+                occupied |= bits
+        return occupied, shared
+
+    def _blocked(self, layers, ignore=None):
+        # Slots used in any of `layers`. Slots that only `ignore` holds are
+        # left out; freeing them is what "ignore" means.
+        blocked = 0
+        if ignore is None:
+            for layer in layers:
+                blocked |= self._occupied[layer]
+            return blocked
+        own_layers = item_layers(self.view_of(ignore), ignore)
+        lo, hi = self._slots(ignore)
+        own = ((1 << hi - lo) - 1) << lo if hi > lo else 0
+        for layer in layers:
+            if layer in own_layers:
+                blocked |= self._occupied[layer] & ~(own & ~self._shared[layer])
+            else:
+                blocked |= self._occupied[layer]
+        return blocked
+
+    def _blocked_for(self, view, ignore, depth, rail):
+        # Blocked-slot mask for placing an item. An existing item keeps its
+        # own mounting unless told otherwise.
+        if ignore is None and rail is None and depth != 'full':
+            return self._occupied[view]
+        if ignore is not None and depth is None and rail is None:
+            if ignore.get('rail') is None and ignore.get('depth') != 'full':
+                # Common case (dragging an ordinary item): one layer.
+                lo, hi = self._slots(ignore)
+                own = ((1 << hi - lo) - 1) << lo if hi > lo else 0
+                return self._occupied[view] & ~(own & ~self._shared[view])
+            return self._blocked(item_layers(view, ignore), ignore)
+        return self._blocked(item_layers(view, {'depth': depth, 'rail': rail}), ignore)
+
+    @property
+    def full_mask(self):
+        return (1 << self.rack_height * SUBSLOTS) - 1
+
+    def in_bounds(self, start_u_slot, size_u):
+        return (size_u > 0 and start_u_slot >= 1 and start_u_slot + size_u - 1 <= self.rack_height
+                and not (start_u_slot * SUBSLOTS) % 1 and not (size_u * SUBSLOTS) % 1)
+
+    def is_slot_available(self, view, start_u_slot, size_u, ignore=None, depth=None, rail=None):
+        # `depth` ('half' or 'full') and `rail` describe the item being
+        # placed; a full-depth item also needs the other face free, and a 0U
+        # item only its rail.
+        lo, width = start_u_slot * SUBSLOTS - SUBSLOTS, size_u * SUBSLOTS
+        if type(lo) is not int or type(width) is not int:
+            if lo % 1 or width % 1:
+                return False
+            lo, width = int(lo), int(width)
+        if width <= 0 or lo < 0 or lo + width > self.rack_height * SUBSLOTS:
+            return False
+        if ignore is None and rail is None and depth != 'full':
+            blocked = self._occupied[view]
+        else:
+            blocked = self._blocked_for(view, ignore, depth, rail)
+        return not blocked >> lo & (1 << width) - 1
+
+    def first_free(self, view, size_u, ignore=None, depth=None, rail=None):
+        # Lowest free start U; whole-U items start on a U boundary, half-U
+        # items may start on any half U.
+        width = size_u * SUBSLOTS
+        if type(width) is not int:
+            if width % 1:
+                return None
+            width = int(width)
+        if width <= 0 or width > self.rack_height * SUBSLOTS:
+            return None
+        free = ~self._blocked_for(view, ignore, depth, rail) & self.full_mask
+        starts = run_starts(free, width)
+        if width % SUBSLOTS == 0:
+            starts &= self._whole
+        if not starts:
+            return None
+        return from_slots((starts & -starts).bit_length() - 1) + 1
+
+    def occupied_mask(self, layer):
+        # Slot mask of a face (including full-depth items mounted on the
+        # other face) or a side rail.
+        return self._occupied[layer]
+
+    def used_u(self, view):
+        return from_slots(bin(self._occupied[view]).count("1"))
+
+    def items_at(self, layer, slot):
+        # Items that take up `slot` (0 = lower half of U1) in `layer`.
+        found = []
+        for view, comps in self.views.items():
+            for comp in comps:
+                lo, hi = self._slots(comp)
+                if lo <= slot < hi and layer in item_layers(view, comp):
+                    found.append(comp)
+        return found
+
+    def conflicts(self):
+        # [(layer, U, [items])] for every U where items collide, including a
+        # full-depth item and one mounted on the other face.
+        found = []
+        for layer, shared in self._shared.items():
+            slot, seen = 0, set()
+            while shared >> slot:
+                if shared >> slot & 1 and slot // SUBSLOTS not in seen:
+                    seen.add(slot // SUBSLOTS)
+                    found.append((layer, slot // SUBSLOTS + 1, self.items_at(layer, slot)))
+                slot += 1
+        return found
+
+    def total_watts(self, view=None):
+        return self._watts[view] if view else sum(self._watts.values())
+
+    def total_weight(self, view=None):
+        return self._weight[view] if view else sum(self._weight.values())
+
+    def power_profile(self, view, lo=1, hi=None):
+        # Watts per U for U`lo`..U`hi`, bottom first.
+        power = self._power[view]
+        return [sum(power[s:s + SUBSLOTS]) for s in range((lo - 1) * SUBSLOTS, (hi or self.rack_height) * SUBSLOTS, SUBSLOTS)]
+
+    def heat_profile(self, view, lo=1, hi=None):
+        # BTU/h per U: all power drawn by IT equipment ends up as heat.
+        return [w * BTU_PER_WATT for w in self.power_profile(view, lo, hi)]
+
+    def has_overlaps(self, layer=None):
+        if layer is not None:
+            return bool(self._shared[layer])
+        return any(self._shared.values())
+
+    @property
+    def next_uid(self):
+        return self._next_uid
+
+    def get(self, uid):
+        entry = self._index.get(uid)
+        return entry[1] if entry else None
+
+    def view_of(self, comp):
+        entry = self._index.get(comp.get('uid'))
+        if entry is None or entry[1] is not comp:
+            raise KeyError(f"'{comp.get('name')}' is not in this rack.")
+        return entry[0]
+
+    def add(self, view, comp, check=True, index=None):
+        if check and self._batch is None and not self.is_slot_available(view, comp['start_u_slot'], comp['size_u'],
+                                                                         depth=comp.get('depth'), rail=comp.get('rail')):
+            raise ValueError(f"Cannot place '{comp['name']}' at U{comp['start_u_slot']}: slots occupied or out of bounds.")
+        uid = comp.get('uid')
+        if not isinstance(uid, int) or uid in self._index:
+            uid = self._next_uid
+        comp['uid'] = uid
+        self._next_uid = max(self._next_uid, uid + 1)
+        self._index[uid] = (view, comp)
+        if index is None:
+            self.views[view].append(comp)
+        else:
+            self.views[view].insert(index, comp)
+        self._mark(view, comp, 1)
+        self._notify('add', view, comp)
+        return comp
+
+    def place(self, view, comp_name, comp_info, start_u_slot=None):
+        size_u = comp_info['size']
+        if start_u_slot is None:
+            start_u_slot = self.first_free(view, size_u, depth=comp_info.get('depth'), rail=comp_info.get('rail'))
+            if start_u_slot is None:
+                return None
+        comp = {
+            'name': comp_name,
+            'start_u_slot': start_u_slot,
+            'size_u': size_u,
+            'color': comp_info.get('color', 'skyblue'),
+            'watts': comp_info.get('watts', 0),
+            'weight': comp_info.get('weight', 0)
+        }
+        for key in ('depth', 'rail', 'ports', 'patch'):
+            if comp_info.get(key):
+                comp[key] = comp_info[key]
+        return self.add(view, comp)
+
+    def move(self, comp, start_u_slot, check=True):
+        view = self.view_of(comp)
+        if check and self._batch is None and not self.is_slot_available(view, start_u_slot, comp['size_u'], ignore=comp):
+            raise ValueError(f"Cannot move '{comp['name']}' to U{start_u_slot}: slots occupied or out of bounds.")
+        old = comp['start_u_slot']
+        if old == start_u_slot:
+            return comp
+        self._mark(view, comp, -1)
+        comp['start_u_slot'] = start_u_slot
+        self._mark(view, comp, 1)
+        self._notify('move', view, comp, old)
+        return comp
+
+    def resize(self, comp, size_u, check=True):
+        # Grows or shrinks upwards from the item's bottom U.
+        view = self.view_of(comp)
+        if check and self._batch is None:
+            if not self.is_slot_available(view, comp['start_u_slot'], size_u, ignore=comp):
+                raise ValueError(f"Cannot resize '{comp['name']}' to {size_u}U: slots occupied or out of bounds.")
+        old = comp['size_u']
+        if old == size_u:
+            return comp
+        self._mark(view, comp, -1)
+        comp['size_u'] = size_u
+        self._mark(view, comp, 1)
+        self._notify('resize', view, comp, old)
+        return comp
+
+    def remove(self, comp):
+        view = self.view_of(comp)
+        self._mark(view, comp, -1)
+        index = self.views[view].index(comp)
+        del self.views[view][index]
+        del self._index[comp['uid']]
+        self._notify('remove', view, comp, index)
+        return comp
+
+    def clear(self, view):
+        removed = list(self.views[view])
+        for comp in reversed(removed):
+            self.remove(comp)
+        return removed
+
+    def set_height(self, new_height):
+        # Items that no longer fit are removed first, so listeners see an
+        # ordinary remove for each of them before the height change itself.
+        dropped = [c for v in self.views for c in self.views[v]
+                   if c['start_u_slot'] + c['size_u'] - 1 > new_height]
+        for comp in dropped:
+            self.remove(comp)
+        old = self.rack_height
+        if new_height == old:
+            return dropped
+        items = [(v, c) for v in self.views for c in self.views[v]]
+        self.rack_height = new_height
+        self._reset_aggregates()
+        for view, comp in items:
+            self._mark(view, comp, 1)
+        self._notify('height', prev=old)
+        return dropped
+
+    def load(self, rack_height, views, notify=True, next_uid=1):
+        # Files are loaded as-is: overlaps and out-of-bounds items are kept
+        # (and reported by has_overlaps/in_bounds) rather than dropped.
+        # notify=False fills a rack that was opened empty (lazily loaded
+        # project stores): that is not an edit, so listeners are not told.
+        # `next_uid` is the saved one; uids of deleted items are not handed
+        # out again, as cables may still name them.
+        if self._batch is not None:
+            raise RuntimeError("A rack cannot be reloaded inside a transaction.")
+        self.rack_height = rack_height
+        self.views = {v: [] for v in VIEWS}
+        for v in views:
+            self.views.setdefault(v, [])
+        self._index = {}
+        self._next_uid = 1
+        self._reset_aggregates()
+        listeners, self._listeners = self._listeners, []
+        try:
+            for view, comps in views.items():
+                for comp in comps:
+                    self.add(view, comp, check=False)
+        finally:
+            self._listeners = listeners
+        self._next_uid = max(self._next_uid, next_uid)
+        if notify:
+            self._notify('reset')
+        else:
+            self.version += 1
+
+
+class RackProject:
+    # A room: racks grouped into rows. Row numbers are free-form integers and
+    # racks keep their insertion order within a row. `connections` are the
+    # cables between item ports (see rack_cabling).
+    def __init__(self, racks=None, connections=None):
+        self.racks = list(racks) if racks is not None else [RackModel()]
+        self.connections = list(connections) if connections is not None else []
+
+    def get(self, name):
+        for rack in self.racks:
+            if rack.name == name:
+                return rack
+        return None
+
+    def unique_name(self, base="Rack"):
+        n = len(self.racks) + 1
+        while self.get(f"{base} {n}"):
+            n += 1
+        return f"{base} {n}"
+
+    def add_rack(self, name=None, rack_height=DEFAULT_U, row=0):
+        if name and self.get(name):
+            raise ValueError(f"A rack named '{name}' already exists.")
+        rack = RackModel(rack_height, name=name or self.unique_name(), row=row)
+        self.racks.append(rack)
+        return rack
+
+    def remove_rack(self, rack):
+        # Cables to the rack go with it: ends are keyed by rack name and uid,
+        # and a later rack of the same name would pick them up. Returns them.
+        if len(self.racks) == 1:
+            raise ValueError("A project needs at least one rack.")
+        self.racks.remove(rack)
+        dropped = [c for c in self.connections if rack.name in (c["a"]["rack"], c["b"]["rack"])]
+        if dropped:
+            self.connections[:] = [c for c in self.connections if rack.name not in (c["a"]["rack"], c["b"]["rack"])]
+        return dropped
+
+    def rows(self):
+        rows = {}
+        for rack in self.racks:
+            rows.setdefault(rack.row, []).append(rack)
+        return [(row, rows[row]) for row in sorted(rows)]
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# Opt-in instrumentation for the GUI hot paths. Targets are registered up
+# front, but their methods are only replaced by timing wrappers while the
+# profiler is enabled, so a normal session pays nothing. Timings can be read
+# as a summary table, written as a Chrome trace (chrome://tracing, Perfetto)
+# or, for a full call graph, captured with cProfile.
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+TRACE_LIMIT = 200000
+
+
+def deep_size(obj, skip=(), seen=None):
+    # Approximate bytes held by obj and everything it references, not
+    # counting objects of the `skip` types (e.g. models shared with the app).
+    seen = set() if seen is None else seen
+    total, stack = 0, [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, skip):
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset, deque)):
+            stack.extend(o)
+    return total
+
+
+class Profiler:
+    def __init__(self, trace_limit=TRACE_LIMIT):
+        self.enabled = False
+        self.stats = {}  # label -> [calls, total_s, max_s]
+        self.events = deque(maxlen=trace_limit)  # (label, start_s, duration_s, thread id)
+        self.counters = deque(maxlen=trace_limit)  # (label, t_s, value)
+        self.gauges = {}
+        self._targets = []
+        self._wrapped = []
+        self._profile = None
+        self.t0 = time.perf_counter()
+
+    def add_target(self, obj, names, prefix):
+        # Methods of `obj` to time as "<prefix>.<name>" whenever enabled.
+        self._targets.append((obj, names, prefix))
+        if self.enabled:
+            self._instrument(obj, names, prefix)
+
+    def add_gauge(self, label, read):
+        # `read()` is sampled by sample_gauges(), e.g. once per panel refresh.
+        self.gauges[label] = read
+
+    def enable(self):
+        if self.enabled: return
+        self.enabled = True
+        for obj, names, prefix in self._targets:
+            self._instrument(obj, names, prefix)
+
+    def disable(self):
+        if not self.enabled: return
+        self.enabled = False
+        # The wrappers live on the instances; deleting them uncovers the
+        # class methods again.
+        for obj, name in self._wrapped:
+            obj.__dict__.pop(name, None)
+        self._wrapped = []
+
+    def _instrument(self, obj, names, prefix):
+        for name in names:
+            fn = getattr(obj, name, None)
+            if fn is None: continue
+            setattr(obj, name, self._wrap(f"{prefix}.{name}", fn))
+            self._wrapped.append((obj, name))
+
+    def _wrap(self, label, fn):
+        record = self.record
+
+        @wraps(fn)
+        def timed(*args, **kwargs):
+            t = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(label, t, time.perf_counter() - t)
+        return timed
+
+    def record(self, label, start, duration):
+        stats = self.stats.get(label)
+        if stats is None:
+            stats = self.stats[label] = [0, 0.0, 0.0]
+        stats[0] += 1
+        stats[1] += duration
+        if duration > stats[2]:
+            stats[2] = duration
+        self.events.append((label, start, duration, threading.get_ident()))
+
+    def sample_gauges(self):
+        now = time.perf_counter()
+        values = {}
+        for label, read in self.gauges.items():
+            try:
+                values[label] = read()
+            except Exception as e:
+                values[label] = f"error: {e}"
+                continue
+            if isinstance(values[label], (int, float)):
+                self.counters.append((label, now, values[label]))
+        return values
+
+    def reset(self):
+        self.stats.clear()
+        self.events.clear()
+        self.counters.clear()
+        self.t0 = time.perf_counter()
+
+    def summary(self):
+        # [(label, calls, total_ms, mean_ms, max_ms)], most total time first.
+        rows = [(label, calls, total * 1000, total * 1000 / calls, peak * 1000)
+                for label, (calls, total, peak) in self.stats.items() if calls]
+        rows.sort(key=lambda r: -r[2])
+        return rows
+
+    def report(self):
+        return {
+            "elapsed_s": round(time.perf_counter() - self.t0, 3),
+            "timings": [{"name": n, "calls": c, "total_ms": round(t, 3), "mean_ms": round(m, 3), "max_ms": round(p, 3)}
+                        for n, c, t, m, p in self.summary()],
+            "gauges": self.sample_gauges(),
+        }
+
+    def write_chrome_trace(self, file_path):
+        # Trace Event Format: one complete ("X") event per timed call and a
+        # counter ("C") track per numeric gauge, timestamps in microseconds.
+        pid = os.getpid()
+        threads = {}
+        events = []
+        for label, start, duration, tid in list(self.events):
+            events.append({"name": label, "cat": label.split('.', 1)[0], "ph": "X", "pid": pid,
+                           "tid": threads.setdefault(tid, len(threads) + 1),
+                           "ts": round((start - self.t0) * 1e6, 1), "dur": round(duration * 1e6, 1)})
+        for label, t, value in list(self.counters):
+            events.append({"name": label, "ph": "C", "pid": pid, "ts": round((t - self.t0) * 1e6, 1),
+                           "args": {"value": value}})
+        for tid, n in threads.items():
+            name = "main" if tid == threading.main_thread().ident else f"thread-{n}"
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": n, "args": {"name": name}})
+        with open(file_path, 'w') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms", "otherData": self.report()}, f)
+
+    @property
+    def profiling(self):
+        return self._profile is not None
+
+    def start_cprofile(self):
+        # cProfile only sees the thread that starts it, i.e. the Tk thread.
+        if self._profile: return
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def stop_cprofile(self, file_path=None):
+        # Writes pstats data (python -m pstats, snakeviz) when given a path.
+        if not self._profile: return None
+        profile, self._profile = self._profile, None
+        profile.disable()
+        if file_path:
+            profile.dump_stats(file_path)
+        return profile
+
+
+def format_summary(rows, gauges=None, limit=None):
+    lines = [f"{'':34s} {'calls':>7s} {'total ms':>10s} {'mean ms':>9s} {'max ms':>9s}"]
+    for label, calls, total, mean, peak in rows[:limit]:
+        lines.append(f"{label[:34]:34s} {calls:7d} {total:10.1f} {mean:9.2f} {peak:9.2f}")
+    for label, value in (gauges or {}).items():
+        value = f"{value:,}" if isinstance(value, int) else f"{value}"
+        lines.append(f"{label[:34]:34s} {value:>37s}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    # Prints the summary saved in a Chrome trace written by the app.
+    import argparse
+    parser = argparse.ArgumentParser(description="Summarize a RackPlanner performance trace.")
+    parser.add_argument("trace")
+    args = parser.parse_args(argv)
+    with open(args.trace) as f:
+        report = json.load(f).get("otherData", {})
+    rows = [(t["name"], t["calls"], t["total_ms"], t["mean_ms"], t["max_ms"]) for t in report.get("timings", [])]
+    print(f"{report.get('elapsed_s', 0):.1f} s recorded")
+    print(format_summary(rows, report.get("gauges")))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# Local JSON-RPC 2.0 endpoint for scripted bulk edits. Requests arrive on a
+# server thread but are only queued there: the thread that owns the models
+# (the Tk thread in the app) runs them from pump(), so handlers can touch the
+# models and the UI directly. Only 127.0.0.1 is bound, and browser requests
+# (an Origin header, or a body that is not application/json) are refused.
+import argparse
+import json
+import queue
+import sys
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rack_model import VIEWS, as_u, clean_component
+
+DEFAULT_PORT = 8765
+CALL_TIMEOUT = 30.0
+MAX_REQUEST_BYTES = 16 << 20
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+
+class RpcError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+def apply_ops(rack, ops):
+    # Applies [{"op": ...}, ...] inside one rack.transaction(), so the batch
+    # is validated once and rolls back as a whole. Returns the uids of added
+    # items in order.
+    added = []
+    try:
+        with rack.transaction():
+            for n, op in enumerate(ops):
+                try:
+                    kind = op["op"]
+                    if kind == "add":
+                        view = op.get("view", VIEWS[0])
+                        if view not in rack.views:
+                            raise ValueError(f"unknown view {view!r}")
+                        size = as_u(op["size"])
+                        start = op.get("start_u_slot") or rack.first_free(view, size, depth=op.get("depth"), rail=op.get("rail"))
+                        if start is None:
+                            raise ValueError(f"no free {size}U slot for {op['name']!r}")
+                        # Extra keys (serial numbers, asset tags) are kept on the item.
+                        comp = {'color': 'skyblue', 'watts': 0, 'weight': 0}
+                        comp.update({k: v for k, v in op.items() if k not in ("op", "view", "size", "uid")})
+                        comp.update(name=op["name"], start_u_slot=as_u(start), size_u=size)
+                        added.append(rack.add(view, comp)["uid"])
+                    elif kind == "set_height":
+                        rack.set_height(int(op["rack_height"]))
+                    elif kind in ("move", "resize", "remove"):
+                        comp = rack.get(op["uid"])
+                        if comp is None:
+                            raise ValueError(f"no item with uid {op['uid']!r}")
+                        if kind == "move":
+                            rack.move(comp, as_u(op["start_u_slot"]))
+                        elif kind == "resize":
+                            rack.resize(comp, as_u(op["size_u"]))
+                        else:
+                            rack.remove(comp)
+                    else:
+                        raise ValueError(f"unknown op {kind!r}")
+                except (KeyError, TypeError, ValueError) as e:
+                    detail = f"missing {e}" if isinstance(e, KeyError) else f"{e}"
+                    raise RpcError(INVALID_PARAMS, f"op {n}: {detail}") from None
+    except ValueError as e:
+        # Checks that run on commit (overlaps, bounds) name no single op.
+        raise RpcError(INVALID_PARAMS, f"{e}") from None
+    return added
+
+
+def connect_links(plan, links):
+    # Adds [{"a": end, "b": end[, "route": true, "cable", "label"]}, ...] to a
+    # rack_cabling.CablePlan, all or nothing. With "route" the link goes
+    # through patch panels (see CablePlan.route). Returns the connections
+    # added.
+    connections = plan.connections
+    before = len(connections)
+    try:
+        for n, link in enumerate(links):
+            try:
+                a, b = link["a"], link["b"]
+                if link.get("route"):
+                    if plan.connect_route(a, b) is None:
+                        raise ValueError(f"no free patch panel route from {a['rack']!r} to {b['rack']!r}")
+                else:
+                    plan.connect(a, b, link.get("cable"), link.get("label"))
+            except (KeyError, TypeError, ValueError) as e:
+                detail = f"missing {e}" if isinstance(e, KeyError) else f"{e}"
+                raise RpcError(INVALID_PARAMS, f"link {n}: {detail}") from None
+    except RpcError:
+        del connections[before:]
+        plan.invalidate()
+        raise
+    return connections[before:]
+
+
+def cable_report(plan):
+    lengths = plan.lengths()
+    return {
+        "connections": [dict(c, cable=t, length_m=m) for c, t, m in zip(plan.connections, plan.cable_types(lengths), lengths)],
+        "problems": plan.problems(),
+        "bom": plan.bom(),
+    }
+
+
+def rack_summary(rack):
+    return {
+        "name": rack.name,
+        "row": rack.row,
+        "rack_height": rack.rack_height,
+        "version": rack.version,
+        "used_u": {view: rack.used_u(view) for view in rack.views},
+        "watts": rack.total_watts(),
+        "weight": rack.total_weight(),
+    }
+
+
+def rack_detail(rack):
+    return dict(rack_summary(rack), views={view: [clean_component(c) for c in comps] for view, comps in rack.views.items()})
+
+
+class RpcServer:
+    def __init__(self, methods, port=DEFAULT_PORT, host="127.0.0.1"):
+        # `methods` maps names to callables taking the request params as
+        # keyword arguments (or positional ones for a params list).
+        self.methods = methods
+        self._calls = queue.Queue()
+        server = self
+        self.httpd = ThreadingHTTPServer((host, port), type("Handler", (_Handler,), {"rpc": server}))
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="rack-rpc", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def submit(self, request):
+        # Server thread: queue the request and wait for pump() to answer it.
+        done = threading.Event()
+        box = {}
+        self._calls.put((request, box, done))
+        if not done.wait(CALL_TIMEOUT):
+            box["cancelled"] = True
+            return _error(request.get("id"), SERVER_ERROR, "Timed out waiting for the application.")
+        return box["response"]
+
+    def pump(self, limit=100):
+        # Owner thread: run up to `limit` queued calls. Returns how many ran.
+        n = 0
+        while n < limit:
+            try:
+                request, box, done = self._calls.get_nowait()
+            except queue.Empty:
+                break
+            if not box.get("cancelled"):
+                box["response"] = self.dispatch(request)
+            done.set()
+            n += 1
+        return n
+
+    def dispatch(self, request):
+        request_id = request.get("id") if isinstance(request, dict) else None
+        if not isinstance(request, dict) or request.get("jsonrpc") != "2.0" or not isinstance(request.get("method"), str):
+            return _error(request_id, INVALID_REQUEST, "Invalid request.")
+        method = self.methods.get(request["method"])
+        if method is None:
+            return _error(request_id, METHOD_NOT_FOUND, f"Unknown method {request['method']!r}.")
+        params = request.get("params", {})
+        try:
+            result = method(*params) if isinstance(params, list) else method(**params)
+        except RpcError as e:
+            return _error(request_id, e.code, f"{e}")
+        except TypeError as e:
+            return _error(request_id, INVALID_PARAMS, f"{e}")
+        except Exception as e:
+            return _error(request_id, SERVER_ERROR, f"{e}")
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+
+def _error(request_id, code, message):
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    rpc = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        if self.headers.get("Origin"):
+            return self._send(403, {"error": "Cross-origin requests are not accepted."})
+        if self.headers.get_content_type() != "application/json":
+            return self._send(415, {"error": "Content-Type must be application/json."})
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_REQUEST_BYTES:
+            return self._send(413, {"error": "Request too large."})
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError as e:
+            return self._send(200, _error(None, PARSE_ERROR, f"{e}"))
+        if isinstance(body, list):
+            responses = [self.rpc.submit(r) if isinstance(r, dict) else _error(None, INVALID_REQUEST, "Invalid request.") for r in body]
+            responses = [r for r, req in zip(responses, body) if not (isinstance(req, dict) and "id" not in req)]
+            return self._send(200, responses) if responses else self._send(204, None)
+        response = self.rpc.submit(body) if isinstance(body, dict) else _error(None, INVALID_REQUEST, "Invalid request.")
+        if isinstance(body, dict) and "id" not in body:
+            return self._send(204, None)  # notification
+        return self._send(200, response)
+
+    def _send(self, status, payload):
+        data = b"" if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        if data:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def call(method, params=None, port=DEFAULT_PORT, host="127.0.0.1"):
+    # Client helper for scripts: returns the result or raises RpcError.
+    request = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params or {}}
+    req = urllib.request.Request(f"http://{host}:{port}/", data=json.dumps(request).encode(),
+                                 headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=CALL_TIMEOUT + 5) as f:
+        response = json.load(f)
+    if "error" in response:
+        raise RpcError(response["error"]["code"], response["error"]["message"])
+    return response["result"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Call a running RackPlanner's JSON-RPC endpoint.")
+    parser.add_argument("method", help="e.g. list_racks, get_rack, apply")
+    parser.add_argument("params", nargs="?", help="JSON object of parameters, or @file.json")
+    parser.add_argument("-p", "--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+    params = None
+    if args.params:
+        if args.params.startswith("@"):
+            with open(args.params[1:]) as f:
+                params = json.load(f)
+        else:
+            params = json.loads(args.params)
+    try:
+        print(json.dumps(call(args.method, params, args.port), indent=2))
+    except RpcError as e:
+        print(f"Error {e.code}: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# Bulk auto-placement: packs a bill of materials into racks under U, power
+# and weight budgets, then orders each rack bottom-up (UPS first, heaviest
+# next). Packing is first/best-fit decreasing over several sort keys followed
+# by a randomized local search on the device order until the time budget
+# runs out; with workers > 1 independent searches run in a process pool and
+# the best result wins. Occupancy is the rack model's half-U slot masks per
+# layer, so full-depth devices also need the opposite face free and 0U
+# devices only go on a side rail.
+import argparse
+import json
+import random
+import re
+import sys
+import time
+
+from rack_model import DEPTHS, RAILS, SUBSLOTS, RackProject, as_u, from_slots, item_layers, run_starts, to_slots, whole_u_mask
+
+UPS_RE = re.compile(r"\bups\b", re.IGNORECASE)
+DEFAULT_TIME_BUDGET = 2.0
+
+
+def is_ups(device):
+    return device.get('role') == 'ups' or bool(UPS_RE.search(device['name']))
+
+
+def resolve_bom(bom, component_categories):
+    # `bom` is {name: qty} or a list of {"name", "qty"} entries; entries may
+    # carry their own size/watts/weight/color, otherwise the first catalog
+    # component with that name supplies them.
+    if isinstance(bom, dict):
+        bom = [{"name": name, "qty": qty} for name, qty in bom.items()]
+    catalog = {}
+    for category_items in component_categories.values():
+        for comp_name, comp_info in category_items.items():
+            catalog.setdefault(comp_name, comp_info)
+
+    devices, missing = [], []
+    for line in bom:
+        info = dict(catalog.get(line['name'], {}))
+        info.update({k: v for k, v in line.items() if k not in ('name', 'qty')})
+        if 'size' not in info:
+            missing.append(line['name'])
+            continue
+        for _ in range(int(line.get('qty', 1))):
+            devices.append({
+                'name': line['name'],
+                'size': as_u(info['size']),
+                'color': info.get('color', 'skyblue'),
+                'watts': info.get('watts', 0) or 0,
+                'weight': info.get('weight', 0) or 0,
+                'role': info.get('role'),
+                'depth': info.get('depth') if info.get('depth') in DEPTHS else None,
+                'rail': info.get('rail') if info.get('rail') in RAILS else None,
+            })
+    if missing:
+        raise ValueError(f"Unknown components (not in any catalog): {', '.join(sorted(set(missing)))}")
+    return devices
+
+
+def rack_capacity(model, view="Front"):
+    # Starting state of an existing rack: the slot masks of both faces and
+    # the rails plus the power and weight already drawn by both faces.
+    return {
+        'rack_height': model.rack_height,
+        'occupied': {layer: model.occupied_mask(layer) for layer in (view,) + tuple(v for v in model.views if v != view) + RAILS},
+        'watts': model.total_watts(),
+        'weight': model.total_weight(),
+    }
+
+
+def _fit(occupied, full, whole, dev):
+    # Lowest free start slot for a device in one rack, or None. Whole-U
+    # devices start on a U boundary.
+    blocked = 0
+    for layer in dev['layers']:
+        blocked |= occupied.get(layer, 0)
+    starts = run_starts(~blocked & full, dev['slots'])
+    if dev['slots'] % SUBSLOTS == 0:
+        starts &= whole
+    return (starts & -starts).bit_length() - 1 if starts else None
+
+
+def _occupy(occupied, dev, bit):
+    mask = ((1 << dev['slots']) - 1) << bit
+    for layer in dev['layers']:
+        occupied[layer] = occupied.get(layer, 0) | mask
+
+
+def _pack(order, devices, racks, power_cap, weight_cap, best_fit):
+    occupied = [dict(r['occupied']) for r in racks]
+    watts = [r['watts'] for r in racks]
+    weight = [r['weight'] for r in racks]
+    full = [(1 << r['rack_height'] * SUBSLOTS) - 1 for r in racks]
+    whole = [whole_u_mask(r['rack_height']) for r in racks]
+    assignment = [None] * len(devices)
+    for d in order:
+        dev = devices[d]
+        best, best_slack = None, None
+        for r in range(len(racks)):
+            if power_cap is not None and watts[r] + dev['watts'] > power_cap: continue
+            if weight_cap is not None and weight[r] + dev['weight'] > weight_cap: continue
+            bit = _fit(occupied[r], full[r], whole[r], dev)
+            if bit is None: continue
+            if not best_fit:
+                best = (r, bit)
+                break
+            slack = bin(~occupied[r].get(dev['layers'][0], 0) & full[r]).count("1") - dev['slots']
+            if best_slack is None or slack < best_slack:
+                best, best_slack = (r, bit), slack
+        if best is None: continue
+        r, bit = best
+        _occupy(occupied[r], dev, bit)
+        watts[r] += dev['watts']
+        weight[r] += dev['weight']
+        assignment[d] = (r, bit)
+    return assignment, watts
+
+
+def _score(assignment, devices, racks, watts, power_cap):
+    unplaced = [d for d, a in enumerate(assignment) if a is None]
+    used = {a[0] for a in assignment if a is not None}
+    new_racks_used = sum(1 for r in used if racks[r].get('new'))
+    peak = max(watts) / power_cap if power_cap and watts else 0
+    return (len(unplaced), sum(devices[d]['size'] for d in unplaced), new_racks_used, len(used), peak)
+
+
+def _search(devices, racks, power_cap, weight_cap, time_budget, seed):
+    rng = random.Random(seed)
+    n = len(devices)
+    h = max(r['rack_height'] for r in racks)
+    keys = [
+        lambda d: -devices[d]['size'],
+        lambda d: -devices[d]['watts'],
+        lambda d: -devices[d]['weight'],
+        lambda d: -(devices[d]['size'] / h + (devices[d]['watts'] / power_cap if power_cap else 0)
+                    + (devices[d]['weight'] / weight_cap if weight_cap else 0)),
+    ]
+    best = None
+    for key in keys:
+        for best_fit in (False, True):
+            order = sorted(range(n), key=key)
+            assignment, watts = _pack(order, devices, racks, power_cap, weight_cap, best_fit)
+            score = _score(assignment, devices, racks, watts, power_cap)
+            if best is None or score < best[0]:
+                best = (score, order, best_fit, assignment)
+
+    deadline = time.monotonic() + time_budget
+    current = best
+    # Nothing left to improve once everything fits without spare racks.
+    while n > 1 and (best[0][0] or best[0][2]) and time.monotonic() < deadline:
+        order = list(current[1])
+        for _ in range(rng.randint(1, max(1, n // 20))):
+            i, j = rng.randrange(n), rng.randrange(n)
+            order[i], order[j] = order[j], order[i]
+        assignment, watts = _pack(order, devices, racks, power_cap, weight_cap, current[2])
+        score = _score(assignment, devices, racks, watts, power_cap)
+        if score <= current[0]:
+            current = (score, order, current[2], assignment)
+            if score < best[0]:
+                best = current
+    return best[0], best[3]
+
+
+def _layout(devices, racks, assignment, heavy_low, ups_bottom):
+    # Re-stacks each rack in constraint order from U1 up. If an existing
+    # layout leaves gaps that the preferred order cannot fill, the packing
+    # positions found by the search are kept for that rack instead. Returns
+    # (rack index, start slot, device index).
+    by_rack = {}
+    for d, a in enumerate(assignment):
+        if a is not None:
+            by_rack.setdefault(a[0], []).append(d)
+    placements = []
+    for r, members in sorted(by_rack.items()):
+        def priority(d):
+            dev = devices[d]
+            return (0 if ups_bottom and is_ups(dev) else 1, -dev['weight'] if heavy_low else 0, -dev['size'])
+        occupied = dict(racks[r]['occupied'])
+        full, whole = (1 << racks[r]['rack_height'] * SUBSLOTS) - 1, whole_u_mask(racks[r]['rack_height'])
+        stacked = []
+        for d in sorted(members, key=priority):
+            bit = _fit(occupied, full, whole, devices[d])
+            if bit is None:
+                stacked = [(r, assignment[d][1], d) for d in members]
+                break
+            _occupy(occupied, devices[d], bit)
+            stacked.append((r, bit, d))
+        placements.extend(stacked)
+    return placements
+
+
+def solve(devices, racks, power_cap=None, weight_cap=None, heavy_low=True, ups_bottom=True,
+          time_budget=DEFAULT_TIME_BUDGET, workers=1, seed=0, view="Front"):
+    # `racks` are rack_capacity() dicts for `view`; ones flagged 'new' are
+    # spare racks the solver should only use when the existing ones are full.
+    # Returns placements as (rack index, start U, device) plus the unplaced
+    # devices.
+    if not racks:
+        raise ValueError("No racks to place into.")
+    if not devices:
+        return {'placements': [], 'unplaced': [], 'racks_used': 0, 'totals': [(r['watts'], r['weight']) for r in racks]}
+
+    packed = [dict(d, slots=to_slots(d['size']), layers=item_layers(view, d)) for d in devices]
+    args = (packed, racks, power_cap, weight_cap, time_budget)
+    if workers and workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_search, *zip(*[args + (seed + k,) for k in range(workers)])))
+    else:
+        results = [_search(*args, seed)]
+    score, assignment = min(results, key=lambda res: res[0])
+
+    placements = [(r, from_slots(bit) + 1, devices[d]) for r, bit, d in _layout(packed, racks, assignment, heavy_low, ups_bottom)]
+    totals = [[r['watts'], r['weight']] for r in racks]
+    for r, _, dev in placements:
+        totals[r][0] += dev['watts']
+        totals[r][1] += dev['weight']
+    return {
+        'placements': placements,
+        'unplaced': [devices[d] for d, a in enumerate(assignment) if a is None],
+        'racks_used': score[3],
+        'totals': [tuple(t) for t in totals],
+    }
+
+
+def apply_solution(project, racks, solution, view="Front", new_rack_height=None, row=0, on_new_rack=None):
+    # Places a solution into `racks` (the models the capacities were taken
+    # from, in the same order); indices past the end are spare racks and are
+    # added to the project as they are first used.
+    placed = []
+    spare = {}
+    for r, start_u, dev in sorted(solution['placements'], key=lambda p: (p[0], p[1])):
+        if r < len(racks):
+            model = racks[r]
+        else:
+            if r not in spare:
+                spare[r] = project.add_rack(rack_height=new_rack_height or racks[-1].rack_height, row=row)
+                if on_new_rack:
+                    on_new_rack(spare[r])
+            model = spare[r]
+        placed.append(model.place(view, dev['name'], dev, start_u))
+    return placed
+
+
+def main(argv=None):
+    from rack_io import build_project, project_data, read_project, write_project
+
+    parser = argparse.ArgumentParser(description="Auto-place a bill of materials into racks.")
+    parser.add_argument("bom", help='BOM JSON: {"name": qty} or [{"name": ..., "qty": ...}]')
+    parser.add_argument("-p", "--project", help="existing project to fill (its embedded catalog resolves names)")
+    parser.add_argument("-c", "--catalog", action="append", default=[], help="catalog JSON files used to resolve names")
+    parser.add_argument("-o", "--out", required=True, help="project file to write")
+    parser.add_argument("--racks", type=int, default=0, help="spare racks the solver may add")
+    parser.add_argument("--height", type=int, default=42, help="height of added racks")
+    parser.add_argument("--power-cap", type=float, help="per-rack power budget (W)")
+    parser.add_argument("--weight-cap", type=float, help="per-rack weight budget (kg)")
+    parser.add_argument("--no-heavy-low", action="store_true")
+    parser.add_argument("--no-ups-bottom", action="store_true")
+    parser.add_argument("--view", default="Front")
+    parser.add_argument("-t", "--time", type=float, default=DEFAULT_TIME_BUDGET, help="search time budget (s)")
+    parser.add_argument("-j", "--jobs", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    categories = {}
+    embedded = None
+    if args.project:
+        data = read_project(args.project)
+        project = build_project(data)
+        embedded = data['component_categories']
+        categories.update(embedded or {})
+    else:
+        project = RackProject([])
+    for path in args.catalog:
+        with open(path) as f:
+            categories[path] = json.load(f)
+    with open(args.bom) as f:
+        devices = resolve_bom(json.load(f), categories)
+
+    models = list(project.racks)
+    racks = [rack_capacity(m, args.view) for m in models]
+    racks += [{'rack_height': args.height, 'occupied': {}, 'watts': 0, 'weight': 0, 'new': True} for _ in range(args.racks)]
+    solution = solve(devices, racks, args.power_cap, args.weight_cap, not args.no_heavy_low,
+                     not args.no_ups_bottom, args.time, args.jobs, view=args.view)
+
+    apply_solution(project, models, solution, args.view, args.height)
+    write_project(args.out, project_data(project, embedded))
+
+    print(f"placed {len(solution['placements'])}/{len(devices)} devices in {solution['racks_used']} racks")
+    for device in solution['unplaced']:
+        print(f"unplaced: {device['name']} ({device['size']}U, {device['watts']} W, {device['weight']} kg)", file=sys.stderr)
+    return 1 if solution['unplaced'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
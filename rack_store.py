@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+# SQLite project files (.rackdb): racks, placements and catalog items live in
+# indexed tables instead of one JSON blob. Racks open as empty stubs and are
+# filled on first use, saves write only the rows that differ from the file in
+# one transaction, and racks can be queried across many project files.
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from urllib.parse import quote
+
+from rack_io import build_project, project_data, read_project, write_project
+from rack_model import TRANSIENT_KEYS, VIEWS, RackModel, RackProject
+
+STORE_VERSION = 2
+STORE_EXTENSION = ".rackdb"
+PLACEMENT_KEYS = ('uid', 'name', 'start_u_slot', 'size_u', 'color', 'watts', 'weight') + TRANSIENT_KEYS
+ITEM_KEYS = ('size', 'color', 'watts', 'weight')
+
+# watts/weight are NUMERIC so whole numbers come back as ints, as in JSON.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS racks (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    position INTEGER NOT NULL,
+    row INTEGER NOT NULL DEFAULT 0,
+    rack_height INTEGER NOT NULL,
+    watts NUMERIC NOT NULL DEFAULT 0,
+    weight NUMERIC NOT NULL DEFAULT 0,
+    next_uid INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS racks_watts ON racks (watts);
+CREATE TABLE IF NOT EXISTS placements (
+    rack_id INTEGER NOT NULL REFERENCES racks (id) ON DELETE CASCADE,
+    uid INTEGER NOT NULL,
+    view TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    start_u_slot INTEGER NOT NULL,
+    size_u INTEGER NOT NULL,
+    color TEXT,
+    watts NUMERIC,
+    weight NUMERIC,
+    extra TEXT,
+    PRIMARY KEY (rack_id, uid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS placements_name ON placements (name COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS categories (name TEXT PRIMARY KEY, position INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS catalog_items (
+    category TEXT NOT NULL REFERENCES categories (name) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    size INTEGER,
+    color TEXT,
+    watts NUMERIC,
+    weight NUMERIC,
+    extra TEXT,
+    PRIMARY KEY (category, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS catalog_items_name ON catalog_items (name COLLATE NOCASE);
+"""
+
+
+def is_store_path(path):
+    return path.lower().endswith(STORE_EXTENSION)
+
+
+def _extra(data, known):
+    extra = {k: v for k, v in data.items() if k not in known}
+    return json.dumps(extra, sort_keys=True) if extra else None
+
+
+def _placement_row(view, position, comp):
+    return (view, position, comp['name'], comp['start_u_slot'], comp['size_u'],
+            comp.get('color'), comp.get('watts'), comp.get('weight'), _extra(comp, PLACEMENT_KEYS))
+
+
+def _component(uid, row):
+    _, _, name, start_u_slot, size_u, color, watts, weight, extra = row
+    comp = json.loads(extra) if extra else {}
+    comp.update(uid=uid, name=name, start_u_slot=start_u_slot, size_u=size_u)
+    for key, value in (('color', color), ('watts', watts), ('weight', weight)):
+        if value is not None:
+            comp[key] = value
+    return comp
+
+
+def _views(rows):
+    views = {v: [] for v in VIEWS}
+    for uid, row in sorted(rows.items(), key=lambda item: item[1][:2]):
+        views.setdefault(row[0], []).append(_component(uid, row))
+    return views
+
+
+def _item_row(position, item):
+    return (position, item.get('size'), item.get('color'), item.get('watts'), item.get('weight'), _extra(item, ITEM_KEYS))
+
+
+def _item(row):
+    _, size, color, watts, weight, extra = row
+    item = json.loads(extra) if extra else {}
+    for key, value in (('size', size), ('color', color), ('watts', watts), ('weight', weight)):
+        if value is not None:
+            item[key] = value
+    return item
+
+
+class ProjectStore:
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA foreign_keys = ON")
+        version = self._meta("version")
+        if version is not None and int(version) > STORE_VERSION:
+            self.db.close()
+            raise ValueError(f"{os.path.basename(path)} was written by a newer RackPlanner (store version {version}).")
+        if version is None:
+            self.db.executescript(SCHEMA)
+            with self.db:
+                self.db.execute("INSERT INTO meta VALUES ('version', ?)", (str(STORE_VERSION),))
+        elif int(version) < 2:
+            # Version 1 files did not keep each rack's next uid; it is
+            # rebuilt from the highest uid stored.
+            with self.db:
+                self.db.execute("ALTER TABLE racks ADD COLUMN next_uid INTEGER NOT NULL DEFAULT 1")
+                self.db.execute("UPDATE racks SET next_uid = 1 + coalesce((SELECT max(uid) FROM placements"
+                                " WHERE rack_id = racks.id), 0)")
+                self.db.execute("UPDATE meta SET value = ? WHERE key = 'version'", (str(STORE_VERSION),))
+        # What the file holds, per rack: [rack id, model version when last
+        # synced, (name, position, row, height, watts, weight, next uid),
+        # {uid: row}].
+        # Racks in `_unloaded` are stubs whose rows have not been read.
+        self._saved = {}
+        self._unloaded = {}
+        self._categories = {}
+        self._items = {}
+        self._connections = None
+
+    def _meta(self, key):
+        try:
+            row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row else None
+
+    def close(self):
+        self.db.close()
+
+    def open(self):
+        # Returns (RackProject of unloaded racks, component_categories), the
+        # categories being None when the file has no catalog.
+        racks = []
+        self._saved, self._unloaded = {}, {}
+        for rack_id, name, position, row, height, watts, weight, next_uid in self.db.execute(
+                "SELECT id, name, position, row, rack_height, watts, weight, next_uid FROM racks ORDER BY position"):
+            rack = RackModel(height, name=name, row=row, next_uid=next_uid)
+            self._saved[rack] = [rack_id, rack.version, (name, position, row, height, watts, weight, next_uid), None]
+            self._unloaded[rack] = rack_id
+            racks.append(rack)
+        if not racks:
+            raise ValueError("Project has no racks.")
+        self._connections = self._meta("connections")
+        connections = json.loads(self._connections) if self._connections else []
+        return RackProject(racks, connections), self._read_catalog()
+
+    def _read_rows(self, rack_id):
+        return {uid: tuple(row) for uid, *row in self.db.execute(
+            "SELECT uid, view, position, name, start_u_slot, size_u, color, watts, weight, extra"
+            " FROM placements WHERE rack_id = ?", (rack_id,))}
+
+    def _read_catalog(self):
+        self._categories = dict(self.db.execute("SELECT name, position FROM categories"))
+        self._items = {}
+        categories = {name: {} for name in sorted(self._categories, key=self._categories.get)}
+        for category, name, *row in self.db.execute(
+                "SELECT category, name, position, size, color, watts, weight, extra FROM catalog_items ORDER BY category, position"):
+            self._items[category, name] = tuple(row)
+            categories[category][name] = _item(row)
+        return categories or None
+
+    def is_loaded(self, rack):
+        return rack not in self._unloaded
+
+    def load_rack(self, rack):
+        # Fills a stub from the file. The rack is not changed by this, so
+        # history and autosave are not told. Returns whether it was a stub.
+        rack_id = self._unloaded.pop(rack, None)
+        if rack_id is None:
+            return False
+        rows = self._read_rows(rack_id)
+        rack.load(rack.rack_height, _views(rows), notify=False, next_uid=rack.next_uid)
+        state = self._saved[rack]
+        state[1], state[3] = rack.version, rows
+        return True
+
+    def rack_views(self, rack):
+        # Views of a rack as saved, without loading it.
+        if rack in self._unloaded:
+            return _views(self._read_rows(self._unloaded[rack]))
+        return rack.views
+
+    def mark_stored_racks(self, data):
+        # The cheap alternative to fill_project_data() for autosave snapshots:
+        # stubs stay empty and are flagged, to be read back from this file by
+        # fill_stored_racks() on recovery. A stub has not changed since the
+        # file was opened, so the file still holds what it showed.
+        stubs = {rack.name for rack in self._unloaded}
+        if stubs:
+            data["store"] = os.path.abspath(self.path)
+            for entry in data.get("racks", []):
+                if entry["name"] in stubs:
+                    entry["stored"] = True
+        return data
+
+    def fill_project_data(self, data):
+        # rack_io.project_data() sees stubs as empty racks; put their stored
+        # components into the captured data.
+        stubs = {rack.name: rack for rack in self._unloaded}
+        for entry in data.get("racks", []):
+            if entry["name"] in stubs:
+                entry["views"] = self.rack_views(stubs[entry["name"]])
+        return data
+
+    def save(self, project, component_categories=None):
+        # Writes the racks and catalog rows that differ from the file, in one
+        # transaction. Returns the number of rows written.
+        written, synced = 0, []
+        current = set(project.racks)
+        with self.db:
+            for rack in [r for r in self._saved if r not in current]:
+                self.db.execute("DELETE FROM racks WHERE id = ?", (self._saved[rack][0],))
+                written += 1
+            for position, rack in enumerate(project.racks):
+                n, state = self._save_rack(rack, position)
+                written += n
+                if state: synced.append((rack, state))
+            if component_categories is not None:
+                written += self._save_catalog(component_categories)
+            # Connections are one JSON value in meta, rewritten only when it
+            # changed.
+            connections = json.dumps(project.connections, sort_keys=True) if project.connections else None
+            if connections != self._connections:
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('connections', ?)", (connections,))
+                written += 1
+        # Only remember what was written once the transaction committed.
+        for rack in [r for r in self._saved if r not in current]:
+            del self._saved[rack]
+            self._unloaded.pop(rack, None)
+        self._saved.update(synced)
+        self._connections = connections
+        if component_categories is not None:
+            self._read_catalog_state(component_categories)
+        return written
+
+    def _save_rack(self, rack, position):
+        state = self._saved.get(rack)
+        if rack in self._unloaded:
+            if state[2][1] == position:
+                return 0, None
+            self.db.execute("UPDATE racks SET position = ? WHERE id = ?", (position, state[0]))
+            return 1, [state[0], state[1], state[2][:1] + (position,) + state[2][2:], None]
+        if state and state[1] == rack.version and state[2][1] == position:
+            return 0, None
+
+        header = (rack.name, position, rack.row, rack.rack_height, rack.total_watts(), rack.total_weight(), rack.next_uid)
+        written = 0
+        if state is None:
+            rack_id = self.db.execute("INSERT INTO racks (name, position, row, rack_height, watts, weight, next_uid)"
+                                      " VALUES (?, ?, ?, ?, ?, ?, ?)", header).lastrowid
+            old_rows = {}
+            written += 1
+        else:
+            rack_id, _, old_header, old_rows = state
+            if header != old_header:
+                self.db.execute("UPDATE racks SET name = ?, position = ?, row = ?, rack_height = ?, watts = ?, weight = ?,"
+                                " next_uid = ? WHERE id = ?", header + (rack_id,))
+                written += 1
+
+        rows = {comp['uid']: _placement_row(view, i, comp) for view, comps in rack.views.items() for i, comp in enumerate(comps)}
+        deleted = [(rack_id, uid) for uid in old_rows if uid not in rows]
+        changed = [(rack_id, uid) + row for uid, row in rows.items() if old_rows.get(uid) != row]
+        self.db.executemany("DELETE FROM placements WHERE rack_id = ? AND uid = ?", deleted)
+        self.db.executemany("INSERT OR REPLACE INTO placements VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", changed)
+        return written + len(deleted) + len(changed), [rack_id, rack.version, header, rows]
+
+    def _catalog_rows(self, component_categories):
+        categories = {name: position for position, name in enumerate(component_categories)}
+        items = {(category, name): _item_row(position, item)
+                 for category, entries in component_categories.items()
+                 for position, (name, item) in enumerate(entries.items())}
+        return categories, items
+
+    def _save_catalog(self, component_categories):
+        categories, items = self._catalog_rows(component_categories)
+        # Items of dropped categories go with them (ON DELETE CASCADE).
+        gone = [(name,) for name in self._categories if name not in categories]
+        moved = [(name, pos) for name, pos in categories.items() if self._categories.get(name) != pos]
+        deleted = [key for key in self._items if key not in items and key[0] in categories]
+        changed = [key + row for key, row in items.items() if self._items.get(key) != row]
+        self.db.executemany("DELETE FROM categories WHERE name = ?", gone)
+        self.db.executemany("INSERT OR REPLACE INTO categories VALUES (?, ?)", moved)
+        self.db.executemany("DELETE FROM catalog_items WHERE category = ? AND name = ?", deleted)
+        self.db.executemany("INSERT OR REPLACE INTO catalog_items VALUES (?, ?, ?, ?, ?, ?, ?, ?)", changed)
+        return len(gone) + len(moved) + len(deleted) + len(changed)
+
+    def _read_catalog_state(self, component_categories):
+        self._categories, self._items = self._catalog_rows(component_categories)
+
+
+def fill_stored_racks(data):
+    # Puts the components of racks flagged by mark_stored_racks() back into
+    # project data.
+    path = data.pop("store", None)
+    if not path:
+        return data
+    if not os.path.exists(path):
+        raise ValueError(f"Autosave refers to {path}, which no longer exists.")
+    store = ProjectStore(path)
+    try:
+        project, _ = store.open()
+        for entry in data.get("racks", []):
+            if entry.pop("stored", False):
+                rack = project.get(entry["name"])
+                if rack is None:
+                    raise ValueError(f"{os.path.basename(path)} no longer has a rack named '{entry['name']}'.")
+                entry["views"] = store.rack_views(rack)
+    finally:
+        store.close()
+    return data
+
+
+def _connect_readonly(path):
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    return sqlite3.connect(f"file:{quote(os.path.abspath(path))}?mode=ro", uri=True)
+
+
+def _query(paths, sql, params):
+    for path in paths:
+        db = _connect_readonly(path)
+        try:
+            for row in db.execute(sql, params):
+                yield (path,) + tuple(row)
+        finally:
+            db.close()
+
+
+def racks_with_model(paths, model):
+    # (file, rack, row, count) for every rack holding a component named
+    # `model` (case-insensitive).
+    return _query(paths, "SELECT r.name, r.row, count(*) FROM placements p JOIN racks r ON r.id = p.rack_id"
+                         " WHERE p.name = ? COLLATE NOCASE GROUP BY r.id ORDER BY r.position", (model,))
+
+
+def racks_over_power(paths, budget, ratio=0.8):
+    # (file, rack, row, watts) for racks drawing more than ratio * budget W.
+    return _query(paths, "SELECT name, row, watts FROM racks WHERE watts > ? ORDER BY watts DESC", (ratio * budget,))
+
+
+def convert(source, target):
+    # JSON project to .rackdb or back.
+    if os.path.exists(target):
+        os.remove(target)
+    if is_store_path(source):
+        store = ProjectStore(source)
+        try:
+            project, categories = store.open()
+            for rack in project.racks:
+                store.load_rack(rack)
+        finally:
+            store.close()
+        write_project(target, project_data(project, categories))
+        return
+    data = read_project(source)
+    categories = data["component_categories"]
+    if categories is None and data["custom_components"] is not None:
+        categories = {"Custom": data["custom_components"]}
+    store = ProjectStore(target)
+    try:
+        store.save(build_project(data), categories)
+    finally:
+        store.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="RackPlanner SQLite project files.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    conv = sub.add_parser("convert", help="convert a JSON project to .rackdb or back")
+    conv.add_argument("source")
+    conv.add_argument("target")
+
+    find = sub.add_parser("find-model", help="list racks containing a component")
+    find.add_argument("model")
+    find.add_argument("paths", nargs="+", help=".rackdb files")
+
+    power = sub.add_parser("power", help="list racks drawing more than a share of a power budget")
+    power.add_argument("paths", nargs="+", help=".rackdb files")
+    power.add_argument("--budget", type=float, required=True, help="power budget per rack (W)")
+    power.add_argument("--over", type=float, default=0.8, help="share of the budget (default: 0.8)")
+
+    args = parser.parse_args(argv)
+    if args.command == "convert":
+        convert(args.source, args.target)
+        return 0
+    if args.command == "find-model":
+        results = ({"file": f, "rack": r, "row": row, "count": n} for f, r, row, n in racks_with_model(args.paths, args.model))
+    else:
+        results = ({"file": f, "rack": r, "row": row, "watts": w} for f, r, row, w in racks_over_power(args.paths, args.budget, args.over))
+    found = 0
+    for record in results:
+        print(json.dumps(record))
+        found += 1
+    return 0 if found else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
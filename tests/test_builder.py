@@ -0,0 +1,290 @@
+# Headless checks of RackBuilder logic that does not need a display: the
+# app's methods run on small stand-ins for the app and its Tk canvas.
+import types
+
+import pytest
+
+pytest.importorskip("tkinter")
+import RackBuilder as RB
+from rack_catalog import CatalogStore
+from rack_model import RackModel, RackProject
+
+
+class FakeCanvas:
+    # Records every call; items only keep their coordinates.
+    def __init__(self):
+        self.calls = []
+        self.items = {}
+        self.current = ()
+
+    def _create(self, kind, *coords, **options):
+        item = len(self.items) + 1
+        self.items[item] = list(coords)
+        self.calls.append((kind, item))
+        return item
+
+    def create_rectangle(self, *coords, **options):
+        return self._create('create_rectangle', *coords)
+
+    def create_text(self, *coords, **options):
+        return self._create('create_text', *coords)
+
+    def create_line(self, *coords, **options):
+        return self._create('create_line', *coords)
+
+    def create_oval(self, *coords, **options):
+        return self._create('create_oval', *coords)
+
+    def coords(self, item, *coords):
+        if not coords:
+            return self.items[item]
+        self.items[item] = list(coords)
+        self.calls.append(('coords', item))
+
+    def delete(self, item):
+        self.items.pop(item, None)
+        self.calls.append(('delete', item))
+
+    def itemconfig(self, item, **options):
+        self.calls.append(('itemconfig', item))
+
+    def find_withtag(self, tag):
+        return self.current if tag == 'current' else ()
+
+    def tag_bind(self, *args):
+        pass
+
+    def tag_raise(self, *args):
+        pass
+
+    def tag_lower(self, *args):
+        pass
+
+    def config(self, **options):
+        pass
+
+
+class DragStub:
+    # Just enough of RackPlannerApp for _start_drag, _drag_target and _drop.
+    rack_height = RB.RackPlannerApp.rack_height
+    _start_drag = RB.RackPlannerApp._start_drag
+    _drag_target = RB.RackPlannerApp._drag_target
+    _drop = RB.RackPlannerApp._drop
+    is_slot_available = RB.RackPlannerApp.is_slot_available
+
+    def __init__(self, model):
+        self.model = model
+        self.current_view = "Front"
+        self.canvas = FakeCanvas()
+        self.renderer = RB.RackCanvasRenderer(self.canvas)
+        self.renderer.sync(model.rack_height, model.views["Front"])
+        self._dragging_component = None
+        self._drag_offset_y = 0
+        self._drag_job = None
+        self.cancelled = self.recorded = 0
+
+    def _cancel_drag(self):
+        self.cancelled += bool(self._dragging_component)
+        self._dragging_component = None
+
+    def _end_drag(self):
+        self._dragging_component = None
+
+    def _show_ghost(self, *args):
+        pass
+
+    def _draw_rack_and_components(self):
+        pass
+
+    def _record_current_state(self):
+        self.recorded += 1
+
+    def grab(self, comp, y):
+        self.canvas.current = (self.renderer._items[comp['uid']][0],)
+        self._start_drag(types.SimpleNamespace(widget=self.canvas, y=y))
+
+    def drop(self, y):
+        self._drop(types.SimpleNamespace(widget=self.canvas, y=y))
+
+
+def top_y(rack, comp):
+    return (rack.rack_height - (comp['start_u_slot'] + comp['size_u'] - 1)) * RB.U_HEIGHT
+
+
+def test_grabbing_low_keeps_the_offset():
+    rack = RackModel(12)
+    server = rack.place("Front", "Server", {'size': 3}, 2)
+    app = DragStub(rack)
+    grab = top_y(rack, server) + 2.75 * RB.U_HEIGHT
+    app.grab(server, grab)
+    assert app._dragging_component is server
+    assert app._drag_target(grab) == 2
+    # Less than half a U either way stays put, a whole U moves by one.
+    assert app._drag_target(grab + 0.4 * RB.U_HEIGHT) == 2
+    assert app._drag_target(grab - 0.4 * RB.U_HEIGHT) == 2
+    assert app._drag_target(grab - RB.U_HEIGHT) == 3
+    assert app._drag_target(grab + RB.U_HEIGHT) == 1
+
+
+def test_targets_are_clamped_to_the_rack():
+    rack = RackModel(12)
+    server = rack.place("Front", "Server", {'size': 3}, 5)
+    app = DragStub(rack)
+    app.grab(server, top_y(rack, server) + 5)
+    assert app._drag_target(10000) == 1
+    assert app._drag_target(-10000) == 10
+
+
+def test_half_u_items_snap_to_half_u():
+    rack = RackModel(12)
+    shelf = rack.place("Front", "Shelf", {'size': 0.5}, 1.5)
+    app = DragStub(rack)
+    grab = top_y(rack, shelf) + 10
+    app.grab(shelf, grab)
+    assert app._drag_target(grab) == 1.5
+    assert app._drag_target(grab - RB.U_HEIGHT / 2) == 2
+    assert app._drag_target(grab - 0.2 * RB.U_HEIGHT) == 1.5
+    assert app._drag_target(grab + RB.U_HEIGHT) == 1
+
+
+def test_click_without_moving_is_not_an_edit():
+    rack = RackModel(12)
+    server = rack.place("Front", "Server", {'size': 3}, 2)
+    app = DragStub(rack)
+    grab = top_y(rack, server) + 100
+    app.grab(server, grab)
+    version = rack.version
+    app.drop(grab + 5)
+    assert app.cancelled == 1 and app.recorded == 0
+    assert rack.version == version and server['start_u_slot'] == 2
+
+
+def test_drop_moves_or_cancels():
+    rack = RackModel(12)
+    server = rack.place("Front", "Server", {'size': 2}, 1)
+    rack.place("Front", "Switch", {'size': 1}, 6)
+    app = DragStub(rack)
+    grab = top_y(rack, server) + 60
+    app.grab(server, grab)
+    app.drop(grab - 2 * RB.U_HEIGHT)
+    assert server['start_u_slot'] == 3 and app.recorded == 1
+    app.grab(server, top_y(rack, server) + 60)
+    app.drop(top_y(rack, server) + 60 - 2 * RB.U_HEIGHT)
+    assert server['start_u_slot'] == 3 and app.cancelled == 1 and app.recorded == 1
+
+
+def test_sync_only_touches_what_changed():
+    rack = RackModel(12)
+    server = rack.place("Front", "Server", {'size': 2}, 1)
+    switch = rack.place("Front", "Switch", {'size': 1}, 8)
+    canvas = FakeCanvas()
+    renderer = RB.RackCanvasRenderer(canvas)
+    renderer.sync(rack.rack_height, rack.views["Front"])
+    rect, text = renderer._items[server['uid']][:2]
+
+    canvas.calls = []
+    rack.move(server, 4)
+    renderer.sync(rack.rack_height, rack.views["Front"])
+    assert canvas.calls == [('coords', rect), ('coords', text)]
+    assert canvas.items[rect] == list(renderer.component_bounds(server))
+
+    canvas.calls = []
+    renderer.sync(rack.rack_height, rack.views["Front"])
+    assert canvas.calls == []
+
+    gone = renderer._items[switch['uid']][:2]
+    rack.remove(switch)
+    renderer.sync(rack.rack_height, rack.views["Front"])
+    assert canvas.calls == [('delete', gone[0]), ('delete', gone[1])]
+    assert renderer.uid_at(rect) == server['uid'] and renderer.uid_at(gone[0]) is None
+
+
+class Viewport:
+    # Scroll position and size of a canvas, in screen pixels.
+    def __init__(self, x, y, width, height):
+        self.x, self.y, self.width, self.height = x, y, width, height
+
+    def canvasx(self, x):
+        return self.x + x
+
+    def canvasy(self, y):
+        return self.y + y
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+
+class RoomStub:
+    _slot_width = RB.RoomView._slot_width
+    _layout = RB.RoomView._layout
+    _visible_racks = RB.RoomView._visible_racks
+    rack_at = RB.RoomView.rack_at
+
+    def __init__(self, project, zoom, canvas):
+        self.project, self.zoom, self.canvas = project, zoom, canvas
+        self._layout_key = None
+        self._rows = []
+
+
+def test_room_view_only_draws_racks_in_view():
+    project = RackProject([RackModel(42, name=f"R{row}-{n}", row=row) for row in range(3) for n in range(10)])
+    slot_w = RB.RoomView._slot_width(None)
+    row_h = RB.elevation_size(42, 1)[1]
+    # At zoom 0.5 the screen shows the top-left quarter of the first rack.
+    room = RoomStub(project, 0.5, Viewport(0, 0, slot_w / 4, row_h / 4))
+    assert [r.name for r in room._visible_racks()] == ["R0-0"]
+
+    room.canvas = Viewport(3.2 * slot_w * 0.5, 1.5 * row_h * 0.5, 1.5 * slot_w * 0.5, 0.25 * row_h * 0.5)
+    visible = room._visible_racks()
+    assert [r.name for r in visible] == ["R1-3", "R1-4"]
+    assert visible[project.get("R1-4")] == (4 * slot_w, row_h)
+
+    room.canvas = Viewport(20 * slot_w, 0, slot_w, 4 * row_h)
+    assert room._visible_racks() == {}
+    assert room.rack_at(0, 0) is None
+
+
+class StartupStub:
+    _mark_startup = RB.RackPlannerApp._mark_startup
+    _on_first_paint = RB.RackPlannerApp._on_first_paint
+    _finish_startup = RB.RackPlannerApp._finish_startup
+    startup_report = RB.RackPlannerApp.startup_report
+
+    def __init__(self, catalog_store):
+        self.catalog_store = catalog_store
+        self.canvas = types.SimpleNamespace(unbind=lambda sequence: None)
+        self.root = types.SimpleNamespace(after_idle=lambda callback: callback())
+        self.startup_marks = [("imports", RB.STARTUP_IMPORTED)]
+        self._startup_done = False
+        self.steps = []
+
+    def update_palette(self):
+        self.steps.append("palette")
+
+    def _start_autosave(self):
+        self.steps.append("autosave")
+
+
+def test_startup_report_lists_each_phase(tmp_path, monkeypatch):
+    monkeypatch.delenv("RACKPLANNER_RPC_PORT", raising=False)
+    monkeypatch.delenv("RACKPLANNER_STARTUP_REPORT", raising=False)
+    (tmp_path / "Servers.json").write_text("[]")
+    app = StartupStub(CatalogStore([str(tmp_path)], cache_dir=str(tmp_path / "cache")))
+    app._mark_startup("ui built")
+    app._on_first_paint()
+    app._finish_startup()
+    app._finish_startup()
+    assert app.steps == ["palette", "autosave"]
+
+    report = app.startup_report()
+    phases = ["imports", "ui built", "first paint", "palette ready", "autosave ready"]
+    assert list(report) == phases + ["catalog_files"]
+    assert report["catalog_files"] == 1
+    last = 0
+    for label in phases:
+        assert report[label]["took_ms"] >= 0
+        assert report[label]["at_ms"] == pytest.approx(last + report[label]["took_ms"], abs=0.2)
+        last = report[label]["at_ms"]
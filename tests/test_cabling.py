@@ -0,0 +1,150 @@
+import pytest
+
+from rack_cabling import (CablePlan, describe_connection, endpoint, parse_ports, port_names, port_type,
+                          stock_length)
+from rack_io import build_project, parse_project, project_data
+from rack_model import RackModel, RackProject
+from rack_store import ProjectStore
+
+SWITCH = {'size': 1, 'ports': {'RJ45': 4, 'SFP+': 2, 'C14': 1}}
+PANEL = {'size': 1, 'ports': {'RJ45': 4}, 'patch': True}
+PDU = {'size': 1, 'ports': {'C13': 8}}
+
+
+def room():
+    # Racks A, B and C in one row, each with a switch at U1 and a patch panel
+    # at U10, the panels trunked A-B and B-C.
+    project = RackProject([RackModel(10, name=name) for name in "ABC"])
+    uids = {}
+    for rack in project.racks:
+        uids[rack.name, "switch"] = rack.place("Front", "Switch", SWITCH, 1)['uid']
+        uids[rack.name, "panel"] = rack.place("Front", "Panel", PANEL, 10)['uid']
+    plan = CablePlan(project)
+    plan.connect(endpoint("A", uids["A", "panel"], "RJ45 1", "rear"), endpoint("B", uids["B", "panel"], "RJ45 1", "rear"))
+    plan.connect(endpoint("B", uids["B", "panel"], "RJ45 2", "rear"), endpoint("C", uids["C", "panel"], "RJ45 1", "rear"))
+    return project, plan, uids
+
+
+def test_parse_ports_and_port_names():
+    assert parse_ports("rj45:2, SFP+x1") == {'RJ45': 2, 'SFP+': 1}
+    assert parse_ports({'lc': 2}) == {'LC': 2}
+    for bad in ("RJ45", {'RJ45': 0}, {'RJ45': True}):
+        with pytest.raises(ValueError):
+            parse_ports(bad)
+    assert port_names({'ports': {'RJ45': 2, 'LC': 1}}) == ["RJ45 1", "RJ45 2", "LC 1"]
+    assert port_type(SWITCH, "RJ45 4") == "RJ45" and port_type(SWITCH, "RJ45 5") is None
+    assert port_type(PANEL, "RJ45 1", "rear") == "RJ45" and port_type(SWITCH, "RJ45 1", "rear") is None
+
+
+def test_connect_refuses_bad_links():
+    project, plan, uids = room()
+    switch, panel = uids["A", "switch"], uids["A", "panel"]
+    project.get("A").place("Front", "PDU", PDU, 5)
+    pdu = project.get("A").views["Front"][-1]['uid']
+    plan.connect(endpoint("A", switch, "C14 1"), endpoint("A", pdu, "C13 1"))
+    for a, b, message in [
+        (endpoint("A", switch, "RJ45 1"), endpoint("A", 99, "RJ45 1"), "No item 99"),
+        (endpoint("A", switch, "RJ45 9"), endpoint("A", panel, "RJ45 1"), "has no port 'RJ45 9'"),
+        (endpoint("A", switch, "SFP+ 1"), endpoint("A", panel, "RJ45 1"), "Cannot connect a SFP\\+ port to a RJ45"),
+        (endpoint("A", switch, "RJ45 1"), endpoint("A", switch, "RJ45 1"), "itself"),
+        (endpoint("A", panel, "RJ45 1", "rear"), endpoint("C", uids["C", "panel"], "RJ45 2", "rear"), "already connected"),
+    ]:
+        with pytest.raises(ValueError, match=message):
+            plan.connect(a, b)
+    assert len(plan.connections) == 3
+
+
+def test_lengths_cable_types_and_bom():
+    project, plan, uids = room()
+    plan.connect(endpoint("A", uids["A", "switch"], "RJ45 1"), endpoint("A", uids["A", "panel"], "RJ45 1"))
+    plan.connect(endpoint("A", uids["A", "switch"], "SFP+ 1"), endpoint("C", uids["C", "switch"], "SFP+ 1"))
+    lengths = plan.lengths()
+    # Within a rack: 9 U between the item centres plus slack.
+    assert lengths[2] == 0.9
+    # Between racks: up 9.5 U and down again, two tray rises, 1.2 m along the row, slack.
+    assert lengths[3] == round(2 * 9.5 * 0.04445 + 0.6 + 1.2 + 0.5, 2)
+    assert plan.cable_types(lengths) == ["Cat6 trunk", "Cat6 trunk", "Cat6", "SFP+ DAC"]
+    plan.distances = {frozenset("AC"): 10}
+    assert plan.cable_types()[3] == "SFP+ AOC"
+    bom = plan.bom()
+    assert {(c["cable"], c["length_m"], c["count"]) for c in bom["cables"]} == {
+        ("Cat6", 1, 1), ("Cat6 trunk", 2, 2), ("SFP+ AOC", 15, 1)}
+    assert bom["total_m"] == 20 and bom["unmeasured"] == 0
+    assert stock_length(0.2) == 0.5 and stock_length(2) == 2 and stock_length(51.2) == 52
+
+
+def test_route_goes_through_patch_panels():
+    project, plan, uids = room()
+    a, c = endpoint("A", uids["A", "switch"], "RJ45 1"), endpoint("C", uids["C", "switch"], "RJ45 1")
+    cables = plan.connect_route(a, c)
+    assert [(x["a"]["rack"], x["b"]["rack"]) for x in cables] == [("A", "A"), ("B", "B"), ("C", "C")]
+    # The cross connect joins the two trunks' front ports on B's panel.
+    assert {cables[1]["a"]["port"], cables[1]["b"]["port"]} == {"RJ45 1", "RJ45 2"}
+    assert plan.problems() == []
+    # The only trunks are taken now.
+    assert plan.route(endpoint("A", uids["A", "switch"], "RJ45 2"), endpoint("C", uids["C", "switch"], "RJ45 2")) is None
+    within = plan.route(endpoint("A", uids["A", "switch"], "RJ45 3"), endpoint("A", uids["A", "panel"], "RJ45 4"))
+    assert len(within) == 1 and len(plan.connections) == 5
+
+
+def test_problems_after_edits_and_removed_racks():
+    project, plan, uids = room()
+    plan.connect(endpoint("A", uids["A", "switch"], "RJ45 1"), endpoint("A", uids["A", "panel"], "RJ45 2"))
+    rack = project.get("A")
+    rack.remove(rack.get(uids["A", "switch"]))
+    assert [p["type"] for p in plan.problems()] == ["missing_item"]
+    assert plan.lengths()[2] is None and plan.bom()["unmeasured"] == 1
+    assert "missing item" in describe_connection(plan.connections[2], {r.name: r for r in project.racks})
+
+    dropped = project.remove_rack(project.get("C"))
+    assert len(dropped) == 1 and len(plan.connections) == 2
+    project.add_rack("C")
+    plan.invalidate()
+    assert [p["type"] for p in plan.problems()] == ["missing_item"]
+
+
+def test_new_items_never_inherit_a_removed_items_cables(tmp_path):
+    rack = RackModel(10, name="A")
+    switch = rack.place("Front", "Sw", SWITCH, 1)['uid']
+    server = rack.place("Front", "Srv", SWITCH, 2)['uid']
+    project = RackProject([rack])
+    plan = CablePlan(project)
+    plan.connect(endpoint("A", switch, "RJ45 1"), endpoint("A", server, "RJ45 1"))
+    rack.remove(rack.get(server))
+    assert [p["type"] for p in plan.problems()] == ["missing_item"]
+
+    reloaded = build_project(parse_project(project_data(project)))
+    path = str(tmp_path / "room.rackdb")
+    store = ProjectStore(path)
+    store.save(project)
+    store.close()
+    store = ProjectStore(path)
+    stored, _ = store.open()
+    store.load_rack(stored.racks[0])
+    store.close()
+    for project in (reloaded, stored):
+        new = project.racks[0].place("Front", "NewBox", SWITCH)
+        assert new['uid'] != server
+        assert [p["type"] for p in CablePlan(project).problems()] == ["missing_item"]
+
+
+def test_version_1_stores_get_their_next_uid_back(tmp_path):
+    path = str(tmp_path / "old.rackdb")
+    rack = RackModel(10, name="A")
+    rack.place("Front", "Sw", SWITCH, 1)
+    rack.place("Front", "Srv", SWITCH, 2)
+    store = ProjectStore(path)
+    store.save(RackProject([rack]))
+    # Rebuild the racks table as version 1 wrote it, without next_uid.
+    store.db.execute("PRAGMA foreign_keys = OFF")
+    with store.db:
+        store.db.execute("CREATE TABLE racks_v1 AS SELECT id, name, position, row, rack_height, watts, weight FROM racks")
+        store.db.execute("DROP TABLE racks")
+        store.db.execute("ALTER TABLE racks_v1 RENAME TO racks")
+        store.db.execute("UPDATE meta SET value = '1' WHERE key = 'version'")
+    store.close()
+
+    store = ProjectStore(path)
+    project, _ = store.open()
+    assert project.racks[0].next_uid == 3
+    store.close()
@@ -0,0 +1,180 @@
+import json
+import os
+
+import pytest
+
+import rack_catalog
+from rack_catalog import CatalogIndex, CatalogStore, catalog_file_name, catalog_name, edit_distance, parse_query
+
+CATEGORIES = {
+    "Networking": {
+        "PoE Switch": {'size': 1, 'watts': 350, 'weight': 5},
+        "Core Router": {'size': 2, 'watts': 600, 'weight': 12},
+    },
+    "Servers": {
+        "1U Server": {'size': 1, 'watts': 300, 'weight': 15},
+        "2U Storage Server": {'size': 2, 'watts': 450, 'weight': 25},
+    },
+}
+
+
+def names(index, text):
+    return [index.entries[e][1] for e in index.search(text)]
+
+
+def test_parse_query_splits_words_and_filters():
+    assert parse_query("Core size:2 watts<500 kg>=3") == (
+        ["core"], [('size', ':', 2.0), ('watts', '<', 500.0), ('weight', '>=', 3.0)])
+
+
+def test_words_match_token_prefixes():
+    index = CatalogIndex(CATEGORIES)
+    assert names(index, "swi") == ["PoE Switch"]
+    assert names(index, "stor serv") == ["2U Storage Server"]
+    assert names(index, "") == ["PoE Switch", "Core Router", "1U Server", "2U Storage Server"]
+
+
+def test_category_and_size_tokens_match():
+    index = CatalogIndex(CATEGORIES)
+    assert sorted(names(index, "networking")) == ["Core Router", "PoE Switch"]
+    assert sorted(names(index, "2u")) == ["2U Storage Server", "Core Router"]
+
+
+def test_attribute_filters():
+    index = CatalogIndex(CATEGORIES)
+    assert sorted(names(index, "watts<400")) == ["1U Server", "PoE Switch"]
+    assert names(index, "server size:2") == ["2U Storage Server"]
+    assert names(index, "weight>100") == []
+
+
+def test_entries_can_be_added_and_removed_in_place():
+    index = CatalogIndex(CATEGORIES)
+    index.add_entry("Custom", "Tape Library", {'size': 4})
+    assert names(index, "tape") == ["Tape Library"]
+    index.remove_entry("Custom", "Tape Library")
+    assert names(index, "tape") == []
+    index.remove_category("Servers")
+    assert len(index) == 2
+    assert names(index, "server") == []
+
+
+def write_catalog(directory, name, data):
+    path = directory / f"{name}.json"
+    path.write_text(json.dumps(data))
+    return path
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    bundled, user = tmp_path / "bundled", tmp_path / "user"
+    bundled.mkdir()
+    user.mkdir()
+    write_catalog(bundled, "Servers", CATEGORIES["Servers"])
+    write_catalog(bundled, "Networking", {"Old Switch": {'size': 1}})
+    write_catalog(user, "Networking", dict(CATEGORIES["Networking"], Broken={'size': 'big'}))
+    return [str(bundled), str(user)]
+
+
+def test_store_discovers_and_later_dirs_override(dirs, tmp_path):
+    store = CatalogStore(dirs, cache_dir=str(tmp_path / "cache"))
+    assert store.discover() == ["Networking", "Servers"]
+    assert store.count("Servers") is None and not store.is_loaded("Servers")
+    assert sorted(store.load("Networking")) == ["Core Router", "PoE Switch"]
+    assert store.skipped["Networking"] == ["Broken"]
+    assert store.count("Networking") == 2
+
+
+def test_store_reuses_the_cache(dirs, tmp_path, monkeypatch):
+    first = CatalogStore(dirs, cache_dir=str(tmp_path / "cache"))
+    first.discover()
+    first.load_all()
+
+    store = CatalogStore(dirs, cache_dir=str(tmp_path / "cache"))
+    store.discover()
+    assert store.count("Servers") == 2
+    monkeypatch.setattr(rack_catalog, "parse_catalog", None)
+    assert store.load("Servers") == first.load("Servers")
+
+
+def test_store_reparses_changed_files(dirs, tmp_path):
+    store = CatalogStore(dirs, cache_dir=str(tmp_path / "cache"))
+    store.discover()
+    store.load("Servers")
+    path = write_catalog(tmp_path / "bundled", "Servers", {"Blade": {'size': 10}, "Pad": {'size': 1}, "Tray": {'size': 1}})
+    os.utime(path, ns=(1, 1))
+    store = CatalogStore(dirs, cache_dir=str(tmp_path / "cache"))
+    store.discover()
+    assert store.count("Servers") is None
+    assert sorted(store.load("Servers")) == ["Blade", "Pad", "Tray"]
+
+
+def test_files_that_are_not_catalogs_are_dropped(dirs, tmp_path):
+    (tmp_path / "user" / "project.json").write_text(json.dumps({"views": []}))
+    store = CatalogStore(dirs, cache_dir=str(tmp_path / "cache"))
+    assert "project" in store.discover()
+    assert sorted(store.load_all()) == ["Networking", "Servers"]
+    assert "project" not in CatalogStore(dirs, cache_dir=str(tmp_path / "cache")).discover()
+
+
+def test_edit_distance_counts_transpositions_and_gives_up():
+    assert edit_distance("switch", "switch", 1) == 0
+    assert edit_distance("swtich", "switch", 1) == 1
+    assert edit_distance("sever", "server", 1) == 1
+    assert edit_distance("router", "switch", 2) == 3
+    assert edit_distance("a", "abcd", 1) == 2
+
+
+def test_typos_still_match():
+    index = CatalogIndex(CATEGORIES)
+    assert names(index, "swtich") == ["PoE Switch"]
+    assert names(index, "storge serv") == ["2U Storage Server"]
+    assert names(index, "rotuer") == ["Core Router"]
+    assert names(index, "xyzzy") == []
+    # Short words are never fuzzy-matched.
+    assert names(index, "poa") == []
+
+
+def test_exact_name_matches_rank_first():
+    index = CatalogIndex({
+        "Power": {"PDU": {'size': 1}},
+        "Misc": {"Rackmount Shelf": {'size': 1}, "Power Strip": {'size': 1}, "Rack": {'size': 1}},
+    })
+    assert names(index, "power") == ["Power Strip", "PDU"]
+    assert names(index, "rack") == ["Rack", "Rackmount Shelf"]
+
+
+def test_catalog_file_names_keep_category_names():
+    for name in ("Enterprise Servers", "A/B", "A B", "Dell EMC", ".hidden", "100% Fans", "trailing."):
+        stem = catalog_file_name(name)
+        assert catalog_name(stem) == name and "/" not in stem and not stem.startswith(".")
+    assert catalog_file_name("A/B") != catalog_file_name("A B")
+
+
+def test_imported_categories_keep_their_names(dirs, tmp_path):
+    store = CatalogStore(dirs, cache_dir=str(tmp_path / "cache"))
+    store.discover()
+    user = str(tmp_path / "user")
+    box = {"Box": {'size': 1}}
+    store.check_new(["Servers", "Dell EMC", "A/B", "A B"], user)
+    for name in ("Servers", "Dell EMC", "A/B", "A B"):
+        name, path, digest = store.write_catalog(name, box, user)
+        store.register(name, path, box, digest)
+    assert store.names() == ["A B", "A/B", "Dell EMC", "Networking", "Servers"]
+    rediscovered = CatalogStore(dirs, cache_dir=str(tmp_path / "cache"))
+    assert rediscovered.discover() == store.names()
+    assert rediscovered.load("Servers") == store.load("A/B") == box
+    assert rediscovered.files["Servers"].startswith(user)
+
+
+def test_categories_sharing_a_file_are_refused(dirs, tmp_path):
+    store = CatalogStore(dirs, cache_dir=str(tmp_path / "cache"))
+    store.discover()
+    user = str(tmp_path / "user")
+    with pytest.raises(ValueError, match="'Rack' and 'RACK'"):
+        store.check_new(["Rack", "RACK"], user)
+    with pytest.raises(ValueError, match="'Networking' and 'networking'"):
+        store.check_new(["networking"], user)
+    store.check_new(["Networking", "Servers"], user)
+    name, path, digest = store.write_catalog("SERVERS", {"Box": {'size': 1}}, str(tmp_path / "bundled"))
+    with pytest.raises(ValueError, match="'Servers' is already saved"):
+        store.register(name, path, {"Box": {'size': 1}}, digest)
@@ -0,0 +1,124 @@
+import io
+import json
+import os
+import threading
+
+import pytest
+
+import rack_catalog_import
+from rack_catalog_import import ImportCancelled, _json_values, import_catalog, main, normalize_row
+
+
+def test_normalize_row_parses_units_and_keeps_extra_fields():
+    name, item = normalize_row({'name': " Switch ", 'size': "1U", 'watts': "1,200 W", 'weight': "", 'sku': "X1"})
+    assert name == "Switch"
+    assert item == {'size': 1, 'watts': 1200, 'weight': 0, 'color': 'skyblue', 'sku': "X1"}
+    assert normalize_row({'name': "Shelf", 'size': 0.5})[1]['size'] == 0.5
+
+
+@pytest.mark.parametrize("row, error", [
+    ({'size': 1}, "missing name"),
+    ({'name': "A"}, "missing size"),
+    ({'name': "A", 'size': "tall"}, "size is not a number"),
+    ({'name': "A", 'size': 1.3}, "half a U"),
+    ({'name': "A", 'size': 1, 'watts': -5}, "watts is negative"),
+    ({'name': "A", 'size': 1, 'color': "url(x)"}, "invalid color"),
+])
+def test_normalize_row_names_the_bad_field(row, error):
+    with pytest.raises(ValueError, match=error):
+        normalize_row(row)
+
+
+def test_csv_import_maps_columns_and_reports_bad_rows(tmp_path):
+    path = tmp_path / "vendor.csv"
+    path.write_text("Model;Rack Units;Power W;Category\n"
+                    "Switch;1;150;Networking\n"
+                    "Server;2U;400;\n"
+                    ";1;0;\n"
+                    "Switch;1;200;Networking\n")
+    categories, report = import_catalog(str(path))
+    assert categories == {
+        "Networking": {"Switch": {'size': 1, 'watts': 200, 'weight': 0, 'color': 'skyblue'}},
+        "vendor": {"Server": {'size': 2, 'watts': 400, 'weight': 0, 'color': 'skyblue'}},
+    }
+    assert (report["rows"], report["imported"], report["duplicates"], report["error_count"]) == (4, 2, 1, 1)
+    assert report["errors"] == [{"row": 3, "name": "", "error": "missing name"}]
+
+
+def test_jsonl_import_reports_unparseable_lines(tmp_path):
+    path = tmp_path / "items.jsonl"
+    path.write_text('{"name": "A", "size": 1}\n\n{broken\n[1]\n')
+    categories, report = import_catalog(str(path), "Misc")
+    assert list(categories["Misc"]) == ["A"]
+    assert [e["row"] for e in report["errors"]] == [2, 3]
+
+
+def test_json_object_and_array_imports(tmp_path):
+    path = tmp_path / "catalog.json"
+    path.write_text(json.dumps({"A": {"size": 1}, "B": {"size": 2, "kg": 9}, "C": 4}))
+    categories, report = import_catalog(str(path))
+    assert categories["catalog"]["B"]["weight"] == 9
+    assert report["errors"][0]["error"] == "'C': entry is not an object"
+    path.write_text(json.dumps([{"name": "A", "size": 1}, {"name": "B", "size": 2}]))
+    assert list(import_catalog(str(path))[0]["catalog"]) == ["A", "B"]
+
+
+def test_json_values_stream_across_chunks(monkeypatch):
+    monkeypatch.setattr(rack_catalog_import, "CHUNK_BYTES", 7)
+    data = {f"item {n}": {"size": 1, "watts": 123456789 + n} for n in range(50)}
+    rows = list(_json_values(io.StringIO(json.dumps(data, indent=2))))
+    assert [r["name"] for r in rows] == list(data)
+    assert rows[-1]["watts"] == 123456838
+    with pytest.raises(ValueError):
+        list(_json_values(io.StringIO('{"A": {"size": 1}')))
+    with pytest.raises(ValueError):
+        list(_json_values(io.StringIO('"text"')))
+
+
+def test_progress_and_cancel(tmp_path):
+    path = tmp_path / "items.jsonl"
+    path.write_text("".join(json.dumps({"name": f"A{n}", "size": 1}) + "\n" for n in range(10)))
+    progress = []
+    import_catalog(str(path), on_progress=lambda done, total, rows: progress.append(rows), batch_size=4)
+    assert progress == [4, 8, 10]
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(ImportCancelled):
+        import_catalog(str(path), cancel=cancel, batch_size=4)
+
+
+def test_command_writes_catalogs_and_report(tmp_path):
+    source = tmp_path / "in.csv"
+    source.write_text("name,size\nA,1\nB,x\n")
+    out, report = tmp_path / "out", tmp_path / "errors.csv"
+    assert main([str(source), "-o", str(out), "-c", "Shelf", "--report", str(report)]) == 1
+    assert json.loads((out / "Shelf.json").read_text()) == {"A": {'size': 1, 'watts': 0, 'weight': 0, 'color': 'skyblue'}}
+    assert report.read_text().splitlines()[1].startswith("2,B,size is not a number")
+
+
+def test_mounting_and_ports_columns(tmp_path):
+    path = tmp_path / "panels.csv"
+    path.write_text("name,size,ports,patch,depth,rail\n"
+                    "Panel,1,RJ45:24,yes,,\n"
+                    "PDU,1,C13:12,no,,left\n"
+                    "Server,2,,,full,\n"
+                    "Blank,1,,yes,,\n"
+                    "Odd,1,,,,top\n")
+    categories, report = import_catalog(str(path))
+    items = categories["panels"]
+    assert items["Panel"]["ports"] == {'RJ45': 24} and items["Panel"]["patch"] is True
+    assert items["PDU"]["rail"] == "Left" and "patch" not in items["PDU"]
+    assert items["Server"]["depth"] == "full"
+    assert [e["error"] for e in report["errors"]] == ["a patch panel needs ports", "rail must be one of Left, Right: 'top'"]
+
+
+def test_command_keeps_category_names_apart(tmp_path):
+    source = tmp_path / "in.csv"
+    source.write_text("name,size,category\nA,1,Dell EMC\nB,1,A/B\nC,1,A B\n")
+    out = tmp_path / "out"
+    assert main([str(source), "-o", str(out)]) == 0
+    assert sorted(os.listdir(out)) == ["A B.json", "A%2FB.json", "Dell EMC.json"]
+    source.write_text("name,size,category\nA,1,Rack\nB,1,RACK\n")
+    with pytest.raises(ValueError, match="'Rack' and 'RACK'"):
+        main([str(source), "-o", str(tmp_path / "other")])
+    assert not (tmp_path / "other").exists()
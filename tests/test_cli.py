@@ -0,0 +1,105 @@
+import json
+
+from rack_cli import check_file, check_rack, find_project_files, main
+
+
+def comp(name, start, size, **extra):
+    return dict(name=name, start_u_slot=start, size_u=size, **extra)
+
+
+def write(path, data):
+    path.write_text(json.dumps(data))
+    return str(path)
+
+
+def test_summaries_count_used_u_power_and_weight():
+    views = {"Front": [comp("A", 1, 2, watts=100, weight=10), comp("B", 5, 1, watts=50)], "Rear": []}
+    summaries, problems = check_rack(10, views)
+    assert problems == []
+    assert summaries["Front"] == {"items": 2, "used_u": 3, "free_u": 7, "watts": 150, "weight": 10}
+    assert summaries["Rear"]["used_u"] == 0
+
+
+def test_overlaps_bounds_and_invalid_items():
+    views = {"Front": [comp("A", 1, 3), comp("B", 3, 1), comp("C", 9, 3), {"name": "D"}], "Rear": []}
+    _, problems = check_rack(10, views)
+    kinds = {p["type"]: p for p in problems}
+    assert kinds["overlap"]["items"] == ["A", "B"] and kinds["overlap"]["u"] == [3, 3]
+    assert kinds["out_of_bounds"]["item"] == "C"
+    assert kinds["invalid"]["index"] == 3
+
+
+def test_faces_do_not_collide():
+    _, problems = check_rack(10, {"Front": [comp("A", 1, 2)], "Rear": [comp("B", 1, 2)]})
+    assert problems == []
+
+
+def test_find_project_files_walks_sorted_and_skips_hidden(tmp_path):
+    (tmp_path / "b").mkdir()
+    (tmp_path / ".git").mkdir()
+    for name in ("b/2.json", "1.JSON", "notes.txt", ".git/x.json"):
+        (tmp_path / name).write_text("{}")
+    found = [p[len(str(tmp_path)) + 1:] for p in find_project_files([str(tmp_path)])]
+    assert found == ["1.JSON", "b/2.json"]
+
+
+def test_check_file_records(tmp_path):
+    good = check_file(write(tmp_path / "good.json", {"views": {"Front": [comp("A", 1, 1)]}}))
+    assert good["ok"] is True and good["racks"][0]["views"]["Front"]["used_u"] == 1
+    assert check_file(write(tmp_path / "other.json", {"hello": 1}))["skipped"]
+    (tmp_path / "broken.json").write_text("{")
+    broken = check_file(str(tmp_path / "broken.json"))
+    assert broken["ok"] is False and "error" in broken
+
+
+def test_check_command_writes_json_lines(tmp_path, capsys):
+    write(tmp_path / "a.json", {"views": {"Front": [comp("A", 1, 1)]}})
+    write(tmp_path / "b.json", {"racks": [{"name": "R", "views": {"Front": [comp("A", 1, 2), comp("B", 2, 1)]}}]})
+    write(tmp_path / "c.json", [1, 2])
+    out = tmp_path / "out.jsonl"
+    assert main(["check", str(tmp_path), "-j", "1", "-o", str(out)]) == 1
+    records = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [r["ok"] for r in records] == [True, False]
+    assert "2 projects checked, 1 with problems" in capsys.readouterr().err
+
+    assert main(["check", str(tmp_path / "a.json"), "-j", "1", "-o", str(out)]) == 0
+    main(["check", str(tmp_path), "-j", "1", "-o", str(out), "--include-skipped"])
+    assert len(out.read_text().splitlines()) == 3
+
+
+def test_diff_command(tmp_path, capsys):
+    old = {"views": {"Front": [comp("A", 1, 1, uid=1, watts=10), comp("B", 3, 2, uid=2)]}}
+    new = {"views": {"Front": [comp("A", 5, 1, uid=1, watts=10)]}}
+    old_path, new_path, out = write(tmp_path / "old.json", old), write(tmp_path / "new.json", new), tmp_path / "d.jsonl"
+    assert main(["diff", old_path, new_path, "-o", str(out)]) == 1
+    assert sorted(json.loads(line)["change"] for line in out.read_text().splitlines()) == ["moved", "removed"]
+    assert "1 racks changed, 0 unchanged: 1 moved, 1 removed" in capsys.readouterr().err
+    assert main(["diff", old_path, old_path, "-o", str(out)]) == 0
+    assert out.read_text() == ""
+
+
+def test_full_depth_and_rail_items_are_checked_per_layer():
+    views = {"Front": [comp("Server", 1, 2, depth="full"), comp("PDU", 1, 10, rail="Left")],
+             "Rear": [comp("UPS", 2, 1), comp("Shelf", 3, 0.5)]}
+    summaries, problems = check_rack(10, views)
+    assert problems == [{"type": "overlap", "view": "Rear", "items": ["Server", "UPS"], "u": [2, 2]}]
+    assert summaries["Front"]["used_u"] == 2 and summaries["Rear"]["used_u"] == 2.5
+
+
+def test_cables_command(tmp_path, capsys):
+    ports = {"ports": {"SFP+": 2}}
+    project = {"version": "4.0", "racks": [
+        {"name": "A", "views": {"Front": [comp("Switch", 1, 1, uid=1, **ports)]}},
+        {"name": "B", "views": {"Front": [comp("Switch", 1, 1, uid=1, **ports)]}}],
+        "connections": [{"a": {"rack": "A", "uid": 1, "port": "SFP+ 1"}, "b": {"rack": "B", "uid": 1, "port": "SFP+ 1"}}]}
+    path, out = write(tmp_path / "room.json", project), tmp_path / "c.jsonl"
+    assert main(["cables", path, "--distance", "A", "B", "20", "-o", str(out)]) == 0
+    record = json.loads(out.read_text())
+    assert (record["cable"], record["stock_m"]) == ("SFP+ AOC", 30)
+    assert main(["cables", path, "--bom", "-o", str(out)]) == 0
+    assert json.loads(out.read_text()) == {"cable": "SFP+ DAC", "length_m": 3, "count": 1}
+    assert "1 connections, 1 cables totalling 3 m, 0 problems" in capsys.readouterr().err
+
+    project["connections"][0]["b"]["port"] = "SFP+ 9"
+    assert main(["cables", write(tmp_path / "room.json", project), "-o", str(out)]) == 1
+    assert json.loads(out.read_text().splitlines()[-1])["problem"]["type"] == "unknown_port"
@@ -0,0 +1,67 @@
+import copy
+
+from rack_diff import describe, diff_projects, load_project, match_items
+from rack_io import parse_project, project_data, write_project
+from rack_model import RackModel, RackProject
+from rack_store import ProjectStore
+
+
+def sample_project():
+    first, second = RackModel(10, name="A"), RackModel(10, name="B")
+    first.place("Front", "Switch", {'size': 1, 'watts': 100}, 1)
+    first.place("Front", "Server", {'size': 2, 'watts': 300, 'weight': 20}, 3)
+    second.place("Rear", "UPS", {'size': 2, 'weight': 40}, 1)
+    return RackProject([first, second])
+
+
+def test_identical_projects_have_no_changes():
+    project = sample_project()
+    diff = diff_projects(project, parse_project(project_data(project)))
+    assert diff["racks"] == [] and diff["summary"]["racks_unchanged"] == 2
+
+
+def test_item_changes_and_totals():
+    old = sample_project()
+    new = copy.deepcopy(old)
+    rack = new.get("A")
+    switch, server = rack.views["Front"]
+    rack.move(switch, 8)
+    rack.resize(server, 3)
+    server['watts'] = 350
+    rack.place("Front", "Patch", {'size': 1, 'watts': 5}, 2)
+    new.remove_rack(new.get("B"))
+    diff = diff_projects(old, new)
+    changes = {c["change"]: c for c in diff["racks"][0]["changes"]}
+    assert set(changes) == {"moved", "resized", "updated", "added"}
+    assert (changes["moved"]["from"], changes["moved"]["to"]) == (1, 8)
+    assert changes["updated"]["fields"] == {"watts": [300, 350]}
+    assert [r["status"] for r in diff["racks"]] == ["changed", "removed"]
+    assert diff["summary"]["watts_delta"] == 55 and diff["summary"]["weight_delta"] == -40
+    assert describe(changes["moved"]) == "A Front: 'Switch' moved U1 -> U8"
+
+
+def test_items_without_uids_pair_by_name_and_nearest_position():
+    old = [dict(name="Server", start_u_slot=1, size_u=1), dict(name="Server", start_u_slot=5, size_u=1)]
+    new = [dict(name="Server", start_u_slot=6, size_u=1), dict(name="Switch", start_u_slot=1, size_u=1)]
+    pairs, removed, added = match_items(old, new)
+    assert [(o['start_u_slot'], n['start_u_slot']) for o, n in pairs] == [(5, 6)]
+    assert [c['start_u_slot'] for c in removed] == [1] and [c['name'] for c in added] == ["Switch"]
+
+
+def test_live_racks_are_rehashed_after_edits():
+    project = sample_project()
+    saved = parse_project(project_data(project))
+    assert diff_projects(saved, project)["summary"]["racks_changed"] == 0
+    project.get("B").place("Front", "Shelf", {'size': 1}, 4)
+    assert diff_projects(saved, project)["summary"]["changes"] == {"added": 1}
+
+
+def test_load_project_reads_every_rack(tmp_path):
+    project = sample_project()
+    json_path, store_path = str(tmp_path / "room.json"), str(tmp_path / "room.rackdb")
+    write_project(json_path, project_data(project))
+    store = ProjectStore(store_path)
+    store.save(project)
+    store.close()
+    assert diff_projects(load_project(json_path), load_project(store_path))["racks"] == []
+    assert [len(r.views["Front"]) for r in load_project(store_path).racks] == [2, 0]
@@ -0,0 +1,131 @@
+import os
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from rack_export import (elevation_shapes, elevation_size, export_book, export_project, main, output_paths,
+                         render_elevation, write_book)
+from rack_io import project_data, write_project
+from rack_model import RackModel, RackProject
+from rack_store import ProjectStore
+
+
+def sample_rack(name="Rack 1"):
+    rack = RackModel(6, name=name)
+    rack.place("Front", "Switch", {'size': 1, 'color': '#112233'}, 2)
+    rack.place("Rear", "UPS", {'size': 2, 'color': 'skyblue'}, 1)
+    return rack
+
+
+def test_shapes_place_items_by_u():
+    rack = sample_rack()
+    width, height, shapes = elevation_shapes(rack.rack_height, rack.views)
+    assert (width, height) == elevation_size(6)
+    labels = [s for s in shapes if s[0] == 'text' and s[3] == "Switch"]
+    assert len(labels) == 1 and labels[0][4] == 'white'
+    width_2x, height_2x, shapes_2x = elevation_shapes(rack.rack_height, rack.views, dpi=192)
+    assert (width_2x, height_2x) == (2 * width, 2 * height) and len(shapes_2x) == len(shapes)
+
+
+def test_svg_output_is_well_formed(tmp_path):
+    rack = sample_rack()
+    rack.place("Front", "A & B <test>", {'size': 1}, 4)
+    path = str(tmp_path / "r.svg")
+    render_elevation(rack.rack_height, rack.views, path)
+    texts = [t.text for t in ET.parse(path).getroot().iter("{http://www.w3.org/2000/svg}text")]
+    assert "A & B <test>" in texts and "Front" in texts and "Rear" in texts
+
+
+def test_png_output(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    rack = sample_rack()
+    path = str(tmp_path / "r.png")
+    render_elevation(rack.rack_height, rack.views, path)
+    assert Image.open(path).size == elevation_size(6)
+
+
+def test_multi_rack_projects_export_one_file_per_rack(tmp_path):
+    project_path = str(tmp_path / "room.json")
+    write_project(project_path, project_data(RackProject([sample_rack("A 1"), sample_rack("B/2")])))
+    written = export_project(project_path, str(tmp_path / "room.svg"))
+    assert [os.path.basename(p) for p in written] == ["room-A_1.svg", "room-B_2.svg"]
+    assert all(os.path.exists(p) for p in written)
+
+
+def test_output_paths_keep_same_named_projects_apart():
+    paths = output_paths([os.path.join("a", "rack.json"), os.path.join("b", "rack.json"), "other.json",
+                          os.path.join("a", "rack.json")], "out", "svg")
+    assert [os.path.basename(p) for _, p in paths] == ["a-rack.svg", "b-rack.svg", "other.svg", "a-rack-2.svg"]
+
+
+def test_batch_reports_failures_per_project(tmp_path):
+    from rack_export import export_batch
+    good = str(tmp_path / "good.json")
+    write_project(good, project_data(RackProject([sample_rack()])))
+    results = {os.path.basename(p): (out, err) for p, out, err in
+               export_batch([good, str(tmp_path / "missing.json")], str(tmp_path / "out"), "svg", workers=1)}
+    assert results["good.json"][0] == [str(tmp_path / "out" / "good.svg")] and results["good.json"][1] is None
+    assert results["missing.json"][0] is None and results["missing.json"][1]
+
+
+def book_racks(count=3):
+    return [{"name": rack.name, "row": 0, "rack_height": rack.rack_height, "views": rack.views}
+            for rack in (sample_rack(f"Rack {n + 1}") for n in range(count))]
+
+
+def test_pdf_book_has_a_page_per_rack_and_a_valid_xref(tmp_path):
+    path = str(tmp_path / "room.pdf")
+    assert write_book(book_racks(3), path) == 3
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert data.startswith(b"%PDF-1.4") and data.endswith(b"%%EOF\n")
+    assert data.count(b"/Type /Page ") == 3 and b"/Count 3" in data
+    xref = int(data.rsplit(b"startxref\n", 1)[1].split()[0])
+    entries = data[xref:].split(b"\n")[3:]
+    for obj_id, entry in enumerate(entries, 1):
+        if not entry.endswith(b" n "):
+            break
+        offset = int(entry.split()[0])
+        assert data[offset:].startswith(b"%d 0 obj" % obj_id)
+
+
+def test_svg_book_stacks_pages(tmp_path):
+    path = str(tmp_path / "room.svg")
+    assert write_book(book_racks(2), path, workers=2) == 2
+    root = ET.parse(path).getroot()
+    pages = root.findall("{http://www.w3.org/2000/svg}g")
+    assert [p.get("id") for p in pages] == ["page-1", "page-2"]
+    assert pages[1].get("transform") != pages[0].get("transform")
+    width, height = elevation_size(6)
+    assert int(root.get("width")) >= width and int(root.get("height")) > 2 * height
+
+
+def test_failed_book_leaves_no_file(tmp_path):
+    path = tmp_path / "room.pdf"
+    path.write_bytes(b"old book")
+
+    def racks():
+        yield book_racks(1)[0]
+        raise ValueError("bad rack")
+    with pytest.raises(ValueError):
+        write_book(racks(), str(path))
+    assert path.read_bytes() == b"old book" and os.listdir(tmp_path) == ["room.pdf"]
+    with pytest.raises(OSError):
+        export_book(str(tmp_path / "missing.json"), str(tmp_path / "missing.pdf"))
+    assert os.listdir(tmp_path) == ["room.pdf"]
+
+
+def test_books_from_json_and_rackdb(tmp_path, capsys):
+    project = RackProject([sample_rack("A"), sample_rack("B")])
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    json_path, store_path = str(tmp_path / "a" / "room.json"), str(tmp_path / "b" / "room.rackdb")
+    write_project(json_path, project_data(project))
+    store = ProjectStore(store_path)
+    store.save(project)
+    store.close()
+    out = tmp_path / "out"
+    assert main([json_path, store_path, "-f", "pdf", "-o", str(out), "-j", "1"]) == 0
+    assert sorted(os.listdir(out)) == ["a-room.pdf", "b-room.pdf"]
+    assert capsys.readouterr().out.count("(2 pages)") == 2
+    assert (out / "a-room.pdf").read_bytes() == (out / "b-room.pdf").read_bytes()
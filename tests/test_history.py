@@ -0,0 +1,129 @@
+import copy
+
+from rack_history import History
+from rack_model import RackModel
+
+
+def info(size=1):
+    return {'size': size, 'watts': 0, 'weight': 0}
+
+
+def layout(rack):
+    return {view: [(c['name'], c['start_u_slot'], c['size_u']) for c in comps] for view, comps in rack.views.items()}
+
+
+def watched(rack, **kw):
+    history = History(**kw)
+    history.watch(rack)
+    return history
+
+
+def test_undo_and_redo_replay_operations():
+    rack = RackModel(8)
+    history = watched(rack)
+    a = rack.place("Front", "A", info(2), 1)
+    history.checkpoint()
+    empty_plus_a = layout(rack)
+    rack.move(a, 4)
+    rack.resize(a, 3)
+    history.checkpoint()
+    moved = layout(rack)
+
+    history.undo()
+    assert layout(rack) == empty_plus_a
+    history.undo()
+    assert layout(rack) == {"Front": [], "Rear": []}
+    assert not history.can_undo()
+    history.redo()
+    history.redo()
+    assert layout(rack) == moved
+
+
+def test_remove_undo_restores_position_in_list():
+    rack = RackModel(8)
+    history = watched(rack)
+    for n in range(3):
+        rack.place("Front", f"C{n}", info(), n + 1)
+    history.checkpoint()
+    before = layout(rack)
+    rack.remove(rack.views["Front"][1])
+    history.undo()
+    assert layout(rack) == before
+
+
+def test_new_edit_clears_redo():
+    rack = RackModel(8)
+    history = watched(rack)
+    rack.place("Front", "A", info(), 1)
+    history.undo()
+    assert history.can_redo()
+    rack.place("Front", "B", info(), 1)
+    assert not history.can_redo()
+
+
+def test_group_makes_one_entry():
+    rack = RackModel(8)
+    history = watched(rack)
+    with history.group():
+        rack.place("Front", "A", info(), 1)
+        history.checkpoint()
+        rack.place("Front", "B", info(), 2)
+    assert len(history) == 1
+    history.undo()
+    assert rack.views["Front"] == []
+
+
+def test_height_change_undo_brings_dropped_items_back():
+    rack = RackModel(12)
+    history = watched(rack)
+    rack.place("Front", "Top", info(2), 10)
+    history.checkpoint()
+    rack.set_height(8)
+    history.checkpoint()
+    history.undo()
+    assert rack.rack_height == 12
+    assert layout(rack)["Front"] == [("Top", 10, 2)]
+
+
+def test_depth_and_op_limits_drop_oldest_entries():
+    rack = RackModel(48)
+    history = watched(rack, max_depth=3)
+    for n in range(5):
+        rack.place("Front", f"C{n}", info(), n + 1)
+        history.checkpoint()
+    assert len(history) == 3
+    rack = RackModel(48)
+    history = watched(rack, max_ops=4)
+    for n in range(6):
+        rack.place("Front", f"C{n}", info(), n + 1)
+        history.checkpoint()
+    assert history.op_count <= 4
+
+
+def test_rewind_works_on_copies():
+    rack = RackModel(8)
+    history = watched(rack)
+    rack.place("Front", "A", info(), 1)
+    history.checkpoint()
+    rack.place("Front", "B", info(), 2)
+    base = RackModel(8, copy.deepcopy(rack.views))
+    assert history.rewind(1, {rack: base}) == 1
+    assert [c['name'] for c in base.views["Front"]] == ["A"]
+    assert [c['name'] for c in rack.views["Front"]] == ["A", "B"]
+    assert history.can_undo()
+
+
+def test_forget_drops_entries_of_a_removed_rack():
+    kept, removed = RackModel(8), RackModel(8)
+    history = History()
+    history.watch(kept)
+    history.watch(removed)
+    kept.place("Front", "A", info(), 1)
+    history.checkpoint()
+    removed.place("Front", "B", info(), 1)
+    history.checkpoint()
+    history.forget(removed)
+    assert len(history) == 1
+    removed.place("Front", "C", info(), 2)
+    history.undo()
+    assert kept.views["Front"] == []
@@ -0,0 +1,58 @@
+import json
+import os
+
+import pytest
+
+from rack_io import build_project, parse_project, project_data, read_project, safe_file_name, write_project
+from rack_model import RackModel, RackProject
+
+
+def test_single_rack_round_trip_keeps_v3_layout(tmp_path):
+    rack = RackModel(12, name="Edge")
+    rack.place("Front", "Switch", {'size': 1, 'watts': 100, 'weight': 3}, 4)['serial'] = "X1"
+    data = project_data(RackProject([rack]))
+    assert data["version"] == "3.0" and data["rack_name"] == "Edge"
+    path = tmp_path / "p.json"
+    write_project(str(path), data)
+    loaded = build_project(read_project(str(path)))
+    comp = loaded.racks[0].views["Front"][0]
+    assert (loaded.racks[0].name, comp['name'], comp['start_u_slot'], comp['serial']) == ("Edge", "Switch", 4, "X1")
+
+
+def test_multi_rack_round_trip():
+    a, b = RackModel(12, name="A", row=0), RackModel(24, name="B", row=2)
+    b.place("Rear", "PDU", {'size': 1}, 1)
+    data = json.loads(json.dumps(project_data(RackProject([a, b]))))
+    loaded = build_project(parse_project(data))
+    assert [(r.name, r.row, r.rack_height) for r in loaded.racks] == [("A", 0, 12), ("B", 2, 24)]
+    assert loaded.racks[1].views["Rear"][0]['name'] == "PDU"
+
+
+def test_legacy_single_view_files_load():
+    project = parse_project({"rack_height": 8, "placed_components": [{'name': 'Old', 'start_u_slot': 1, 'size_u': 1}]})
+    rack = project["racks"][0]
+    assert rack["name"] == "Rack 1"
+    assert rack["views"]["Front"][0]['name'] == "Old" and rack["views"]["Rear"] == []
+
+
+def test_bad_files_are_refused():
+    with pytest.raises(ValueError):
+        parse_project([])
+    with pytest.raises(ValueError):
+        parse_project({"racks": []})
+
+
+def test_transient_keys_are_not_saved():
+    rack = RackModel(4)
+    rack.place("Front", "A", {'size': 1}, 1)['rect_id'] = 7
+    assert 'rect_id' not in project_data(RackProject([rack]))["views"]["Front"][0]
+
+
+def test_write_leaves_no_temp_files(tmp_path):
+    write_project(str(tmp_path / "p.json"), {"views": {}})
+    assert os.listdir(tmp_path) == ["p.json"]
+
+
+def test_safe_file_name():
+    assert safe_file_name("Row 1/Rack:2") == "Row_1_Rack_2"
+    assert safe_file_name("") == "rack"
@@ -0,0 +1,80 @@
+import os
+
+from rack_io import project_data
+from rack_journal import Journal, recover, recover_project
+from rack_model import RackModel, RackProject
+
+
+def watched(directory):
+    project = RackProject([RackModel(10, name="Rack 1")])
+    journal = Journal(str(directory))
+    journal.watch(project.racks[0])
+    return project, journal
+
+
+def test_nothing_to_recover(tmp_path):
+    assert recover(str(tmp_path)) is None
+
+
+def test_snapshot_plus_journal_replays_edits(tmp_path):
+    project, journal = watched(tmp_path)
+    rack = project.racks[0]
+    switch = rack.place("Front", "Switch", {'size': 1}, 1)
+    assert journal.compact(lambda: project_data(project))
+    assert not journal.compact(lambda: project_data(project))
+    ups = rack.place("Rear", "UPS", {'size': 2}, 3)
+    rack.move(switch, 5)
+    rack.resize(ups, 3)
+    rack.set_height(12)
+    journal.close()
+
+    restored, _ = recover_project(str(tmp_path))
+    rack = restored.get("Rack 1")
+    assert rack.rack_height == 12
+    assert [(c['name'], c['start_u_slot'], c['size_u']) for c in rack.views["Front"]] == [("Switch", 5, 1)]
+    assert [(c['name'], c['start_u_slot'], c['size_u']) for c in rack.views["Rear"]] == [("UPS", 3, 3)]
+
+
+def test_compaction_drops_covered_segments(tmp_path):
+    project, journal = watched(tmp_path)
+    project.racks[0].place("Front", "Switch", {'size': 1}, 1)
+    journal.compact(lambda: project_data(project))
+    journal.close()
+    data, records = recover(str(tmp_path))
+    assert records == [] and len(data["racks"][0]["views"]["Front"]) == 1
+    assert len([n for n in os.listdir(tmp_path) if n.startswith("journal-")]) == 1
+
+
+def test_torn_final_line_is_ignored(tmp_path):
+    project, journal = watched(tmp_path)
+    rack = project.racks[0]
+    journal.compact(lambda: project_data(project))
+    rack.place("Front", "Switch", {'size': 1}, 1)
+    rack.place("Front", "Patch", {'size': 1}, 2)
+    journal.close()
+    segment = max(os.path.join(tmp_path, n) for n in os.listdir(tmp_path) if n.startswith("journal-"))
+    with open(segment, 'r+') as f:
+        f.truncate(os.path.getsize(segment) - 5)
+    _, records = recover(str(tmp_path))
+    assert [r[4]['name'] for r in records] == ["Switch"]
+
+
+def test_sequence_continues_after_restart(tmp_path):
+    project, journal = watched(tmp_path)
+    journal.compact(lambda: project_data(project))
+    project.racks[0].place("Front", "Switch", {'size': 1}, 1)
+    journal.close()
+    project, journal = watched(tmp_path)
+    project.racks[0].place("Front", "Patch", {'size': 1}, 2)
+    journal.close()
+    _, records = recover(str(tmp_path))
+    assert [r[0] for r in records] == [1, 2]
+
+
+def test_close_discard_removes_everything(tmp_path):
+    project, journal = watched(tmp_path)
+    project.racks[0].place("Front", "Switch", {'size': 1}, 1)
+    journal.compact(lambda: project_data(project))
+    journal.close(discard=True)
+    assert os.listdir(tmp_path) == []
+    assert not project.racks[0]._listeners
@@ -0,0 +1,228 @@
+import pytest
+
+from rack_model import RackModel, RackProject, as_u, first_run, item_layers, slot_mask
+
+
+def info(size=1, **extra):
+    return dict({'size': size, 'watts': 0, 'weight': 0}, **extra)
+
+
+def test_slot_mask_and_first_run():
+    assert slot_mask(1, 1) == 0b11
+    assert slot_mask(2, 2) == 0b111100
+    assert first_run(0b1110011, 3) == 4
+    assert first_run(0b0110011, 3) is None
+
+
+def test_place_fills_lowest_free_slot():
+    rack = RackModel(6)
+    a = rack.place("Front", "A", info(2))
+    b = rack.place("Front", "B", info(1))
+    assert (a['start_u_slot'], b['start_u_slot']) == (1, 3)
+    assert rack.used_u("Front") == 3
+    assert rack.used_u("Rear") == 0
+
+
+def test_collisions_and_bounds_are_refused():
+    rack = RackModel(6)
+    rack.place("Front", "A", info(2), 3)
+    with pytest.raises(ValueError):
+        rack.place("Front", "B", info(1), 4)
+    with pytest.raises(ValueError):
+        rack.place("Front", "C", info(2), 6)
+    assert rack.place("Rear", "D", info(2), 3) is not None
+    assert not rack.is_slot_available("Front", 2, 2)
+    assert rack.is_slot_available("Front", 1, 2)
+
+
+def test_place_returns_none_when_full():
+    rack = RackModel(2)
+    rack.place("Front", "A", info(2))
+    assert rack.place("Front", "B", info(1)) is None
+
+
+def test_move_ignores_own_slots():
+    rack = RackModel(6)
+    a = rack.place("Front", "A", info(2), 1)
+    rack.move(a, 2)
+    assert a['start_u_slot'] == 2
+    assert rack.is_slot_available("Front", 1, 1)
+    b = rack.place("Front", "B", info(1), 5)
+    with pytest.raises(ValueError):
+        rack.move(b, 3)
+
+
+def test_remove_frees_slots_and_uids_stay_unique():
+    rack = RackModel(4)
+    a = rack.place("Front", "A", info(1), 1)
+    rack.remove(a)
+    assert rack.get(a['uid']) is None
+    assert rack.is_slot_available("Front", 1, 4)
+    b = rack.place("Front", "B", info(1), 1)
+    assert b['uid'] != a['uid']
+
+
+def test_set_height_drops_items_that_no_longer_fit():
+    rack = RackModel(12)
+    low = rack.place("Front", "Low", info(2), 1)
+    high = rack.place("Front", "High", info(2), 10)
+    dropped = rack.set_height(8)
+    assert dropped == [high]
+    assert rack.views["Front"] == [low]
+    assert rack.first_free("Front", 6) == 3
+
+
+def test_load_keeps_overlaps_and_reports_them():
+    rack = RackModel(4, {"Front": [
+        {'name': 'A', 'start_u_slot': 1, 'size_u': 2},
+        {'name': 'B', 'start_u_slot': 2, 'size_u': 1},
+    ]})
+    assert len(rack.views["Front"]) == 2
+    assert rack.has_overlaps("Front")
+    rack.remove(rack.views["Front"][1])
+    assert not rack.has_overlaps("Front")
+    assert rack.used_u("Front") == 2
+
+
+def test_listeners_hear_every_change():
+    rack = RackModel(4)
+    heard = []
+    rack.subscribe(lambda kind, view, comp, prev: heard.append((kind, prev)))
+    a = rack.place("Front", "A", info(1), 1)
+    rack.move(a, 3)
+    rack.remove(a)
+    assert heard == [('add', None), ('move', 1), ('remove', 0)]
+
+
+def test_project_rows_and_unique_names():
+    project = RackProject()
+    second = project.add_rack(row=1)
+    third = project.add_rack(row=0)
+    assert second.name == "Rack 2" and third.name == "Rack 3"
+    assert [(row, [r.name for r in racks]) for row, racks in project.rows()] == [(0, ["Rack 1", "Rack 3"]), (1, ["Rack 2"])]
+    with pytest.raises(ValueError):
+        project.add_rack("Rack 2")
+    project.remove_rack(second)
+    project.remove_rack(third)
+    with pytest.raises(ValueError):
+        project.remove_rack(project.racks[0])
+
+
+def test_running_totals_follow_changes():
+    rack = RackModel(6)
+    a = rack.place("Front", "A", info(2, watts=200, weight=15))
+    rack.place("Rear", "B", info(1, watts=50, weight=5))
+    assert (rack.total_watts(), rack.total_weight()) == (250, 20)
+    assert (rack.total_watts("Front"), rack.total_weight("Rear")) == (200, 5)
+    rack.remove(a)
+    assert (rack.total_watts(), rack.total_weight()) == (50, 5)
+    rack.load(6, {"Front": [dict(name="C", start_u_slot=1, size_u=1, watts=10)], "Rear": []})
+    assert rack.total_watts() == 10
+
+
+def test_power_and_heat_profiles_spread_over_units():
+    rack = RackModel(6)
+    a = rack.place("Front", "A", info(2, watts=200), 2)
+    assert rack.power_profile("Front") == [0, 100, 100, 0, 0, 0]
+    assert rack.power_profile("Front", 2, 3) == [100, 100]
+    assert rack.heat_profile("Front")[1] == pytest.approx(341.2)
+    rack.move(a, 5)
+    assert rack.power_profile("Front") == [0, 0, 0, 0, 100, 100]
+    rack.remove(a)
+    assert rack.power_profile("Front") == [0] * 6
+
+
+def test_transaction_allows_swaps_and_reports_once():
+    rack = RackModel(6)
+    a = rack.place("Front", "A", info(2), 1)
+    b = rack.place("Front", "B", info(2), 3)
+    heard = []
+    rack.subscribe(lambda kind, view, comp, prev: heard.append((kind, comp['name'], prev)))
+    with rack.transaction():
+        rack.move(a, 3)
+        rack.move(b, 1)
+        assert heard == []
+    assert (a['start_u_slot'], b['start_u_slot']) == (3, 1)
+    assert heard == [('move', 'A', 1), ('move', 'B', 3)] and not rack.has_overlaps()
+
+
+def remove_then_fail(rack, comp):
+    rack.remove(comp)
+    raise KeyError("aborted")
+
+
+@pytest.mark.parametrize("edit, error", [
+    (lambda rack, a: rack.move(a, 3), "would be used by 'A' and 'B'"),
+    (lambda rack, a: rack.resize(a, 7), "outside the rack"),
+    (remove_then_fail, "aborted"),
+])
+def test_failed_transaction_rolls_back_silently(edit, error):
+    rack = RackModel(6)
+    a = rack.place("Front", "A", info(2), 1)
+    rack.place("Front", "B", info(2), 3)
+    before = [dict(c) for c in rack.views["Front"]]
+    heard = []
+    rack.subscribe(lambda *event: heard.append(event))
+    with pytest.raises((ValueError, KeyError), match=error):
+        with rack.transaction():
+            rack.place("Front", "C", info(1), 6)
+            edit(rack, a)
+    assert rack.views["Front"] == before and heard == []
+    assert rack.used_u("Front") == 4 and rack.is_slot_available("Front", 5, 2)
+
+
+def test_resize_grows_upwards_and_is_checked():
+    rack = RackModel(6)
+    a = rack.place("Front", "A", info(1), 1)
+    rack.place("Front", "B", info(1), 4)
+    rack.resize(a, 3)
+    assert rack.used_u("Front") == 4
+    with pytest.raises(ValueError):
+        rack.resize(a, 4)
+
+
+def test_as_u_accepts_half_units_only():
+    assert as_u("2") == 2 and as_u(1.5) == 1.5
+    with pytest.raises(ValueError):
+        as_u(1.25)
+    with pytest.raises(ValueError):
+        as_u(float("nan"))
+
+
+def test_half_u_items_pack_and_whole_u_items_start_on_a_boundary():
+    rack = RackModel(4)
+    shelf = rack.place("Front", "Shelf", info(0.5))
+    blank = rack.place("Front", "Blank", info(0.5))
+    assert (shelf['start_u_slot'], blank['start_u_slot']) == (1, 1.5)
+    rack.move(blank, 2.5)
+    assert rack.place("Front", "Switch", info(1))['start_u_slot'] == 3
+    assert rack.used_u("Front") == 2
+    assert not rack.is_slot_available("Front", 2.5, 1) and rack.is_slot_available("Front", 1.5, 1)
+    assert not rack.in_bounds(1.25, 1)
+
+
+def test_full_depth_items_block_both_faces():
+    rack = RackModel(6)
+    assert item_layers("Front", {'depth': 'full'}) == ("Front", "Rear")
+    rack.place("Front", "Server", info(2, depth='full'), 1)
+    assert not rack.is_slot_available("Rear", 2, 1)
+    assert rack.place("Rear", "PDU", info(1))['start_u_slot'] == 3
+    rack.place("Rear", "Shelf", info(1), 5)
+    assert not rack.is_slot_available("Front", 5, 1, depth='full')
+    assert rack.first_free("Front", 1, depth='full') == 4
+
+
+def test_rail_items_only_use_their_rail():
+    rack = RackModel(6)
+    assert item_layers("Front", {'rail': 'Left'}) == ("Left",)
+    rack.place("Front", "Server", info(6), 1)
+    pdu = rack.place("Front", "Vertical PDU", info(6, rail='Left'))
+    assert pdu['start_u_slot'] == 1 and rack.used_u("Front") == 6
+    assert rack.first_free("Rear", 6, rail='Left') is None
+    assert rack.first_free("Rear", 6, rail='Right') == 1
+
+
+def test_conflicts_name_layer_u_and_items():
+    rack = RackModel(6, {"Front": [dict(name="Server", start_u_slot=1, size_u=2, depth='full')],
+                         "Rear": [dict(name="UPS", start_u_slot=2, size_u=1)]})
+    assert [(layer, u, [c['name'] for c in items]) for layer, u, items in rack.conflicts()] == [("Rear", 2, ["Server", "UPS"])]
@@ -0,0 +1,90 @@
+import json
+import pstats
+
+from rack_perf import Profiler, deep_size, format_summary, main
+
+
+class Target:
+    def work(self, n):
+        return sum(range(n))
+
+    def other(self):
+        return 1
+
+
+def test_targets_are_only_wrapped_while_enabled():
+    profiler, target = Profiler(), Target()
+    profiler.add_target(target, ("work", "missing"), "target")
+    assert "work" not in vars(target)
+    profiler.enable()
+    assert target.work(10) == 45 and target.work.__name__ == "work"
+    target.other()
+    profiler.disable()
+    target.work(10)
+    assert "work" not in vars(target)
+    assert list(profiler.stats) == ["target.work"] and profiler.stats["target.work"][0] == 1
+
+
+def test_targets_added_while_enabled_are_wrapped_at_once():
+    profiler, target = Profiler(), Target()
+    profiler.enable()
+    profiler.add_target(target, ("other",), "t")
+    target.other()
+    assert profiler.stats["t.other"][0] == 1
+
+
+def test_summary_sorts_by_total_time():
+    profiler = Profiler()
+    profiler.record("a", 0, 0.001)
+    profiler.record("b", 0, 0.004)
+    profiler.record("a", 0, 0.002)
+    rows = profiler.summary()
+    assert [r[0] for r in rows] == ["b", "a"]
+    assert rows[1][1:] == (2, 3.0, 1.5, 2.0)
+    text = format_summary(rows, {"items": 12345})
+    assert "12,345" in text and len(text.splitlines()) == 4
+    profiler.reset()
+    assert profiler.summary() == []
+
+
+def test_gauges_report_errors_instead_of_raising():
+    profiler = Profiler()
+    profiler.add_gauge("items", lambda: 3)
+    profiler.add_gauge("broken", lambda: 1 / 0)
+    values = profiler.sample_gauges()
+    assert values["items"] == 3 and values["broken"].startswith("error:")
+    assert [c[0] for c in profiler.counters] == ["items"]
+
+
+def test_chrome_trace_round_trips_through_main(tmp_path, capsys):
+    profiler, target = Profiler(), Target()
+    profiler.add_target(target, ("work",), "target")
+    profiler.add_gauge("items", lambda: 7)
+    profiler.enable()
+    target.work(1000)
+    profiler.sample_gauges()
+    path = tmp_path / "trace.json"
+    profiler.write_chrome_trace(str(path))
+    events = json.loads(path.read_text())["traceEvents"]
+    assert {e["ph"] for e in events} == {"X", "C", "M"}
+    assert main([str(path)]) == 0
+    assert "target.work" in capsys.readouterr().out
+
+
+def test_cprofile_capture(tmp_path):
+    profiler = Profiler()
+    profiler.start_cprofile()
+    assert profiler.profiling
+    Target().work(100)
+    path = str(tmp_path / "run.pstats")
+    profiler.stop_cprofile(path)
+    assert not profiler.profiling and profiler.stop_cprofile() is None
+    assert pstats.Stats(path).total_calls > 0
+
+
+def test_deep_size_skips_shared_objects():
+    shared = Target()
+    data = {"a": [1, 2, 3], "b": "x" * 1000, "model": shared}
+    assert deep_size(data) > 1000
+    assert deep_size(data, skip=(str,)) < 1000
+    assert deep_size([data, data]) < 2 * deep_size(data)
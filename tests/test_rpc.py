@@ -0,0 +1,102 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from rack_cabling import CablePlan
+from rack_model import RackModel, RackProject
+from rack_rpc import (INVALID_PARAMS, INVALID_REQUEST, METHOD_NOT_FOUND, RpcError, RpcServer, apply_ops, call,
+                      connect_links, rack_detail)
+
+
+def sample_rack():
+    rack = RackModel(10)
+    rack.place("Front", "Switch", {'size': 1}, 1)
+    return rack
+
+
+def test_apply_ops_runs_a_batch():
+    rack = sample_rack()
+    uid = rack.views["Front"][0]['uid']
+    added = apply_ops(rack, [
+        {"op": "add", "name": "Server", "size": 2, "serial": "SN1"},
+        {"op": "add", "name": "UPS", "size": 2, "view": "Rear", "start_u_slot": 1},
+        {"op": "move", "uid": uid, "start_u_slot": 9},
+        {"op": "resize", "uid": uid, "size_u": 2},
+    ])
+    server = rack.get(added[0])
+    assert (server['start_u_slot'], server['serial']) == (2, "SN1")
+    assert rack.get(uid)['start_u_slot'] == 9 and rack.get(uid)['size_u'] == 2
+    assert rack_detail(rack)["used_u"] == {"Front": 4, "Rear": 2}
+
+
+@pytest.mark.parametrize("ops, message", [
+    ([{"op": "add", "size": 1}], "op 0: missing 'name'"),
+    ([{"op": "add", "name": "A", "size": 1}, {"op": "spin"}], "op 1: unknown op 'spin'"),
+    ([{"op": "remove", "uid": 99}], "op 0: no item with uid 99"),
+    ([{"op": "add", "name": "A", "size": 1, "view": "Top"}], "unknown view 'Top'"),
+    ([{"op": "add", "name": "A", "size": 1, "start_u_slot": 1}], "Front U1 would be used by"),
+    ([{"op": "add", "name": "A", "size": 2, "start_u_slot": -3}], "outside the rack"),
+])
+def test_bad_batches_are_invalid_params_and_roll_back(ops, message):
+    rack = sample_rack()
+    before = rack_detail(rack)
+    with pytest.raises(RpcError, match=message) as raised:
+        apply_ops(rack, ops)
+    assert raised.value.code == INVALID_PARAMS
+    assert rack_detail(rack)["views"] == before["views"]
+
+
+def test_dispatch_errors():
+    server = RpcServer({"double": lambda n: 2 * n}, port=0)
+    try:
+        assert server.dispatch({"jsonrpc": "2.0", "id": 1, "method": "double", "params": [4]})["result"] == 8
+        assert server.dispatch({"jsonrpc": "2.0", "id": 2, "method": "double", "params": {"n": 5}})["result"] == 10
+        assert server.dispatch({"jsonrpc": "2.0", "id": 3, "method": "halve"})["error"]["code"] == METHOD_NOT_FOUND
+        assert server.dispatch({"jsonrpc": "2.0", "id": 4, "method": "double", "params": {}})["error"]["code"] == INVALID_PARAMS
+        assert server.dispatch({"id": 5, "method": "double"})["error"]["code"] == INVALID_REQUEST
+    finally:
+        server.httpd.server_close()
+
+
+def test_calls_over_http_run_on_the_pumping_thread():
+    owner = threading.get_ident()
+    server = RpcServer({"where": lambda: threading.get_ident() == owner}, port=0).start()
+    box = {}
+
+    def client():
+        box["result"] = call("where", port=server.port)
+    thread = threading.Thread(target=client)
+    thread.start()
+    try:
+        while thread.is_alive():
+            server.pump()
+            thread.join(0.01)
+        assert box["result"] is True
+
+        request = urllib.request.Request(f"http://127.0.0.1:{server.port}/", data=json.dumps({}).encode(),
+                                         headers={"Content-Type": "application/json", "Origin": "http://example.com"})
+        with pytest.raises(urllib.error.HTTPError) as refused:
+            urllib.request.urlopen(request, timeout=5)
+        assert refused.value.code == 403
+    finally:
+        server.stop()
+
+
+def test_connect_links_is_all_or_nothing():
+    rack = RackModel(10)
+    switch = rack.place("Front", "Switch", {'size': 1, 'ports': {'RJ45': 2}}, 1)['uid']
+    panel = rack.place("Front", "Panel", {'size': 1, 'ports': {'RJ45': 2}, 'patch': True}, 5)['uid']
+    plan = CablePlan(RackProject([rack]))
+    end = lambda uid, port: {"rack": rack.name, "uid": uid, "port": port}
+    added = connect_links(plan, [{"a": end(switch, "RJ45 1"), "b": end(panel, "RJ45 1"), "label": "uplink"}])
+    assert added == [{"a": end(switch, "RJ45 1"), "b": end(panel, "RJ45 1"), "label": "uplink"}]
+    with pytest.raises(RpcError, match="link 1: .*already connected") as raised:
+        connect_links(plan, [{"a": end(switch, "RJ45 2"), "b": end(panel, "RJ45 2")},
+                             {"a": end(switch, "RJ45 1"), "b": end(panel, "RJ45 2")}])
+    assert raised.value.code == INVALID_PARAMS
+    assert len(plan.connections) == 1 and plan.is_free(end(switch, "RJ45 2"))
+    with pytest.raises(RpcError, match="link 0: missing 'b'"):
+        connect_links(plan, [{"a": end(switch, "RJ45 2")}])
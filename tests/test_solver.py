@@ -0,0 +1,55 @@
+import pytest
+
+from rack_model import RackModel, RackProject
+from rack_solver import apply_solution, rack_capacity, resolve_bom, solve
+
+CATALOG = {"Gear": {
+    "Server": {'size': 2, 'watts': 400, 'weight': 20},
+    "Switch": {'size': 1, 'watts': 100, 'weight': 4},
+    "UPS 3000": {'size': 2, 'watts': 0, 'weight': 40},
+}}
+
+
+def spare(height=12):
+    return {'rack_height': height, 'occupied': {}, 'watts': 0, 'weight': 0, 'new': True}
+
+
+def test_resolve_bom_from_catalog_and_overrides():
+    devices = resolve_bom([{"name": "Server", "qty": 2}, {"name": "Custom", "size": 1, "watts": 50}], CATALOG)
+    assert [(d['name'], d['size'], d['watts']) for d in devices] == [("Server", 2, 400), ("Server", 2, 400), ("Custom", 1, 50)]
+    with pytest.raises(ValueError, match="Nope"):
+        resolve_bom({"Nope": 1}, CATALOG)
+
+
+def test_everything_fits_in_one_rack_with_ups_at_the_bottom():
+    devices = resolve_bom({"Server": 2, "Switch": 1, "UPS 3000": 1}, CATALOG)
+    solution = solve(devices, [spare()], time_budget=0)
+    assert solution['unplaced'] == [] and solution['racks_used'] == 1
+    by_start = sorted((start, dev['name']) for _, start, dev in solution['placements'])
+    assert by_start[0] == (1, "UPS 3000")
+    assert solution['totals'] == [(900, 84)]
+
+
+def test_power_cap_spreads_devices_over_racks():
+    devices = resolve_bom({"Server": 4}, CATALOG)
+    solution = solve(devices, [spare(), spare()], power_cap=800, time_budget=0)
+    assert solution['unplaced'] == [] and solution['racks_used'] == 2
+    assert all(watts <= 800 for watts, _ in solution['totals'])
+
+
+def test_devices_that_do_not_fit_are_reported():
+    devices = resolve_bom({"Server": 4}, CATALOG)
+    solution = solve(devices, [spare(4)], time_budget=0)
+    assert len(solution['placements']) == 2 and len(solution['unplaced']) == 2
+
+
+def test_existing_items_are_respected_and_spare_racks_are_added():
+    project = RackProject([RackModel(4, name="Old")])
+    project.racks[0].place("Front", "Existing", {'size': 2}, 1)
+    devices = resolve_bom({"Server": 2}, CATALOG)
+    racks = [rack_capacity(project.racks[0]), spare(4)]
+    solution = solve(devices, racks, time_budget=0)
+    placed = apply_solution(project, list(project.racks), solution, new_rack_height=4)
+    assert len(placed) == 2 and len(project.racks) == 2
+    assert not project.racks[0].has_overlaps()
+    assert [c['name'] for c in project.racks[1].views["Front"]] == ["Server"]
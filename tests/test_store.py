@@ -0,0 +1,132 @@
+import json
+
+import pytest
+
+from rack_io import project_data, read_project
+from rack_journal import Journal, recover_project
+from rack_model import RackModel, RackProject
+from rack_store import ProjectStore, convert, fill_stored_racks, main, racks_over_power, racks_with_model
+
+CATALOG = {"Networking": {"Switch": {'size': 1, 'color': 'green', 'watts': 150, 'weight': 4, 'ports': {'RJ45': 48}}}}
+
+
+def sample_project():
+    first, second = RackModel(10, name="A"), RackModel(10, name="B", row=1)
+    first.place("Front", "Switch", {'size': 1, 'watts': 150}, 1)['serial'] = "SN1"
+    first.place("Rear", "UPS", {'size': 2, 'watts': 50, 'weight': 30}, 1)
+    second.place("Front", "Switch", {'size': 1, 'watts': 150}, 5)
+    return RackProject([first, second])
+
+
+def saved(tmp_path, project=None):
+    path = str(tmp_path / "room.rackdb")
+    store = ProjectStore(path)
+    store.save(project or sample_project(), CATALOG)
+    store.close()
+    return path
+
+
+def layout(rack):
+    return {view: [(c['name'], c['start_u_slot'], c['size_u']) for c in comps] for view, comps in rack.views.items()}
+
+
+def test_open_gives_stubs_that_load_on_demand(tmp_path):
+    store = ProjectStore(saved(tmp_path))
+    project, categories = store.open()
+    assert categories == CATALOG
+    a, b = project.racks
+    assert (a.name, b.name, b.row) == ("A", "B", 1)
+    assert not store.is_loaded(a) and a.views["Front"] == []
+    assert [c['name'] for c in store.rack_views(a)["Rear"]] == ["UPS"]
+    assert not store.is_loaded(a)
+    assert store.load_rack(a) and not store.load_rack(a)
+    assert layout(a) == {"Front": [("Switch", 1, 1)], "Rear": [("UPS", 1, 2)]}
+    assert a.views["Front"][0]['serial'] == "SN1" and a.total_watts() == 200
+    store.close()
+
+
+def test_save_writes_only_what_changed(tmp_path):
+    store = ProjectStore(saved(tmp_path))
+    project, categories = store.open()
+    a, b = project.racks
+    assert store.save(project, categories) == 0
+    store.load_rack(a)
+    assert store.save(project, categories) == 0
+    a.move(a.views["Front"][0], 4)
+    assert store.save(project, categories) == 1
+    project.remove_rack(b)
+    assert store.save(project, categories) == 1
+    store.close()
+
+    store = ProjectStore(str(tmp_path / "room.rackdb"))
+    project, _ = store.open()
+    assert [r.name for r in project.racks] == ["A"]
+    store.load_rack(project.racks[0])
+    assert layout(project.racks[0])["Front"] == [("Switch", 4, 1)]
+    store.close()
+
+
+def test_newer_files_are_refused(tmp_path):
+    path = saved(tmp_path)
+    store = ProjectStore(path)
+    with store.db:
+        store.db.execute("UPDATE meta SET value = '99' WHERE key = 'version'")
+    store.close()
+    with pytest.raises(ValueError, match="newer"):
+        ProjectStore(path)
+
+
+def test_fill_project_data_reads_stubs(tmp_path):
+    store = ProjectStore(saved(tmp_path))
+    project, _ = store.open()
+    data = store.fill_project_data(project_data(project))
+    assert [c['name'] for c in data["racks"][1]["views"]["Front"]] == ["Switch"]
+    store.close()
+
+
+def test_marked_stubs_are_filled_back_on_recovery(tmp_path):
+    store = ProjectStore(saved(tmp_path))
+    project, _ = store.open()
+    a = project.racks[0]
+    store.load_rack(a)
+    journal = Journal(str(tmp_path / "autosave"))
+    journal.watch(a)
+    journal.compact(lambda: store.mark_stored_racks(project_data(project)))
+    a.place("Front", "Patch", {'size': 1}, 6)
+    journal.close()
+    store.close()
+
+    restored, _ = recover_project(str(tmp_path / "autosave"))
+    assert [c['name'] for c in restored.get("A").views["Front"]] == ["Switch", "Patch"]
+    assert layout(restored.get("B"))["Front"] == [("Switch", 5, 1)]
+
+
+def test_fill_stored_racks_errors(tmp_path):
+    data = {"store": str(tmp_path / "gone.rackdb"), "racks": []}
+    with pytest.raises(ValueError, match="no longer exists"):
+        fill_stored_racks(data)
+    data = {"store": saved(tmp_path), "racks": [{"name": "C", "stored": True, "views": {}}]}
+    with pytest.raises(ValueError, match="no longer has a rack named 'C'"):
+        fill_stored_racks(data)
+
+
+def test_convert_round_trip(tmp_path):
+    source = str(tmp_path / "room.json")
+    with open(source, 'w') as f:
+        json.dump(project_data(sample_project(), CATALOG), f)
+    target = str(tmp_path / "room.rackdb")
+    convert(source, target)
+    back = str(tmp_path / "back.json")
+    convert(target, back)
+    data = read_project(back)
+    assert data["component_categories"] == CATALOG
+    assert [c['name'] for c in data["racks"][0]["views"]["Rear"]] == ["UPS"]
+
+
+def test_queries_across_files(tmp_path, capsys):
+    path = saved(tmp_path)
+    assert list(racks_with_model([path], "switch")) == [(path, "A", 0, 1), (path, "B", 1, 1)]
+    assert list(racks_over_power([path], 200, 0.9)) == [(path, "A", 0, 200)]
+    assert main(["find-model", "UPS", path]) == 0
+    assert json.loads(capsys.readouterr().out) == {"file": path, "rack": "A", "row": 0, "count": 1}
+    assert main(["power", path, "--budget", "1000"]) == 1